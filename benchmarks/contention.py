@@ -0,0 +1,249 @@
+"""複数プロセスから同時に読み書きした時の速さとエラーを計測する
+
+clap serve・デーモン・CLI が同じDBを同時に使う状況を再現する。
+使い捨てのディレクトリに合成データのDBを作り（benchmarks/synthetic.py）、
+書き込み役と読み取り役のプロセスを決めた秒数だけ同時に動かして、
+1操作ごとの時間（p50/p95/p99/最大）と、ロック待ちで失敗した回数を集計する。
+
+    書き込み役: 日記の更新・タスクの追加・タスクの完了（Database.write でやり直し付き）
+    読み取り役: stats の集計・振り返りデータの生成・日記一覧の1ページ目（snapshot で読む）
+
+使い方:
+    python benchmarks/contention.py                                # balanced で 4+4 プロセス、5秒
+    python benchmarks/contention.py --writers 8 --readers 2 --seconds 10
+    python benchmarks/contention.py --profiles balanced,safe       # プロファイルを比べる
+    python benchmarks/contention.py --busy-timeout 100 -o result.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic import DEFAULT_SEED, generate, use_database  # noqa: E402
+
+DEFAULT_WRITERS = 4
+DEFAULT_READERS = 4
+DEFAULT_SECONDS = 5.0
+DEFAULT_PROFILES = "balanced"
+
+
+def _percentile(sorted_values: List[float], ratio: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * ratio))]
+
+
+def _write_op(rng: random.Random, entry_dates: List[date], task_ids: List[int]):
+    from selfclap.database.queries import DiaryQueries, TaskQueries
+
+    roll = rng.random()
+    if roll < 0.4:
+        DiaryQueries().update_entry(rng.choice(entry_dates), self_assessment=f"計測 {rng.randint(1, 9999)}")
+    elif roll < 0.7 or not task_ids:
+        task = TaskQueries().create_task(title=f"計測 #{rng.randint(1, 9999)}", created_date=date.today())
+        task_ids.append(task.id)
+    else:
+        TaskQueries().complete_task(task_ids.pop(rng.randrange(len(task_ids))), date.today(), time_actual=1.0)
+
+
+def _read_op(rng: random.Random):
+    from selfclap.analysis.reflection import generate_reflection_data
+    from selfclap.analysis.stats import compute_dashboard_stats
+    from selfclap.database.connection import get_database
+    from selfclap.database.queries import DiaryQueries
+
+    roll = rng.random()
+    if roll < 0.4:
+        compute_dashboard_stats(30)
+    elif roll < 0.6:
+        with get_database().snapshot():
+            generate_reflection_data()
+    else:
+        DiaryQueries().get_entries_page(limit=20, fields=("date", "mood", "content"))
+
+
+def worker(role: str, index: int, db_path: str, profile: str, busy_timeout: int, deadline: float, results):
+    """deadline まで role（write / read）の操作を繰り返し、操作ごとの時間とエラーを返す"""
+    os.environ["SELFCLAP_BUSY_TIMEOUT"] = str(busy_timeout)
+    from selfclap.database.connection import DatabaseBusyError, is_busy_error
+    from selfclap.database.queries import DiaryQueries, TaskQueries
+
+    rng = random.Random(f"{role}-{index}")
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    try:
+        with use_database(Path(db_path), profile):
+            entry_dates = [entry.date for entry in DiaryQueries().iter_all_entries(fields=("date",))]
+            task_ids = [task.id for task in TaskQueries().iter_active_tasks(fields=("id",))]
+            while time.time() < deadline:
+                started = time.perf_counter()
+                try:
+                    if role == "write":
+                        _write_op(rng, entry_dates, task_ids)
+                    else:
+                        _read_op(rng)
+                except DatabaseBusyError:
+                    errors["busy_after_retry"] = errors.get("busy_after_retry", 0) + 1
+                    continue
+                except sqlite3.OperationalError as e:
+                    name = "busy" if is_busy_error(e) else f"error: {e}"
+                    errors[name] = errors.get(name, 0) + 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+    except Exception as e:
+        # 起動時（接続・データの読み込み）に失敗しても、親が結果を待ち続けないように記録して返す
+        errors[f"aborted: {type(e).__name__}: {e}"] = 1
+    finally:
+        results.put((role, latencies, errors))
+
+
+def run(db_path: Path, profile: str, writers: int, readers: int, seconds: float, busy_timeout: int) -> dict:
+    """プロセスを同時に動かして役割ごとの集計を返す"""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    # プロセスの起動（import）が終わってから一斉に始まるよう、開始時刻に余裕を持たせる
+    deadline = time.time() + 2.0 + seconds
+    processes = [
+        context.Process(target=worker, args=(role, i, str(db_path), profile, busy_timeout, deadline, results))
+        for role, count in (("write", writers), ("read", readers))
+        for i in range(count)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    summary = {}
+    for role in ("write", "read"):
+        latencies = sorted(value for r, values, _ in collected if r == role for value in values)
+        errors: Dict[str, int] = {}
+        for r, _, role_errors in collected:
+            if r == role:
+                for name, count in role_errors.items():
+                    errors[name] = errors.get(name, 0) + count
+        if not latencies and not errors:
+            continue
+        summary[role] = {
+            "ops": len(latencies),
+            "ops_per_sec": round(len(latencies) / seconds, 1),
+            "p50_ms": round(_percentile(latencies, 0.50), 2),
+            "p95_ms": round(_percentile(latencies, 0.95), 2),
+            "p99_ms": round(_percentile(latencies, 0.99), 2),
+            "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+            "errors": errors,
+        }
+    return summary
+
+
+def print_report(result: dict):
+    from rich.console import Console
+    from rich.markup import escape
+    from rich.table import Table
+
+    meta = result["meta"]
+    table = Table(
+        title=(
+            f"書き込み {meta['writers']}プロセス + 読み取り {meta['readers']}プロセス, {meta['seconds']:g}秒, "
+            f"busy_timeout {meta['busy_timeout']} ms"
+        ),
+        title_justify="left",
+    )
+    table.add_column("プロファイル", style="cyan", no_wrap=True)
+    table.add_column("役割", no_wrap=True)
+    for label in ("回数/秒", "p50", "p95", "p99", "最大"):
+        table.add_column(label, justify="right", no_wrap=True)
+    table.add_column("エラー", justify="right", no_wrap=True)
+    details = []
+    for profile, summary in result["profiles"].items():
+        for role, stats in summary.items():
+            label = {"write": "書き込み", "read": "読み取り"}[role]
+            error_count = sum(stats["errors"].values())
+            details.extend(f"{profile} {label}: {name} ×{count}" for name, count in stats["errors"].items())
+            table.add_row(
+                profile,
+                label,
+                f"{stats['ops_per_sec']:.1f}",
+                f"{stats['p50_ms']:.1f}",
+                f"{stats['p95_ms']:.1f}",
+                f"{stats['p99_ms']:.1f}",
+                f"{stats['max_ms']:.1f}",
+                f"[red]{error_count}[/red]" if error_count else "[green]0[/green]",
+            )
+
+    console = Console()
+    console.print(table)
+    for line in details:
+        console.print(f"[red]{escape(line)}[/red]")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=DEFAULT_WRITERS, help="書き込み役のプロセス数")
+    parser.add_argument("--readers", type=int, default=DEFAULT_READERS, help="読み取り役のプロセス数")
+    parser.add_argument("--seconds", type=float, default=DEFAULT_SECONDS, help="計測する秒数")
+    parser.add_argument("--profiles", default=DEFAULT_PROFILES, help="パフォーマンスプロファイルをカンマ区切りで")
+    parser.add_argument("--busy-timeout", type=int, default=5000, help="ロック待ちのタイムアウト（ミリ秒）")
+    parser.add_argument("--years", type=float, default=1.0, help="合成データの日記の期間（年）")
+    parser.add_argument("--tasks", type=int, default=2000, help="合成データのタスクの件数")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output", "-o", type=Path, help="結果を保存するJSONファイル")
+    args = parser.parse_args()
+
+    # 実際のホームディレクトリ（設定・辞書・キャッシュ）を読み書きしない
+    home = tempfile.mkdtemp(prefix="selfclap-bench-home-")
+    os.environ["HOME"] = home
+    for name in ("SELFCLAP_PROFILE", "SELFCLAP_CONFIG", "SELFCLAP_TRACE", "SELFCLAP_BUSY_TIMEOUT"):
+        os.environ.pop(name, None)
+
+    result = {
+        "meta": {
+            "date": date.today().isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "writers": args.writers,
+            "readers": args.readers,
+            "seconds": args.seconds,
+            "busy_timeout": args.busy_timeout,
+        },
+        "profiles": {},
+    }
+    work_dir = Path(tempfile.mkdtemp(prefix="selfclap-bench-"))
+    try:
+        template = work_dir / "template.db"
+        generate(template, args.years, args.tasks, args.seed)
+        for profile in args.profiles.split(","):
+            print(f"{profile} プロファイルで計測中...", file=sys.stderr)
+            # プロファイルごとに同じ状態のDBから始める（journal_mode は接続時に切り替わる）
+            db_path = work_dir / f"{profile}.db"
+            with sqlite3.connect(template) as source, sqlite3.connect(db_path) as target:
+                source.backup(target)
+            result["profiles"][profile] = run(
+                db_path, profile, args.writers, args.readers, args.seconds, args.busy_timeout
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        shutil.rmtree(home, ignore_errors=True)
+
+    print_report(result)
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\n結果を保存しました: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
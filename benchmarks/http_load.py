@@ -0,0 +1,122 @@
+"""clap serve の負荷テスト用クライアント
+
+keep-alive の接続を複数張り、指定したパスに GET を送り続けてスループットとレイテンシを表示する。
+
+使い方:
+    clap serve &                                          # 先にサーバーを起動
+    python benchmarks/http_load.py                        # /streak /stats /reflect に 2000 リクエスト
+    python benchmarks/http_load.py -c 32 -n 10000 /stats  # 並列数・件数・パスを指定
+    python benchmarks/http_load.py --revalidate           # If-None-Match を付けて 304 の速さを測る
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from itertools import cycle
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_PATHS = ["/streak", "/stats", "/reflect"]
+
+
+async def _request(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    common_headers: List[str],
+    path: str,
+    etag: Optional[str]
+) -> Tuple[int, Dict[str, str]]:
+    headers = [f"GET {path} HTTP/1.1", *common_headers]
+    if etag:
+        headers.append(f"If-None-Match: {etag}")
+    writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+    response_headers = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        response_headers[name.strip().lower()] = value.strip()
+
+    length = int(response_headers.get("content-length") or 0)
+    if length:
+        await reader.readexactly(length)
+    return int(status_line.split(" ", 2)[1]), response_headers
+
+
+async def _worker(
+    host: str,
+    port: int,
+    common_headers: List[str],
+    paths,
+    remaining: List[int],
+    latencies: List[float],
+    statuses: Counter,
+    revalidate: bool
+):
+    reader, writer = await asyncio.open_connection(host, port)
+    etags: Dict[str, str] = {}
+    try:
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            path = next(paths)
+            start = time.perf_counter()
+            status, headers = await _request(reader, writer, common_headers, path, etags.get(path) if revalidate else None)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+            if "etag" in headers:
+                etags[path] = headers["etag"]
+    finally:
+        writer.close()
+
+
+async def run(
+    host: str, port: int, token: str, paths: List[str], concurrency: int, requests: int, revalidate: bool
+):
+    # サーバーは Host が 127.0.0.1:<ポート> でトークンの付いたリクエストだけを受け付ける
+    common_headers = [f"Host: {host}:{port}", f"Authorization: Bearer {token}"]
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining = [requests]
+    path_cycle = cycle(paths)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _worker(host, port, common_headers, path_cycle, remaining, latencies, statuses, revalidate)
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"requests:    {len(latencies)} ({concurrency} connections)")
+    print(f"elapsed:     {elapsed:.2f} s")
+    print(f"throughput:  {len(latencies) / elapsed:.0f} req/s")
+    print(f"latency:     p50 {percentile(0.50):.1f} ms / p95 {percentile(0.95):.1f} ms / max {latencies[-1] * 1000:.1f} ms")
+    print(f"status:      {dict(sorted(statuses.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", default=DEFAULT_PATHS, help="リクエストするパス（順番に使う）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="同時接続数")
+    parser.add_argument("-n", "--requests", type=int, default=2000, help="総リクエスト数")
+    parser.add_argument("--revalidate", action="store_true", help="前回の ETag で If-None-Match を送る")
+    parser.add_argument("--token", help="APIのトークン（省略時は clap serve が作ったファイルから読む）")
+    args = parser.parse_args()
+
+    token = args.token
+    if token is None:
+        from selfclap.server import token_path
+        token = token_path().read_text(encoding="utf-8").strip()
+
+    asyncio.run(run(args.host, args.port, token, args.paths, args.concurrency, args.requests, args.revalidate))
+
+
+if __name__ == "__main__":
+    main()
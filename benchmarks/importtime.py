@@ -0,0 +1,91 @@
+"""コマンドごとのimport時間を計測し、予算を超えたら失敗する
+
+`python -X importtime` の出力から、コマンドの解決までに読み込まれた
+モジュールのimport時間（self）を合計する。
+
+使い方:
+    python benchmarks/importtime.py              # 予算と比較（超過時は終了コード1）
+    python benchmarks/importtime.py --update     # 計測値から予算ファイルを作り直す
+    python benchmarks/importtime.py --top 10     # 重いモジュールも表示
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+BUDGET_FILE = Path(__file__).with_name("import_budget.json")
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# 計測は毎回ばらつくので、複数回の最小値を使う
+DEFAULT_RUNS = 5
+
+# --update で予算を作る時の余裕（計測値に対する倍率）
+BUDGET_HEADROOM = 2.0
+
+_SNIPPET = "import sys; from selfclap.cli import load_command; load_command(sys.argv[1:])"
+
+
+def measure(command: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """1回分のimport時間（ミリ秒）と、モジュールごとの累積時間を返す"""
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _SNIPPET, *command.split()],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+
+    total_us = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total_us += int(self_us)
+        modules.append((name.strip(), int(cumulative_us) / 1000))
+
+    return total_us / 1000, modules
+
+
+def measure_best(command: str, runs: int) -> Tuple[float, List[Tuple[str, float]]]:
+    return min((measure(command) for _ in range(runs)), key=lambda m: m[0])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--update", action="store_true", help="計測値から予算ファイルを作り直す")
+    parser.add_argument("--top", type=int, default=0, help="累積時間の大きいモジュールを表示する数")
+    args = parser.parse_args()
+
+    budgets: Dict[str, float] = json.loads(BUDGET_FILE.read_text(encoding="utf-8"))
+
+    failed = False
+    measured = {}
+    for command, budget_ms in budgets.items():
+        total_ms, modules = measure_best(command, args.runs)
+        measured[command] = total_ms
+
+        status = "ok" if total_ms <= budget_ms else "OVER"
+        failed |= status == "OVER"
+        print(f"{status:>4}  clap {command:<16} {total_ms:8.1f} ms  (budget {budget_ms:.0f} ms)")
+
+        for name, cumulative_ms in sorted(modules, key=lambda m: m[1], reverse=True)[:args.top]:
+            print(f"        {cumulative_ms:8.1f} ms  {name}")
+
+    if args.update:
+        new_budgets = {command: round(ms * BUDGET_HEADROOM) for command, ms in measured.items()}
+        BUDGET_FILE.write_text(json.dumps(new_budgets, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\n予算を更新しました: {BUDGET_FILE}")
+        return 0
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""DBがロックされている間の書き込みが一時保存され、後で反映されるかを確かめる
+
+使い捨てのホームディレクトリで、別の接続が BEGIN EXCLUSIVE でDBを握っている間に
+clap task add / clap diary write を実行し、
+
+    1. コマンドが成功し、~/.selfclap/spool/ に一時保存のファイルができること
+    2. ロックを解放して次のコマンドを実行すると反映され、一時保存のファイルがなくなること
+    3. タスク・日記がDBに1件ずつだけ入っていること
+
+を確認する。問題があれば終了コード1。
+
+使い方:
+    python benchmarks/spool_check.py
+"""
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# ロックを待つ時間（短くして、すぐに一時保存させる）
+WRITE_BUDGET_MS = 300
+
+
+def clap(env: dict, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-m", "selfclap.cli", *args], env=env, capture_output=True, text=True
+    )
+
+
+def spool_files(home: Path) -> list:
+    directory = home / ".selfclap" / "spool"
+    return sorted(path.name for path in directory.iterdir()) if directory.is_dir() else []
+
+
+def main() -> int:
+    home = Path(tempfile.mkdtemp(prefix="selfclap-spool-home-"))
+    env = {
+        key: value for key, value in os.environ.items()
+        if not key.startswith("SELFCLAP_")
+    }
+    env.update({"HOME": str(home), "SELFCLAP_WRITE_BUDGET": str(WRITE_BUDGET_MS), "COLUMNS": "120"})
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(Path(__file__).resolve().parent.parent), env.get("PYTHONPATH")]))
+
+    failures = []
+
+    def check(condition: bool, message: str, result: subprocess.CompletedProcess = None):
+        status = "ok  " if condition else "FAIL"
+        print(f"  {status} {message}")
+        if not condition:
+            failures.append(message)
+            if result is not None:
+                print(result.stdout + result.stderr)
+
+    try:
+        # DBを作っておく
+        result = clap(env, "task", "list")
+        check(result.returncode == 0, "DBを作成", result)
+
+        lock = sqlite3.connect(home / ".selfclap" / "selfclap.db", isolation_level=None)
+        lock.execute("BEGIN EXCLUSIVE")
+        try:
+            result = clap(env, "task", "add", "ロック中のタスク")
+            check(result.returncode == 0, "ロック中の task add が成功する", result)
+            result = clap(env, "diary", "write", "ロック中の日記")
+            check(result.returncode == 0, "ロック中の diary write が成功する", result)
+            check(bool(spool_files(home)), f"一時保存のファイルができる: {spool_files(home)}")
+        finally:
+            lock.execute("ROLLBACK")
+            lock.close()
+
+        result = clap(env, "task", "list")
+        check(result.returncode == 0, "ロック解放後のコマンドが成功する", result)
+        check(not spool_files(home), f"一時保存のファイルがなくなる: {spool_files(home)}")
+
+        db = sqlite3.connect(home / ".selfclap" / "selfclap.db")
+        try:
+            tasks = db.execute("SELECT COUNT(*) FROM tasks WHERE title = 'ロック中のタスク'").fetchone()[0]
+            entries = db.execute("SELECT COUNT(*) FROM diary_entries WHERE content = 'ロック中の日記'").fetchone()[0]
+        finally:
+            db.close()
+        check(tasks == 1, f"タスクが1件だけ反映される（{tasks}件）")
+        check(entries == 1, f"日記が1件だけ反映される（{entries}件）")
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+
+    if failures:
+        print(f"\n{len(failures)}件の確認に失敗しました")
+        return 1
+    print("\n一時保存と反映は正常です")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
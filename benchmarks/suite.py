@@ -0,0 +1,281 @@
+"""合成データで各コマンドの速さを計測する
+
+データの規模ごとに使い捨てのディレクトリにDBを作り（benchmarks/synthetic.py）、
+clap の読み取り系コマンドをこのプロセス内で繰り返し実行する。
+1回ごとに --trace と同じ仕組みでクエリ・集計（analysis）・描画（render）の時間を記録し、
+合計時間が最も短かった回の値を使う（ばらつきを抑えるため。importtime.py と同じ）。
+感情検知（detect_emotional_content）の処理速度もあわせて測る。
+
+結果はJSONで保存でき、--compare で前回の結果と比べて遅くなったコマンドを報告する。
+ネットワークも実際のホームディレクトリも使わない（HOME も一時ディレクトリに差し替える）。
+
+使い方:
+    python benchmarks/suite.py                                  # 1年・5年・20年分
+    python benchmarks/suite.py --sizes 1 --runs 3 -o base.json  # 1年分だけ、結果を保存
+    python benchmarks/suite.py --sizes 20 --tasks 100000        # タスク10万件
+    python benchmarks/suite.py -o new.json --compare base.json  # 前回より遅くなったら終了コード1
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic import DEFAULT_SEED, generate, generate_entries, use_database  # noqa: E402
+
+DEFAULT_SIZES = "1,5,20"
+DEFAULT_RUNS = 5
+
+# タスク数の既定値（日記の期間1年あたり）
+DEFAULT_TASKS_PER_YEAR = 1000
+
+# 感情検知の計測に使う日記の件数
+EMOTION_SAMPLE = 5000
+
+# 前回より何倍遅くなったら報告するか（短いコマンドのばらつきを除くため、差が小さい場合は無視する）
+REGRESSION_RATIO = 1.3
+REGRESSION_MIN_MS = 10.0
+
+# 計測するコマンド（書き込み系はデータが変わるので含めない）
+COMMANDS: List[List[str]] = [
+    ["diary", "list"],
+    ["diary", "list", "--all"],
+    ["diary", "list", "--all", "--where", "mood in (tired,stressed) and has:learned"],
+    ["diary", "show"],
+    ["diary", "search", "詰まった"],
+    ["task", "list"],
+    ["task", "list", "--all"],
+    ["task", "search", "レビュー"],
+    ["stats", "show"],
+    ["stats", "show", "--days", "365"],
+    ["calendar", "show"],
+    ["reflect"],
+    ["listen"],
+    ["export", "--table", "diary"],
+]
+
+# 実行時に読まれる環境変数のうち、計測に影響するもの
+_ISOLATED_ENV = (
+    "SELFCLAP_PROFILE", "SELFCLAP_CONFIG", "SELFCLAP_LEXICON", "SELFCLAP_TRACE",
+    "SELFCLAP_DAEMON", "SELFCLAP_CACHE_PREWARM", "SELFCLAP_PERF_PROFILE",
+)
+
+
+def run_command(command, argv: List[str]) -> dict:
+    """コマンドを1回実行し、時間とクエリの記録を返す"""
+    from selfclap import tracing
+
+    tracing.start()
+    started = time.perf_counter()
+    with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+        code = command.main(args=argv, prog_name="clap", standalone_mode=False)
+    elapsed = time.perf_counter() - started
+    tracer = tracing.stop(report=False)
+
+    if code not in (None, 0):
+        raise RuntimeError(f"clap {' '.join(argv)} が終了コード {code} で終了しました")
+
+    phases: Dict[str, float] = {}
+    for phase in tracer.phases:
+        if phase["name"] != "import":
+            phases[phase["name"]] = phases.get(phase["name"], 0.0) + phase["ms"]
+    return {
+        "ms": elapsed * 1000,
+        "query_ms": sum(r.elapsed for r in tracer.queries) * 1000,
+        "queries": len(tracer.queries),
+        "rows": sum(r.rows for r in tracer.queries),
+        **{f"{name}_ms": ms for name, ms in phases.items()},
+    }
+
+
+def _best(runs: List[dict]) -> dict:
+    best = min(runs, key=lambda run: run["ms"])
+    return {key: round(value, 3) for key, value in sorted(best.items())}
+
+
+def bench_commands(db_dir: Path, runs: int) -> Dict[str, dict]:
+    """各コマンドを runs 回実行して最も速かった回（振り返りのキャッシュは毎回消して、作り直す時間を測る）"""
+    import typer.main
+    from selfclap.cli import app
+
+    command = typer.main.get_command(app)
+    cache_dir = db_dir / "cache"
+    results = {}
+    for argv in COMMANDS:
+        # 1回目はサブコマンドのimportを含むので捨てる
+        run_command(command, argv)
+        samples = []
+        for _ in range(runs):
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            samples.append(run_command(command, argv))
+        results[" ".join(argv)] = _best(samples)
+    return results
+
+
+def bench_emotion(seed: int) -> dict:
+    """detect_emotional_content の処理速度（合成データの本文を使う）"""
+    import random
+    from datetime import timedelta
+    from selfclap.prompts.emotion_detect import detect_emotional_content
+
+    end = date(2026, 1, 1)
+    entries = generate_entries(random.Random(seed), end - timedelta(days=EMOTION_SAMPLE * 2), end)
+    texts = [entry["content"] for _, entry in zip(range(EMOTION_SAMPLE), entries)]
+    characters = sum(len(text) for text in texts)
+
+    detect_emotional_content(texts[0])  # 辞書の構築は含めない
+    started = time.perf_counter()
+    for text in texts:
+        detect_emotional_content(text)
+    elapsed = time.perf_counter() - started
+    return {
+        "entries": len(texts),
+        "ms": round(elapsed * 1000, 3),
+        "entries_per_sec": round(len(texts) / elapsed),
+        "chars_per_sec": round(characters / elapsed),
+    }
+
+
+def bench_size(years: float, tasks: int, runs: int, seed: int, keep: Optional[Path]) -> dict:
+    work_dir = Path(tempfile.mkdtemp(prefix="selfclap-bench-"))
+    try:
+        db_path = work_dir / "selfclap.db"
+        started = time.perf_counter()
+        data = generate(db_path, years, tasks, seed)
+        data["generate_sec"] = round(time.perf_counter() - started, 2)
+        data["db_mb"] = round(db_path.stat().st_size / 1024 / 1024, 2)
+
+        with use_database(db_path):
+            commands = bench_commands(work_dir, runs)
+        return {"data": data, "commands": commands}
+    finally:
+        if keep:
+            keep.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(work_dir / "selfclap.db", keep / f"selfclap-{years:g}y.db")
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def compare(current: dict, baseline: dict) -> List[str]:
+    """前回の結果より遅くなったコマンドの一覧"""
+    regressions = []
+    for size, result in current["sizes"].items():
+        base_commands = baseline.get("sizes", {}).get(size, {}).get("commands", {})
+        for name, stats in result["commands"].items():
+            base = base_commands.get(name)
+            if not base:
+                continue
+            if stats["ms"] > base["ms"] * REGRESSION_RATIO and stats["ms"] - base["ms"] > REGRESSION_MIN_MS:
+                regressions.append(
+                    f"{size} clap {name}: {base['ms']:.1f} ms → {stats['ms']:.1f} ms "
+                    f"(クエリ {base.get('queries', 0):g}回 → {stats.get('queries', 0):g}回)"
+                )
+
+    base_emotion = baseline.get("emotion", {}).get("entries_per_sec")
+    emotion = current["emotion"]["entries_per_sec"]
+    if base_emotion and emotion * REGRESSION_RATIO < base_emotion:
+        regressions.append(f"detect_emotional_content: {base_emotion}件/秒 → {emotion}件/秒")
+    return regressions
+
+
+def print_report(result: dict):
+    from rich.console import Console
+    from rich.markup import escape
+    from rich.table import Table
+
+    console = Console()
+    for size, size_result in result["sizes"].items():
+        data = size_result["data"]
+        table = Table(
+            title=f"{size}: 日記 {data['entries']}件, タスク {data['tasks']}件, DB {data['db_mb']} MB",
+            title_justify="left",
+        )
+        table.add_column("コマンド", style="cyan")
+        for label in ("合計ms", "クエリms", "回数", "集計ms", "描画ms"):
+            table.add_column(label, justify="right")
+        for name, stats in size_result["commands"].items():
+            table.add_row(
+                escape(f"clap {name}"),
+                f"{stats['ms']:.1f}",
+                f"{stats['query_ms']:.1f}",
+                f"{stats['queries']:g}",
+                f"{stats.get('analysis_ms', 0):.1f}",
+                f"{stats.get('render_ms', 0):.1f}",
+            )
+        console.print(table)
+
+    emotion = result["emotion"]
+    console.print(
+        f"detect_emotional_content: {emotion['entries_per_sec']}件/秒 "
+        f"({emotion['chars_per_sec']}文字/秒, {emotion['entries']}件)"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="日記の期間（年）をカンマ区切りで")
+    parser.add_argument("--tasks", type=int, help=f"タスクの件数（省略時は1年あたり{DEFAULT_TASKS_PER_YEAR}件）")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="各コマンドの実行回数（最も速かった回を使う）")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output", "-o", type=Path, help="結果を保存するJSONファイル")
+    parser.add_argument("--compare", type=Path, help="比較する前回の結果のJSONファイル")
+    parser.add_argument("--keep", type=Path, help="作ったDBをこのディレクトリに残す")
+    args = parser.parse_args()
+
+    # 実際のホームディレクトリ（設定・辞書・キャッシュ）を読み書きしない
+    home = tempfile.mkdtemp(prefix="selfclap-bench-home-")
+    os.environ["HOME"] = home
+    for name in _ISOLATED_ENV:
+        os.environ.pop(name, None)
+    os.environ["COLUMNS"] = "120"
+
+    result = {
+        "meta": {
+            "date": date.today().isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "runs": args.runs,
+        },
+        "sizes": {},
+    }
+    try:
+        for size in args.sizes.split(","):
+            years = float(size)
+            tasks = args.tasks if args.tasks is not None else round(years * DEFAULT_TASKS_PER_YEAR)
+            print(f"{years:g}年分のデータで計測中...", file=sys.stderr)
+            result["sizes"][f"{years:g}y"] = bench_size(years, tasks, args.runs, args.seed, args.keep)
+        result["emotion"] = bench_emotion(args.seed)
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+
+    print_report(result)
+
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\n結果を保存しました: {args.output}")
+
+    if args.compare:
+        regressions = compare(result, json.loads(args.compare.read_text(encoding="utf-8")))
+        if regressions:
+            print(f"\n遅くなったもの（{REGRESSION_RATIO}倍以上）:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\n前回の結果から遅くなったものはありません")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
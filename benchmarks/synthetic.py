@@ -0,0 +1,228 @@
+"""ベンチマーク用の合成データを作る
+
+乱数のシードを固定しているので、同じ引数なら毎回同じ日記・タスクができる。
+日記は書く日・書かない日が続きやすいように、前日に書いたかどうかで書く確率を変える。
+本文は新人エンジニアの日記らしい文を組み合わせ、感情キーワード辞書に当たる表現も混ぜる。
+
+使い方:
+    python benchmarks/synthetic.py --db /tmp/bench.db --years 5 --tasks 20000
+    SELFCLAP_DB=/tmp/bench.db clap stats show    # 作ったDBでコマンドを試す
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterator
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+DEFAULT_SEED = 20260101
+
+# 気分の出現率
+MOODS = {
+    "neutral": 0.35,
+    "happy": 0.25,
+    "tired": 0.18,
+    "stressed": 0.10,
+    "frustrated": 0.06,
+    "anxious": 0.06,
+}
+
+# 前日に書いた／書かなかった場合に、その日も書く確率
+WRITE_AFTER_WRITTEN = 0.88
+WRITE_AFTER_SKIPPED = 0.45
+
+# 日記の各項目の記入率
+FIELD_RATES = {
+    "learned_today": 0.6,
+    "compared_to_past": 0.3,
+    "invisible_growth": 0.25,
+    "external_feedback": 0.2,
+    "self_assessment": 0.35,
+}
+
+# タスクの状態の割合（完了・作業中・未着手）
+TASK_STATUSES = {"done": 0.7, "in_progress": 0.1, "todo": 0.2}
+TASK_PRIORITIES = {"low": 0.25, "medium": 0.5, "high": 0.25}
+
+_TOPICS = [
+    "APIの実装", "テストの追加", "バグ修正", "コードレビュー", "設計の打ち合わせ", "本番の障害対応",
+    "ドキュメント整理", "SQLのチューニング", "CIの修正", "リファクタリング", "ペアプロ", "新機能の調査",
+]
+_OPENERS = [
+    "今日は{topic}をやった。", "午前中は{topic}で終わった。", "{topic}に一日かかった。",
+    "朝から{topic}の続き。", "{topic}を任された。",
+]
+_GOOD = [
+    "思ったより早く終わって嬉しかった。", "先輩にコードが良いと言われた。", "少しずつ慣れてきた気がする。",
+    "レビューの指摘が前より減った。", "自分で原因を見つけられた。", "チームの役に立てた。",
+]
+_BAD = [
+    "エラーの原因がわからないまま夕方になった。", "また同じところで詰まった。", "上司に注意された。",
+    "正直しんどい。", "疲れた。", "何度も同じ指摘を受けてしまった。", "進まないまま一日が終わった。",
+    "もう限界かもしれない。", "先輩に聞くタイミングがつかめなかった。",
+]
+_NEUTRAL = [
+    "明日は残りを片付ける。", "定例で進捗を共有した。", "ログを読んで仕様を確認した。",
+    "昼休みに本を少し読んだ。", "無理じゃない範囲で進めた。", "ドキュメントを読み直した。",
+]
+_LEARNED = [
+    "ログを先に読むと原因に早く辿り着ける", "テストを先に書くと設計が整理される", "インデックスの効き方",
+    "質問する前に再現手順をまとめる", "git bisect の使い方", "型ヒントで読みやすくなる",
+]
+_COMPARED = [
+    "半年前は1日かかったバグが1時間で直せた", "前は読めなかったコードが読めた", "レビューの指摘が半分になった",
+]
+_INVISIBLE = ["エラーメッセージを落ち着いて読めた", "質問を短くまとめられた", "見積もりが前より正確になった"]
+_EXTERNAL = ["説明がわかりやすいと言われた", "もう少しテストを書こうと言われた", "レビューが丁寧と言われた"]
+_SELF = ["まあまあ", "今日はよく頑張った", "集中できなかった", "60点", "一歩前進"]
+
+# 任意項目 → 記入する場合の候補
+_OPTIONAL_FIELDS = {
+    "learned_today": _LEARNED,
+    "compared_to_past": _COMPARED,
+    "invisible_growth": _INVISIBLE,
+    "external_feedback": _EXTERNAL,
+    "self_assessment": _SELF,
+}
+
+
+def _weighted(rng: random.Random, weights: Dict[str, float]) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _content(rng: random.Random, mood: str) -> str:
+    """気分に合わせた本文（1〜8文）"""
+    bad_rate = {"happy": 0.1, "neutral": 0.3}.get(mood, 0.6)
+    sentences = [rng.choice(_OPENERS).format(topic=rng.choice(_TOPICS))]
+    for _ in range(rng.randint(0, 7)):
+        roll = rng.random()
+        if roll < bad_rate:
+            sentences.append(rng.choice(_BAD))
+        elif roll < bad_rate + 0.3:
+            sentences.append(rng.choice(_GOOD))
+        else:
+            sentences.append(rng.choice(_NEUTRAL))
+    return "".join(sentences)
+
+
+def generate_entries(rng: random.Random, start: date, end: date) -> Iterator[dict]:
+    """start から end までの日記（書かない日もある）"""
+    written = True
+    day = start
+    while day <= end:
+        written = rng.random() < (WRITE_AFTER_WRITTEN if written else WRITE_AFTER_SKIPPED)
+        if written:
+            mood = _weighted(rng, MOODS)
+            entry = {
+                "date": day,
+                "content": _content(rng, mood),
+                "mood": mood,
+                "energy_level": rng.randint(1, 5),
+            }
+            for name, choices in _OPTIONAL_FIELDS.items():
+                if rng.random() < FIELD_RATES[name]:
+                    entry[name] = rng.choice(choices)
+            yield entry
+        day += timedelta(days=1)
+
+
+def generate_tasks(rng: random.Random, start: date, end: date, count: int) -> Iterator[dict]:
+    """start から end までに作成されたタスク（作成日の古い順）"""
+    span = (end - start).days
+    created_days = sorted(rng.randint(0, span) for _ in range(count))
+    for offset in created_days:
+        created = start + timedelta(days=offset)
+        status = _weighted(rng, TASK_STATUSES)
+        task = {
+            "title": f"{rng.choice(_TOPICS)} #{rng.randint(1, 9999)}",
+            "description": rng.choice(_NEUTRAL) if rng.random() < 0.5 else None,
+            "status": status,
+            "priority": _weighted(rng, TASK_PRIORITIES),
+            "created_date": created,
+            "time_estimated": rng.choice([None, 0.5, 1.0, 2.0, 4.0, 8.0]),
+        }
+        if status == "done":
+            task["completed_date"] = min(created + timedelta(days=rng.randint(0, 14)), end)
+            task["time_actual"] = round(rng.uniform(0.25, 12.0), 2)
+            if rng.random() < 0.5:
+                task["learnings"] = rng.choice(_LEARNED)
+            if rng.random() < 0.6:
+                before = rng.randint(2, 5)
+                task["difficulty_before"] = before
+                task["difficulty_after"] = max(1, before - rng.choice([0, 1, 1, 2, 3]))
+        yield task
+
+
+@contextmanager
+def use_database(db_path: Path, performance_profile: str = None):
+    """このブロックの間だけ、selfclap が db_path のDBを使うようにする"""
+    from selfclap.database.connection import close_all_databases
+
+    saved = {name: os.environ.get(name) for name in ("SELFCLAP_DB", "SELFCLAP_PERF_PROFILE", "SELFCLAP_PROFILE")}
+    os.environ["SELFCLAP_DB"] = str(db_path)
+    os.environ.pop("SELFCLAP_PROFILE", None)
+    if performance_profile:
+        os.environ["SELFCLAP_PERF_PROFILE"] = performance_profile
+    try:
+        yield
+    finally:
+        close_all_databases()
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def generate(db_path: Path, years: float, tasks: int, seed: int = DEFAULT_SEED, end: date = None) -> Dict[str, int]:
+    """db_path に合成データを書き込み、件数を返す
+
+    end（デフォルト: 昨日）までの years 年分の日記と、その期間に作成された tasks 件のタスクを作る。
+    取り込みは耐久性より速度を優先する fast プロファイルで行う。
+    """
+    from selfclap.analysis.emotions import backfill
+    from selfclap.database.queries import DiaryQueries, TaskQueries
+
+    end = end or date.today() - timedelta(days=1)
+    start = end - timedelta(days=round(365.25 * years) - 1)
+    rng = random.Random(seed)
+
+    with use_database(db_path, "fast"):
+        _, entries = DiaryQueries().bulk_upsert(generate_entries(rng, start, end))
+        task_count = TaskQueries().bulk_insert(generate_tasks(rng, start, end, tasks))
+        # 統計の感情の集計にも値が入るよう、感情検知の結果も保存しておく
+        analyzed = backfill(workers=1)
+
+    return {"entries": entries, "tasks": task_count, "analyzed": analyzed, "days": (end - start).days + 1}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", type=Path, required=True, help="書き込むDBファイル（既存のファイルは上書きしない）")
+    parser.add_argument("--years", type=float, default=1.0, help="日記の期間（年）")
+    parser.add_argument("--tasks", type=int, default=2000, help="タスクの件数")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+
+    if args.db.exists():
+        print(f"既にファイルがあります: {args.db}", file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    counts = generate(args.db, args.years, args.tasks, args.seed)
+    elapsed = time.perf_counter() - started
+    print(
+        f"{args.db}: 日記 {counts['entries']}件 / {counts['days']}日, "
+        f"タスク {counts['tasks']}件 ({elapsed:.1f}秒)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
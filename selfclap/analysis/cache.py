@@ -0,0 +1,118 @@
+"""振り返り・傾聴データのキャッシュ
+
+DBの変更カウンタと日付が前回と同じなら、保存済みの結果をそのまま返す。
+日記・タスクを書き込むとトリガーで変更カウンタが増えるので自動的に無効になる。
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Optional
+from selfclap import __version__
+from selfclap.database.connection import get_database
+
+
+def _cache_dir() -> Path:
+    # 同じディレクトリに複数プロファイルのDBがあっても混ざらないようにDB名で分ける
+    db_path = get_database().db_path
+    return db_path.parent / "cache" / db_path.stem
+
+
+def _cache_key() -> dict:
+    from selfclap.analysis.lexicon import get_lexicon
+
+    return {
+        "revision": get_database().get_revision(),
+        "date": date.today().isoformat(),
+        "lexicon": get_lexicon().version,
+        "version": __version__,
+    }
+
+
+def cached(name: str, builder: Callable[[], Any]) -> Any:
+    """キャッシュが有効ならその値を、なければ builder() の結果を保存して返す
+
+    builder の結果はJSONに変換できる値であること。
+    """
+    path = _cache_dir() / f"{name}.json"
+
+    # キーと結果を同じ時点のデータから作る（構築中に他のプロセスが書き込んでも食い違わない）
+    with get_database().snapshot():
+        key = _cache_key()
+        cached_value = _read(path, key)
+        if cached_value is not None:
+            return cached_value
+        value = builder()
+
+    _write(path, key, value)
+    return value
+
+
+def _read(path: Path, key: dict) -> Optional[Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if payload.get("key") != key:
+        return None
+    return payload.get("value")
+
+
+def _write(path: Path, key: dict, value: Any):
+    """一時ファイルに書いてから置き換える（並行実行でも壊れたファイルを読まない）
+
+    clap serve ではスレッドからも呼ばれるので、一時ファイル名はスレッドごとに分ける。
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "value": value}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        # キャッシュは最適化なので、書けなくてもコマンドは続行する
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+
+
+def prewarm_in_background():
+    """SELFCLAP_CACHE_PREWARM が設定されていれば、別プロセスでキャッシュを作っておく"""
+    if not os.environ.get("SELFCLAP_CACHE_PREWARM"):
+        return
+
+    from selfclap.config import get_active_profile
+
+    # --profile はこのプロセスの中だけの設定なので、使っているDBを環境変数で子プロセスに渡す
+    env = {**os.environ, "SELFCLAP_DB": str(get_database().db_path)}
+    profile = get_active_profile()
+    if profile:
+        env["SELFCLAP_PROFILE"] = profile
+
+    subprocess.Popen(
+        [sys.executable, "-m", "selfclap.analysis.cache"],
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def warm():
+    """reflect/listen のキャッシュを作成"""
+    from selfclap.commands.listen import get_listen_payload
+    from selfclap.commands.reflect import get_reflect_payload
+
+    get_reflect_payload()
+    get_listen_payload()
+
+
+if __name__ == "__main__":
+    warm()
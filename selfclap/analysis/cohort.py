@@ -0,0 +1,155 @@
+"""複数プロファイル（メンタリング対象のコホート）の横断集計
+
+プロファイルのDBを ATTACH し、UNION ALL の1クエリでまとめて集計する。
+ATTACH できる数には上限があるので、上限ごとのグループに分けて実行し、
+グループが多い場合はプロセスプールで並列に処理する。
+"""
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# SQLite の既定の ATTACH 上限（getlimit が使えない環境向け）
+DEFAULT_ATTACH_LIMIT = 10
+
+# workers 省略時、グループがこの数以上ならプロセスプールを使う
+# （少ない場合はプロセス起動の方が高くつく）
+PARALLEL_MIN_GROUPS = 8
+
+
+@dataclass
+class ProfileStats:
+    """プロファイル1人分の集計結果"""
+    profile: str
+    entry_count: int = 0
+    completed_task_count: int = 0
+    current_streak: int = 0
+    longest_streak: int = 0
+    last_entry_date: Optional[str] = None
+
+    # 集計できなかった理由（DBがないなど）
+    error: Optional[str] = None
+
+
+def _attach_limit(conn: sqlite3.Connection) -> int:
+    getlimit = getattr(conn, "getlimit", None)  # Python 3.11+
+    if getlimit is None:
+        return DEFAULT_ATTACH_LIMIT
+    return getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+
+
+def _profile_select(index: int) -> str:
+    """ATTACH した p{index} の集計を1行で返すSELECT"""
+    schema = f"p{index}"
+    return f"""
+        SELECT
+            {index} AS idx,
+            (SELECT COUNT(*) FROM {schema}.diary_entries
+                WHERE date BETWEEN :start AND :end) AS entry_count,
+            (SELECT COUNT(*) FROM {schema}.tasks
+                WHERE status = 'done' AND completed_date BETWEEN :start AND :end) AS completed_task_count,
+            (SELECT COALESCE(MAX(length), 0) FROM {schema}.streak_runs
+                WHERE end_date = :today) AS current_streak,
+            (SELECT COALESCE(MAX(length), 0) FROM {schema}.streak_runs) AS longest_streak,
+            (SELECT MAX(date) FROM {schema}.diary_entries) AS last_entry_date
+    """
+
+
+def query_group(profiles: List[Tuple[str, str]], start: date, end: date, today: date) -> List[ProfileStats]:
+    """プロファイルのグループを ATTACH して1回のクエリで集計（ワーカープロセスでも実行される）
+
+    profiles: (プロファイル名, DBパス) のリスト。ATTACH 上限以下であること。
+    """
+    results: Dict[int, ProfileStats] = {}
+    attached: List[Tuple[int, str]] = []
+
+    conn = sqlite3.connect(":memory:")
+    try:
+        if len(profiles) > _attach_limit(conn):
+            raise ValueError("ATTACH できる数を超えています")
+
+        for index, (name, path) in enumerate(profiles):
+            # ATTACH は存在しないファイルを空のDBとして作ってしまうので先に確認する
+            if not Path(path).is_file():
+                results[index] = ProfileStats(profile=name, error="DBがありません")
+                continue
+            conn.execute(f"ATTACH DATABASE ? AS p{index}", (path,))
+            attached.append((index, name))
+
+        if attached:
+            sql = " UNION ALL ".join(_profile_select(index) for index, _ in attached)
+            params = {"start": start, "end": end, "today": today}
+            for row in conn.execute(sql, params):
+                index, *values = row
+                results[index] = ProfileStats(profiles[index][0], *values)
+    except sqlite3.Error:
+        # 古いスキーマのDBが混ざっているとグループ全体が失敗するので1件ずつやり直す
+        if len(profiles) == 1:
+            return [_query_single_with_init(profiles[0], start, end, today)]
+        return [
+            stats
+            for profile in profiles
+            for stats in query_group([profile], start, end, today)
+        ]
+    finally:
+        conn.close()
+
+    return [results[index] for index in range(len(profiles))]
+
+
+def _query_single_with_init(profile: Tuple[str, str], start: date, end: date, today: date) -> ProfileStats:
+    """スキーマを最新にしてから1件だけ集計"""
+    from selfclap.database.connection import Database
+
+    name, path = profile
+    try:
+        Database(Path(path)).close()
+    except sqlite3.Error as e:
+        return ProfileStats(profile=name, error=f"DBを開けません: {e}")
+
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("ATTACH DATABASE ? AS p0", (path,))
+        row = conn.execute(_profile_select(0), {"start": start, "end": end, "today": today}).fetchone()
+        return ProfileStats(name, *row[1:])
+    except sqlite3.Error as e:
+        return ProfileStats(profile=name, error=f"集計できません: {e}")
+    finally:
+        conn.close()
+
+
+def compute_cohort_stats(
+    profiles: Dict[str, Path],
+    days: int,
+    today: Optional[date] = None,
+    workers: Optional[int] = None,
+    group_size: Optional[int] = None
+) -> List[ProfileStats]:
+    """過去days日間の集計をプロファイルごとに返す（profiles の順）
+
+    workers: グループを並列に処理するプロセス数（1なら直列、省略時はグループ数に応じて決める）
+    group_size: 1クエリで ATTACH するDB数（省略時はSQLiteの上限）
+    """
+    end = today or date.today()
+    start = end - timedelta(days=days)
+
+    if group_size is None:
+        conn = sqlite3.connect(":memory:")
+        group_size = _attach_limit(conn)
+        conn.close()
+
+    items = [(name, str(path)) for name, path in profiles.items()]
+    groups = [items[i:i + group_size] for i in range(0, len(items), group_size)]
+    if workers is None:
+        workers = (os.cpu_count() or 1) if len(groups) >= PARALLEL_MIN_GROUPS else 1
+    workers = min(workers, len(groups))
+
+    if workers <= 1:
+        return [stats for group in groups for stats in query_group(group, start, end, end)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(query_group, group, start, end, end) for group in groups]
+        return [stats for future in futures for stats in future.result()]
@@ -0,0 +1,84 @@
+"""感情検知結果の保存と一括再解析"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, List, Optional, Tuple
+from selfclap.analysis.lexicon import get_lexicon
+from selfclap.database.queries import EmotionQueries
+from selfclap.prompts.emotion_detect import detect_emotional_content
+
+
+def to_score_row(entry_id: int, emotion_data: dict, lexicon_version: str) -> tuple:
+    """detect_emotional_content の結果を emotion_scores の行に変換"""
+    scores = emotion_data["scores"]
+    return (
+        entry_id,
+        lexicon_version,
+        int(emotion_data["is_negative"]),
+        int(emotion_data["is_venting"]),
+        int(emotion_data["is_struggling"]),
+        scores["negative"],
+        scores["venting"],
+        scores["struggling"],
+        json.dumps(emotion_data["keywords"], ensure_ascii=False),
+        emotion_data["recommended_mode"],
+    )
+
+
+def save_entry_emotion(entry_id: int, emotion_data: dict):
+    """1件分の感情検知結果を保存"""
+    EmotionQueries().save_scores([to_score_row(entry_id, emotion_data, get_lexicon().version)])
+
+
+def analyze_batch(rows: List[Tuple[int, str]]) -> List[tuple]:
+    """(id, content) のバッチを解析（ワーカープロセスで実行される）"""
+    version = get_lexicon().version
+    return [
+        to_score_row(entry_id, detect_emotional_content(content), version)
+        for entry_id, content in rows
+    ]
+
+
+def backfill(
+    batch_size: int = 500,
+    workers: Optional[int] = None,
+    on_progress: Optional[Callable[[int], None]] = None
+) -> int:
+    """未解析・古い辞書で解析済みの日記をまとめて再解析
+
+    バッチごとにコミットするので、中断しても次回は続きから再開される。
+    戻り値は解析した件数。
+    """
+    emotion_db = EmotionQueries()
+    version = get_lexicon().version
+    batches = emotion_db.iter_pending_batches(version, batch_size)
+    workers = workers or os.cpu_count() or 1
+
+    analyzed = 0
+
+    def write(rows: List[tuple]):
+        nonlocal analyzed
+        emotion_db.save_scores(rows)
+        analyzed += len(rows)
+        if on_progress:
+            on_progress(len(rows))
+
+    if workers <= 1:
+        for batch in batches:
+            write(analyze_batch(batch))
+        return analyzed
+
+    # 実行中のバッチ数を制限して、読み込みが解析より先行しすぎないようにする
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for batch in batches:
+            pending.add(executor.submit(analyze_batch, batch))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write(future.result())
+
+        for future in pending:
+            write(future.result())
+
+    return analyzed
@@ -0,0 +1,248 @@
+"""感情キーワード辞書（Aho-Corasick法による一括照合）"""
+import hashlib
+import json
+import os
+import sys
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from selfclap.config import selfclap_home
+
+
+# 標準の辞書: 分類ごとの キーワード → 重み
+DEFAULT_CLASSES: Dict[str, Dict[str, float]] = {
+    # ネガティブキーワード
+    "negative": dict.fromkeys([
+        "むかつく", "イライラ", "腹立つ", "うざい", "きつい",
+        "つらい", "しんどい", "疲れた", "無理", "できない",
+        "わからない", "ダメ", "最悪", "嫌", "辛い"
+    ], 1.0),
+    # 愚痴・不満キーワード
+    "venting": dict.fromkeys([
+        "先輩", "上司", "怒られた", "注意された", "指摘",
+        "ばかり", "また", "いつも", "毎回", "何度も"
+    ], 1.0),
+    # 挫折・苦悩キーワード
+    "struggling": dict.fromkeys([
+        "わからない", "できない", "進まない", "詰まった",
+        "行き詰まった", "どうすれば", "もう", "限界"
+    ], 1.0),
+    # 他人からの肯定的な評価
+    "praise": dict.fromkeys([
+        "良い", "素晴らしい"
+    ], 1.0),
+}
+
+# キーワード直後に現れたら打ち消しとみなす表現（「無理じゃない」など）
+DEFAULT_NEGATIONS = [
+    "じゃない", "ではない", "じゃなかった", "ではなかった", "わけではない",
+]
+
+# キーワードの末尾から打ち消し表現の開始までに許す文字数
+DEFAULT_NEGATION_WINDOW = 2
+
+# 打ち消し表現を表す内部の分類名
+_NEGATION_CLASS = "__negation__"
+
+
+@dataclass
+class LexiconMatch:
+    """1つのテキストに対する照合結果"""
+    # 分類ごとの検出キーワード（辞書の定義順、重複なし）
+    keywords: Dict[str, List[str]] = field(default_factory=dict)
+    # 分類ごとの重みの合計
+    scores: Dict[str, float] = field(default_factory=dict)
+
+    def has(self, class_name: str) -> bool:
+        return bool(self.keywords.get(class_name))
+
+    def score(self, class_name: str) -> float:
+        return self.scores.get(class_name, 0.0)
+
+
+class Lexicon:
+    """全分類のキーワードを1つのオートマトンにまとめた辞書
+
+    テキストを1回走査するだけで全分類のキーワードを検出できる。
+    """
+
+    def __init__(
+        self,
+        classes: Dict[str, Dict[str, float]],
+        negations: Optional[List[str]] = None,
+        negation_window: int = DEFAULT_NEGATION_WINDOW
+    ):
+        self.classes = classes
+        self.negations = list(negations or [])
+        self.negation_window = negation_window
+
+        # パターン: (キーワード, 分類, 重み, 分類内の定義順)
+        self._patterns: List[Tuple[str, str, float, int]] = []
+        for class_name, keywords in classes.items():
+            for order, (keyword, weight) in enumerate(keywords.items()):
+                self._patterns.append((keyword, class_name, weight, order))
+        for keyword in self.negations:
+            self._patterns.append((keyword, _NEGATION_CLASS, 0.0, 0))
+
+        self._build()
+
+    def _build(self):
+        """トライを作り、失敗遷移と出力を幅優先で設定する"""
+        goto: List[Dict[str, int]] = [{}]
+        output: List[List[int]] = [[]]
+
+        for pattern_id, (keyword, _, _, _) in enumerate(self._patterns):
+            state = 0
+            for ch in keyword:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    output.append([])
+                state = next_state
+            output[state].append(pattern_id)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[next_state] = goto[f].get(ch, 0)
+                output[next_state] = output[next_state] + output[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+    @property
+    def version(self) -> str:
+        """辞書の内容から決まるバージョン文字列（再解析の要否判定用）"""
+        payload = json.dumps(
+            [self.classes, self.negations, self.negation_window],
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+    def scan(self, text: str) -> LexiconMatch:
+        """テキストを1回走査して全分類のキーワードを検出"""
+        goto, fail, output, patterns = self._goto, self._fail, self._output, self._patterns
+
+        hits: List[Tuple[int, int]] = []  # (キーワード末尾の位置, パターンID)
+        negation_starts: List[int] = []
+
+        state = 0
+        for pos, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pattern_id in output[state]:
+                keyword, class_name, _, _ = patterns[pattern_id]
+                if class_name == _NEGATION_CLASS:
+                    negation_starts.append(pos - len(keyword) + 1)
+                else:
+                    hits.append((pos + 1, pattern_id))
+
+        negation_starts.sort()
+        found: Dict[str, Dict[int, str]] = {}
+        weights: Dict[str, Dict[int, float]] = {}
+
+        for end, pattern_id in hits:
+            if self._is_negated(end, negation_starts):
+                continue
+            keyword, class_name, weight, order = patterns[pattern_id]
+            found.setdefault(class_name, {})[order] = keyword
+            weights.setdefault(class_name, {})[order] = weight
+
+        return LexiconMatch(
+            keywords={
+                class_name: [kw for _, kw in sorted(by_order.items())]
+                for class_name, by_order in found.items()
+            },
+            scores={
+                class_name: sum(by_order.values())
+                for class_name, by_order in weights.items()
+            }
+        )
+
+    def _is_negated(self, end: int, negation_starts: List[int]) -> bool:
+        """キーワード末尾から一定文字数以内に打ち消し表現が始まるか"""
+        if not negation_starts:
+            return False
+        i = bisect_left(negation_starts, end)
+        return i < len(negation_starts) and negation_starts[i] <= end + self.negation_window
+
+
+def _lexicon_path() -> Path:
+    """ユーザー辞書ファイルの場所（SELFCLAP_LEXICON で上書き可能）"""
+    path = os.environ.get("SELFCLAP_LEXICON")
+    return Path(path) if path else selfclap_home() / "lexicon.json"
+
+
+def _merge_user_lexicon(data: dict) -> Tuple[Dict[str, Dict[str, float]], List[str], int]:
+    """ユーザー辞書を標準の辞書に統合（"replace": true なら置き換え）
+
+    形式:
+        {
+            "classes": {"negative": {"しんどすぎ": 1.5}, "venting": ["会議"]},
+            "negations": ["とは思わない"],
+            "negation_window": 3,
+            "replace": false
+        }
+    """
+    replace = data.get("replace", False)
+
+    classes = {} if replace else {name: dict(kws) for name, kws in DEFAULT_CLASSES.items()}
+    for class_name, keywords in data.get("classes", {}).items():
+        if isinstance(keywords, list):
+            keywords = dict.fromkeys(keywords, 1.0)
+        classes.setdefault(class_name, {}).update(
+            {kw: float(weight) for kw, weight in keywords.items()}
+        )
+
+    negations = [] if replace else list(DEFAULT_NEGATIONS)
+    negations.extend(kw for kw in data.get("negations", []) if kw not in negations)
+
+    return classes, negations, int(data.get("negation_window", DEFAULT_NEGATION_WINDOW))
+
+
+@lru_cache(maxsize=8)
+def _load_lexicon(path: Optional[str], mtime: Optional[float]) -> Lexicon:
+    """辞書をコンパイル（パスと更新時刻ごとにキャッシュ）"""
+    if path is None:
+        return Lexicon(DEFAULT_CLASSES, DEFAULT_NEGATIONS, DEFAULT_NEGATION_WINDOW)
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return Lexicon(*_merge_user_lexicon(data))
+
+
+# 読み込めなかったユーザー辞書（同じ内容について警告を繰り返さない）
+_warned: set = set()
+
+
+def get_lexicon() -> Lexicon:
+    """現在の辞書を取得（ユーザー辞書があれば統合したもの）
+
+    ユーザー辞書が壊れている場合は警告を出して標準の辞書を使う。
+    """
+    path = _lexicon_path()
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return _load_lexicon(None, None)
+    try:
+        return _load_lexicon(str(path), mtime)
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        if (str(path), mtime) not in _warned:
+            _warned.add((str(path), mtime))
+            print(f"警告: 感情キーワード辞書 {path} を読み込めないため、標準の辞書を使います ({e})", file=sys.stderr)
+        return _load_lexicon(None, None)
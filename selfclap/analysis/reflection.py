@@ -1,11 +1,19 @@
 """振り返りモード用のデータ生成"""
 from datetime import date, timedelta
 from typing import Dict, List, Any
-from selfclap.database.queries import DiaryQueries, TaskQueries
+from selfclap.database.queries import DiaryQueries, RollupQueries, TaskQueries
+from selfclap.analysis.lexicon import get_lexicon
+
+
+# 成長記録の具体例として出す最近の件数
+RECENT_ITEMS_LIMIT = 5
 
 
 def generate_reflection_data() -> Dict[str, Any]:
-    """振り返り用データを生成"""
+    """振り返り用データを生成
+
+    全件は読み込まず、件数はCOUNTで、具体例は新しい順に上位だけ取得する。
+    """
     diary_db = DiaryQueries()
     task_db = TaskQueries()
 
@@ -13,33 +21,38 @@ def generate_reflection_data() -> Dict[str, Any]:
     last_30_days = today - timedelta(days=30)
     last_7_days = today - timedelta(days=7)
 
-    # 現在の状態
-    recent_entries = diary_db.get_entries_since(last_7_days)
-    recent_moods = [e.mood for e in recent_entries if e.mood]
-    recent_tasks = task_db.get_completed_tasks_since(last_7_days)
-
-    # 他人の評価を集計
-    external_feedback_list = [
-        e.external_feedback for e in recent_entries
-        if e.external_feedback
-    ]
-
-    # 自己評価を集計
-    self_assessment_list = [
-        e.self_assessment for e in recent_entries
-        if e.self_assessment
-    ]
-
-    # 過去の成長記録
-    all_entries = diary_db.get_all_entries()
-    learned_items = [e.learned_today for e in all_entries if e.learned_today]
-    compared_items = [e.compared_to_past for e in all_entries if e.compared_to_past]
-    invisible_growth_items = [e.invisible_growth for e in all_entries if e.invisible_growth]
-
-    # タスクの難易度変化分析
-    completed_tasks = task_db.get_completed_tasks_since(last_30_days)
+    # 現在の状態・他人の評価・自己評価（直近7日の日記を1回だけ読む）
+    lexicon = get_lexicon()
+    recent_moods = []
+    external_feedback_list = []
+    self_assessment_list = []
+    for entry in diary_db.iter_entries_since(
+        last_7_days, fields=("date", "mood", "external_feedback", "self_assessment")
+    ):
+        if entry.mood:
+            recent_moods.append(entry.mood)
+        if entry.external_feedback:
+            external_feedback_list.append(entry.external_feedback)
+        if entry.self_assessment:
+            self_assessment_list.append(entry.self_assessment)
+
+    rollup_db = RollupQueries()
+    recent_tasks_completed = rollup_db.get_period_summary(last_7_days)["completed_task_count"]
+
+    # 過去の成長記録（件数は全期間、具体例は最近のもの）
+    entry_counts = rollup_db.get_period_summary()
+    learned_items = diary_db.get_recent_field_values("learned_today", RECENT_ITEMS_LIMIT)
+    compared_items = diary_db.get_recent_field_values("compared_to_past", RECENT_ITEMS_LIMIT)
+    invisible_growth_items = diary_db.get_recent_field_values("invisible_growth", RECENT_ITEMS_LIMIT)
+
+    # タスクの難易度変化分析と学びの蓄積（直近30日の完了タスクを1回だけ読む）
     difficulty_improvements = []
-    for task in completed_tasks:
+    task_learnings = []
+    for task in task_db.iter_completed_tasks_since(
+        last_30_days, fields=("title", "difficulty_before", "difficulty_after", "learnings")
+    ):
+        if task.learnings:
+            task_learnings.append(task.learnings)
         if task.difficulty_before and task.difficulty_after:
             improvement = task.difficulty_before - task.difficulty_after
             if improvement > 0:
@@ -50,45 +63,42 @@ def generate_reflection_data() -> Dict[str, Any]:
                     "improvement": improvement
                 })
 
-    # 学びの蓄積
-    task_learnings = [t.learnings for t in completed_tasks if t.learnings]
-
     # データ不足チェック
-    data_gaps = check_data_gaps(all_entries, completed_tasks)
+    data_gaps = check_data_gaps(entry_counts, task_db.count_completed_gaps(last_30_days))
 
     return {
         "current_state": {
             "recent_moods": recent_moods,
-            "recent_tasks_completed": len(recent_tasks),
+            "recent_tasks_completed": recent_tasks_completed,
             "streak": calculate_streak(diary_db)
         },
         "external_vs_internal": {
             "external_feedback": external_feedback_list,
             "self_assessment": self_assessment_list,
-            "learned_count": len(learned_items),
-            "compared_count": len(compared_items),
-            "invisible_growth_count": len(invisible_growth_items)
+            "learned_count": entry_counts["learned_today"],
+            "compared_count": entry_counts["compared_to_past"],
+            "invisible_growth_count": entry_counts["invisible_growth"]
         },
         "visible_vs_invisible_growth": {
             "visible": {
-                "external_recognition": len([f for f in external_feedback_list if "良い" in f or "素晴らしい" in f])
+                "external_recognition": len([f for f in external_feedback_list if lexicon.scan(f).has("praise")])
             },
             "invisible": {
-                "learned_items": learned_items[-5:] if learned_items else [],
-                "compared_items": compared_items[-5:] if compared_items else [],
-                "invisible_growth": invisible_growth_items[-5:] if invisible_growth_items else [],
+                "learned_items": learned_items,
+                "compared_items": compared_items,
+                "invisible_growth": invisible_growth_items,
                 "difficulty_improvements": difficulty_improvements[:5]
             }
         },
         "learning_accumulation": {
-            "total_diary_learnings": len(learned_items),
+            "total_diary_learnings": entry_counts["learned_today"],
             "total_task_learnings": len(task_learnings),
-            "recent_learnings": (learned_items[-5:] if learned_items else []) + (task_learnings[-5:] if task_learnings else [])
+            "recent_learnings": learned_items + task_learnings[:RECENT_ITEMS_LIMIT]
         },
         "past_comparison": {
-            "total_entries": len(all_entries),
-            "total_tasks_completed": len(task_db.get_all_tasks()),
-            "comparison_records": compared_items[-5:] if compared_items else []
+            "total_entries": entry_counts["entry_count"],
+            "total_tasks_completed": task_db.count_completed(),
+            "comparison_records": compared_items
         },
         "data_gaps": data_gaps
     }
@@ -96,55 +106,50 @@ def generate_reflection_data() -> Dict[str, Any]:
 
 def calculate_streak(diary_db: DiaryQueries) -> int:
     """連続記録日数を計算"""
-    streak = 0
-    current = date.today()
-
-    while True:
-        entry = diary_db.get_entry_by_date(current)
-        if entry:
-            streak += 1
-            current -= timedelta(days=1)
-        else:
-            break
+    return diary_db.get_current_streak(date.today())
 
-    return streak
 
+def check_data_gaps(entry_counts: Dict[str, int], task_gaps: Dict[str, int]) -> Dict[str, List[str]]:
+    """データ不足をチェック
 
-def check_data_gaps(entries: List, tasks: List) -> Dict[str, List[str]]:
-    """データ不足をチェック"""
+    entry_counts: RollupQueries.get_period_summary() の結果
+    task_gaps: TaskQueries.count_completed_gaps() の結果
+    """
     gaps = {
         "missing_fields": [],
         "suggestions": []
     }
 
+    total_entries = entry_counts["entry_count"]
+
     # 日記のデータ不足チェック
-    entries_without_learning = [e for e in entries if not e.learned_today]
-    if len(entries_without_learning) > len(entries) * 0.5:
+    entries_without_learning = total_entries - entry_counts["learned_today"]
+    if entries_without_learning > total_entries * 0.5:
         gaps["missing_fields"].append("learned_today")
         gaps["suggestions"].append(
-            f"{len(entries_without_learning)}件の日記に「学んだこと」が未記入です"
+            f"{entries_without_learning}件の日記に「学んだこと」が未記入です"
         )
 
-    entries_without_comparison = [e for e in entries if not e.compared_to_past]
-    if len(entries_without_comparison) > len(entries) * 0.7:
+    entries_without_comparison = total_entries - entry_counts["compared_to_past"]
+    if entries_without_comparison > total_entries * 0.7:
         gaps["missing_fields"].append("compared_to_past")
         gaps["suggestions"].append(
-            f"{len(entries_without_comparison)}件の日記に「過去と比べてできたこと」が未記入です"
+            f"{entries_without_comparison}件の日記に「過去と比べてできたこと」が未記入です"
         )
 
     # タスクのデータ不足チェック
-    tasks_without_learning = [t for t in tasks if t.status == 'done' and not t.learnings]
-    if len(tasks_without_learning) > 0:
+    tasks_without_learning = task_gaps["without_learnings"]
+    if tasks_without_learning > 0:
         gaps["missing_fields"].append("task_learnings")
         gaps["suggestions"].append(
-            f"{len(tasks_without_learning)}個の完了タスクに「学び」が未記入です"
+            f"{tasks_without_learning}個の完了タスクに「学び」が未記入です"
         )
 
-    tasks_without_difficulty = [t for t in tasks if t.status == 'done' and not (t.difficulty_before and t.difficulty_after)]
-    if len(tasks_without_difficulty) > 0:
+    tasks_without_difficulty = task_gaps["without_difficulty"]
+    if tasks_without_difficulty > 0:
         gaps["missing_fields"].append("task_difficulty")
         gaps["suggestions"].append(
-            f"{len(tasks_without_difficulty)}個の完了タスクに「難易度」が未記入です"
+            f"{tasks_without_difficulty}個の完了タスクに「難易度」が未記入です"
         )
 
     return gaps
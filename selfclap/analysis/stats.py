@@ -0,0 +1,100 @@
+"""統計ダッシュボード用の集計"""
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from selfclap.database.connection import get_database
+from selfclap.database.filters import Filter
+from selfclap.database.queries import EmotionQueries, RollupQueries, TaskQueries
+
+
+# 成長データの充実度として数える項目
+GROWTH_FIELDS = [
+    "learned_today",
+    "compared_to_past",
+    "invisible_growth",
+    "external_feedback",
+    "self_assessment",
+]
+
+
+@dataclass
+class DifficultyChange:
+    """タスク1件分の難易度変化"""
+    task: str
+    before: int
+    after: int
+    improvement: int
+
+
+@dataclass
+class DashboardStats:
+    """統計ダッシュボードの集計結果"""
+    start_date: date
+    end_date: date
+    days: int
+
+    entry_count: int = 0
+    days_with_entries: int = 0
+    completed_task_count: int = 0
+
+    # 気分ごとの件数（多い順）
+    mood_counts: List[Tuple[str, int]] = field(default_factory=list)
+
+    # 成長データの項目ごとの記入数
+    field_counts: Dict[str, int] = field(default_factory=dict)
+
+    # 難易度変化（改善度の大きい順に上位のみ）
+    difficulty_changes: List[DifficultyChange] = field(default_factory=list)
+    difficulty_count: int = 0
+    avg_improvement: Optional[float] = None
+
+    # 感情検知の集計（analyzed: 解析済みの日記数, negative/venting/struggling: 検知された日数）
+    emotion_counts: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def mood_total(self) -> int:
+        return sum(count for _, count in self.mood_counts)
+
+    def fill_rate(self, field_name: str) -> float:
+        """項目の記入率（%）"""
+        total = self.entry_count or 1  # ゼロ除算回避
+        return self.field_counts.get(field_name, 0) / total * 100
+
+
+def compute_dashboard_stats(days: int, today: Optional[date] = None, where: Optional[Filter] = None) -> DashboardStats:
+    """過去days日間の統計を日ごとの集計テーブルから集計
+
+    where: compile_filter(..., "days") の条件に当てはまる日だけを集計する
+    """
+    rollup_db = RollupQueries()
+    task_db = TaskQueries()
+
+    end_date = today or date.today()
+    start_date = end_date - timedelta(days=days)
+
+    # 集計表の数字が食い違わないよう、全てのクエリで同じ時点のデータを読む
+    with get_database().snapshot():
+        period = rollup_db.get_period_summary(start_date, end_date, where)
+
+        return DashboardStats(
+            start_date=start_date,
+            end_date=end_date,
+            days=days,
+            entry_count=period["entry_count"],
+            days_with_entries=period["days_with_entries"],
+            completed_task_count=period["completed_task_count"],
+            mood_counts=rollup_db.get_mood_distribution(start_date, end_date, where),
+            field_counts={name: period[name] for name in GROWTH_FIELDS},
+            difficulty_changes=[
+                DifficultyChange(
+                    task=row["title"],
+                    before=row["before"],
+                    after=row["after"],
+                    improvement=row["improvement"],
+                )
+                for row in task_db.get_difficulty_changes(start_date, end_date, days=where)
+            ],
+            difficulty_count=period["difficulty_count"],
+            avg_improvement=period["avg_improvement"],
+            emotion_counts=EmotionQueries().get_summary(start_date, end_date, days=where),
+        )
@@ -1,27 +1,104 @@
 """SelfClap CLI エントリポイント"""
+import importlib
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 import typer
+from typer.core import TyperGroup
 from rich.console import Console
+from selfclap import tracing
+
+
+# サブコマンドグループ: 名前 → (モジュール, ヘルプ)
+# モジュールは実際にそのサブコマンドが呼ばれた時にだけimportする
+LAZY_SUBCOMMANDS: Dict[str, Tuple[str, str]] = {
+    "diary": ("selfclap.commands.diary", "📝 日記管理"),
+    "task": ("selfclap.commands.task", "✅ タスク管理"),
+    "stats": ("selfclap.commands.stats", "📊 統計ダッシュボード"),
+    "calendar": ("selfclap.commands.calendar", "📅 継続カレンダー"),
+    "import": ("selfclap.commands.importer", "📥 一括取り込み"),
+    "cohort": ("selfclap.commands.cohort", "👥 複数プロファイルの横断集計"),
+    "daemon": ("selfclap.commands.daemon", "⚡ 常駐プロセスの管理"),
+    "db": ("selfclap.commands.db", "🗄️ データベースの管理"),
+}
+
+
+class LazyGroup(TyperGroup):
+    """サブコマンドグループを必要になった時点で読み込むグループ"""
+
+    def list_commands(self, ctx) -> List[str]:
+        eager = [name for name in super().list_commands(ctx) if name not in LAZY_SUBCOMMANDS]
+        return list(LAZY_SUBCOMMANDS) + eager
+
+    def parse_args(self, ctx, args: List[str]) -> List[str]:
+        # サブコマンドの読み込みより前に計測を始める（import の時間も記録するため）
+        rest = super().parse_args(ctx, args)
+        if not ctx.resilient_parsing and tracing.active() is None:
+            trace_file = ctx.params.get("trace_file")
+            if trace_file or ctx.params.get("trace"):
+                tracing.start(trace_file)
+            else:
+                tracing.start_from_env()
+            if tracing.active() is not None:
+                ctx.call_on_close(tracing.stop)
+        return rest
+
+    def get_command(self, ctx, cmd_name: str):
+        if cmd_name in LAZY_SUBCOMMANDS and cmd_name not in self.commands:
+            module_name, help_text = LAZY_SUBCOMMANDS[cmd_name]
+            with tracing.phase("import", module_name):
+                module = importlib.import_module(module_name)
+            # コマンドが1つだけのアプリもグループとして扱う（clap stats show など）
+            group = typer.main.get_group(module.app)
+            group.name = cmd_name
+            group.help = help_text
+            self.add_command(group, cmd_name)
+        return super().get_command(ctx, cmd_name)
+
 
 # メインアプリ
 app = typer.Typer(
     name="clap",
     help="👏 誰も拍手してくれないなら、自分で拍手しよう",
     add_completion=False,
-    no_args_is_help=True
+    no_args_is_help=True,
+    cls=LazyGroup
 )
 
 console = Console()
 
 
-# サブコマンドは後で追加
-from selfclap.commands import diary, task, stats, calendar
+@app.callback()
+def main_callback(
+    profile: Optional[str] = typer.Option(
+        None, "--profile", help="使用するプロファイル（環境変数 SELFCLAP_PROFILE でも指定可）"
+    ),
+    trace: bool = typer.Option(
+        False, "--trace", help="実行したSQLと処理時間の集計を標準エラーに表示（環境変数 SELFCLAP_TRACE=1 でも可）"
+    ),
+    trace_file: Optional[Path] = typer.Option(
+        None, "--trace-file", help="実行したSQLと処理時間をJSON Linesで追記するファイル（SELFCLAP_TRACE=ファイル名 でも可）"
+    ),
+):
+    """全コマンド共通のオプション"""
+    # --trace / --trace-file はサブコマンドの読み込み前に LazyGroup.parse_args で処理する
+    from selfclap.config import set_active_profile
+
+    try:
+        set_active_profile(profile)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--profile")
 
+    # DBを使えなかった時に一時保存した書き込みがあれば、コマンドより先に反映する
+    from selfclap.database import spool
 
-# サブコマンドグループ登録
-app.add_typer(diary.app, name="diary", help="📝 日記管理")
-app.add_typer(task.app, name="task", help="✅ タスク管理")
-app.add_typer(stats.app, name="stats", help="📊 統計ダッシュボード")
-app.add_typer(calendar.app, name="calendar", help="📅 継続カレンダー")
+    if spool.has_pending():
+        applied, remaining = spool.drain_pending()
+        err_console = Console(stderr=True)
+        if applied:
+            err_console.print(f"[dim]⏳ 一時保存していた書き込み {applied}件を反映しました[/dim]")
+        if remaining:
+            err_console.print(f"[dim]⏳ 一時保存中の書き込み {remaining}件は、データベースを使えるようになったら反映します[/dim]")
 
 
 @app.command()
@@ -38,6 +115,68 @@ def listen():
     run_listen_mode()
 
 
+@app.command()
+def export(
+    fmt: str = typer.Option("jsonl", "--format", "-f", help="jsonl / csv / markdown"),
+    table: str = typer.Option("all", "--table", "-t", help="all / diary / tasks"),
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="出力先（省略時は標準出力、markdown はディレクトリ必須）"),
+    since: Optional[str] = typer.Option(None, "--since", help="この日付以降 (YYYY-MM-DD)"),
+    until: Optional[str] = typer.Option(None, "--until", help="この日付まで (YYYY-MM-DD)"),
+    compress: bool = typer.Option(False, "--gzip", "-z", help="gzipで圧縮して書き出す"),
+    where: Optional[str] = typer.Option(None, "--where", "-w", help="絞り込み条件 (例: 'mood=tired and has:learned')"),
+):
+    """📤 エクスポート - 日記・タスクをJSONL/CSV/Markdownに書き出す"""
+    from selfclap.commands.export import ExportError, console as err_console, run_export
+
+    try:
+        since_date = date.fromisoformat(since) if since else None
+        until_date = date.fromisoformat(until) if until else None
+    except ValueError:
+        err_console.print("[red]エラー: 日付はYYYY-MM-DD形式で指定してください[/red]")
+        raise typer.Exit(1)
+
+    try:
+        result = run_export(fmt, table, output, since_date, until_date, compress, where)
+    except ExportError as e:
+        err_console.print(f"[red]エラー: {e}[/red]")
+        raise typer.Exit(1)
+
+    files = f"（{result['files']}ファイル）" if "files" in result else ""
+    err_console.print(f"📤 [green]{result['rows']}件を書き出しました{files}[/green] → {result['destination']}")
+
+
+@app.command()
+def serve(
+    port: int = typer.Option(8765, "--port", help="待ち受けるポート（127.0.0.1のみ）"),
+    workers: int = typer.Option(4, "--workers", "-w", help="DB処理を実行するスレッド数"),
+):
+    """🌐 ローカルAPIサーバー - 日記・タスク・統計をJSONで返す"""
+    from selfclap.server import HOST, run_server, token_path
+
+    def on_ready(bound_port: int):
+        console.print(f"🌐 [green]http://{HOST}:{bound_port}[/green] で待ち受けています [dim](Ctrl+C で終了)[/dim]")
+        console.print(f"[dim]トークン: {token_path()}（Authorization: Bearer <トークン> で送ってください）[/dim]")
+
+    run_server(port, workers, on_ready)
+
+
+def load_command(args: List[str]):
+    """引数からコマンドを解決する（実行はしない）
+
+    呼び出しに必要なモジュールだけが読み込まれるので、import時間の計測にも使う。
+    """
+    command = typer.main.get_command(app)
+    ctx = command.make_context("clap", [], resilient_parsing=True)
+    for name in args:
+        if not hasattr(command, "get_command"):
+            break
+        sub_command = command.get_command(ctx, name)
+        if sub_command is None:
+            break
+        command = sub_command
+    return command
+
+
 def main():
     """エントリポイント"""
     app()
@@ -0,0 +1,201 @@
+"""clap のエントリポイント（常駐プロセスを使う場合の薄いクライアント）
+
+SELFCLAP_DAEMON が設定されていれば、起動済みの常駐プロセス（selfclap.daemon）に
+引数・必要な環境変数・標準入出力のファイルディスクリプタを渡してコマンドを実行してもらう。
+ソケットとそのディレクトリ・接続先のプロセスが自分のものと確かめられない場合は何も送らない。
+常駐プロセスがなければ起動だけしておき、今回はこのプロセス内で実行する。
+
+起動時間を短くするため、このモジュールでは組み込みの軽いモジュールしか読み込まない
+（json は re・enum を、socket は enum を読み込むので、marshal と _socket を使う）。
+"""
+import _socket
+import marshal
+import os
+import struct
+import sys
+
+# 常駐プロセスが応答を返すまでの接続タイムアウト（秒）
+CONNECT_TIMEOUT = 0.5
+
+# メッセージの長さ・終了コードを送るための形式
+HEADER = struct.Struct("!I")
+EXIT_STATUS = struct.Struct("!i")
+
+
+# メッセージの marshal 形式（クライアントと常駐プロセスのPythonが異なっても読めるよう固定）
+MARSHAL_VERSION = 4
+
+
+def daemon_enabled() -> bool:
+    value = os.environ.get("SELFCLAP_DAEMON", "")
+    return value not in ("", "0") and hasattr(_socket, "AF_UNIX") and hasattr(os, "fork")
+
+
+def socket_path() -> str:
+    """ユーザーごとのソケットのパス（他のユーザーからは開けないディレクトリに置く）"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "selfclap", "daemon.sock")
+    return os.path.join("/tmp", f"selfclap-{os.getuid()}", "daemon.sock")
+
+
+class UntrustedSocketError(OSError):
+    """ソケット・そのディレクトリ・接続先が自分のものでない（他のユーザーが先に作った可能性がある）"""
+
+
+# st_mode の種類（stat モジュールは読み込まない）
+_S_IFMT = 0o170000
+_S_IFDIR = 0o040000
+_S_IFSOCK = 0o140000
+
+
+def check_owned(path: str, directory: bool = False):
+    """path（ソケットかディレクトリ）が自分の所有で、シンボリックリンクではなく、グループ・他人の権限がないことを確かめる"""
+    st = os.lstat(path)
+    if st.st_mode & _S_IFMT != (_S_IFDIR if directory else _S_IFSOCK):
+        raise UntrustedSocketError(f"種類が違います: {path}")
+    if st.st_uid != os.getuid():
+        raise UntrustedSocketError(f"他のユーザーが所有しています: {path}")
+    if st.st_mode & 0o077:
+        raise UntrustedSocketError(f"グループ・他人に権限があります: {path}")
+
+
+def _check_peer(sock: _socket.socket):
+    """接続先のプロセスが自分と同じユーザーか（SO_PEERCRED がない環境ではファイルの確認だけに頼る）"""
+    peercred = getattr(_socket, "SO_PEERCRED", None)
+    if peercred is None:
+        return
+    _, uid, _ = struct.unpack("3i", sock.getsockopt(_socket.SOL_SOCKET, peercred, struct.calcsize("3i")))
+    if uid != os.getuid():
+        raise UntrustedSocketError("常駐プロセスが他のユーザーのものです")
+
+
+def connect(timeout: float = CONNECT_TIMEOUT) -> _socket.socket:
+    """常駐プロセスに接続する（自分のものと確かめられなければ UntrustedSocketError）"""
+    path = socket_path()
+    check_owned(os.path.dirname(path), directory=True)
+    check_owned(path)
+
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+        _check_peer(sock)
+    except OSError:
+        sock.close()
+        raise
+    sock.settimeout(None)
+    return sock
+
+
+# 常駐プロセスに渡す環境変数（APIキーなど、コマンドが使わないものは渡さない）
+FORWARDED_ENV = ("HOME", "TERM", "COLORTERM", "COLUMNS", "LINES", "NO_COLOR", "FORCE_COLOR", "LANG")
+FORWARDED_ENV_PREFIXES = ("SELFCLAP_", "XDG_", "LC_")
+
+
+def forwarded_env() -> dict:
+    return {
+        key: value for key, value in os.environ.items()
+        if key in FORWARDED_ENV or key.startswith(FORWARDED_ENV_PREFIXES)
+    }
+
+
+def encode_message(message: dict) -> bytes:
+    payload = marshal.dumps(message, MARSHAL_VERSION)
+    return HEADER.pack(len(payload)) + payload
+
+
+def send_message(sock: _socket.socket, message: dict, fds=()):
+    """メッセージを送る（fds はファイルディスクリプタとして一緒に渡す）"""
+    data = encode_message(message)
+    if fds:
+        rights = struct.pack(f"{len(fds)}i", *fds)
+        sent = sock.sendmsg([data], [(_socket.SOL_SOCKET, _socket.SCM_RIGHTS, rights)])
+    else:
+        sent = sock.send(data)
+    if sent < len(data):
+        sock.sendall(data[sent:])
+
+
+def _recv_exact(sock: _socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("常駐プロセスとの接続が切れました")
+        data += chunk
+    return data
+
+
+def request(op: str) -> dict:
+    """常駐プロセスに問い合わせる（ping: 状態 / stop: 停止）"""
+    sock = connect()
+    try:
+        send_message(sock, {"op": op})
+        length = HEADER.unpack(_recv_exact(sock, HEADER.size))[0]
+        return marshal.loads(_recv_exact(sock, length))
+    finally:
+        sock.close()
+
+
+def run_remote(sock: _socket.socket, argv) -> int:
+    """接続済みの常駐プロセスでコマンドを実行して終了コードを返す"""
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        send_message(sock, {
+            "op": "run",
+            "argv": list(argv),
+            "cwd": os.getcwd(),
+            "env": forwarded_env(),
+        }, fds=(0, 1, 2))
+
+        try:
+            status = _recv_exact(sock, EXIT_STATUS.size)
+        except KeyboardInterrupt:
+            # 接続を閉じると常駐プロセス側で実行中のコマンドに割り込みが送られる
+            return 130
+        return EXIT_STATUS.unpack(status)[0]
+    except OSError as e:
+        # 送信後はコマンドが実行済みかもしれないので、自プロセスでやり直さない
+        print(f"エラー: 常駐プロセスでの実行に失敗しました ({e})", file=sys.stderr)
+        return 1
+    finally:
+        sock.close()
+
+
+def spawn_daemon():
+    """常駐プロセスをバックグラウンドで起動"""
+    import subprocess
+
+    subprocess.Popen(
+        [sys.executable, "-m", "selfclap.daemon"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def main():
+    """エントリポイント"""
+    argv = sys.argv[1:]
+    # daemon コマンド自体（停止など）は常に自プロセスで実行する
+    if daemon_enabled() and argv[:1] != ["daemon"]:
+        try:
+            sock = connect()
+        except UntrustedSocketError as e:
+            # 他のユーザーが用意したソケットかもしれないので、何も送らずに自プロセスで実行する
+            print(f"警告: 常駐プロセスを使わずに実行します ({e})", file=sys.stderr)
+        except OSError:
+            # ソケットがない・古いソケットが残っている場合は起動しておき、今回は自プロセスで実行
+            spawn_daemon()
+        else:
+            sys.exit(run_remote(sock, argv))
+
+    from selfclap.cli import main as cli_main
+    cli_main()
+
+
+if __name__ == "__main__":
+    main()
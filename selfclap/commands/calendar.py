@@ -4,7 +4,7 @@ from typing import Optional
 import typer
 from rich.console import Console
 from rich.panel import Panel
-from selfclap.database.queries import DiaryQueries
+from selfclap.database.queries import DiaryQueries, RollupQueries
 
 app = typer.Typer(help="📅 カレンダー")
 console = Console()
@@ -39,9 +39,8 @@ def show(
     else:
         last_day = date(target_year, target_month + 1, 1) - timedelta(days=1)
 
-    # 日記エントリ取得
-    all_entries = diary_db.get_all_entries()
-    entry_dates = set([e.date for e in all_entries])
+    # 表示する月の日記の日付だけ日ごとの集計から取得
+    entry_dates = set(RollupQueries().get_entry_dates_between(first_day, last_day))
 
     # カレンダー生成
     console.print(f"\n[bold cyan]📅 日記カレンダー[/bold cyan] [dim]{target_year}年{target_month}月[/dim]\n")
@@ -100,34 +99,13 @@ def show(
     console.print("[bold green]●N[/bold green] 記録あり  [dim]NN[/dim] 記録なし  [bold green]★N[/bold green] 今日(記録あり)  [bold yellow]▶N[/bold yellow] 今日(記録なし)\n")
 
     # === 継続ストリーク計算 ===
-    # 今日から遡って連続記録日数を計算
-    current_streak = 0
-    check_date = today
-
-    while check_date in entry_dates:
-        current_streak += 1
-        check_date -= timedelta(days=1)
-
-    # 最長ストリーク計算
-    sorted_dates = sorted(entry_dates)
-    max_streak = 0
-    current_max = 0
-    prev_date = None
-
-    for entry_date in sorted_dates:
-        if prev_date is None:
-            current_max = 1
-        elif entry_date - prev_date == timedelta(days=1):
-            current_max += 1
-        else:
-            max_streak = max(max_streak, current_max)
-            current_max = 1
-        prev_date = entry_date
-
-    max_streak = max(max_streak, current_max)
+    # 連続記録テーブルから今日で終わる期間と最長期間を取得
+    current_streak = diary_db.get_current_streak(today)
+    max_streak = diary_db.get_longest_streak()
+    total_entries = diary_db.count_entries()
 
     # 今月の記録率
-    month_entries = [d for d in entry_dates if d.year == target_year and d.month == target_month]
+    month_entries = entry_dates
     days_in_month = (last_day - first_day).days + 1
     month_rate = (len(month_entries) / days_in_month) * 100
 
@@ -135,7 +113,7 @@ def show(
     streak_info = f"""[bold]🔥 現在の継続ストリーク:[/bold] {current_streak}日
 [bold]🏆 最長ストリーク:[/bold] {max_streak}日
 [bold]📊 今月の記録率:[/bold] {len(month_entries)}/{days_in_month}日 ({month_rate:.1f}%)
-[bold]📝 総日記数:[/bold] {len(entry_dates)}件"""
+[bold]📝 総日記数:[/bold] {total_entries}件"""
 
     console.print(Panel(streak_info, title="📈 統計情報", border_style="cyan"))
 
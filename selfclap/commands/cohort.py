@@ -0,0 +1,102 @@
+"""コホート（複数プロファイル）コマンド実装"""
+from datetime import date
+from pathlib import Path
+from typing import Dict, Optional
+import typer
+from rich.console import Console
+from selfclap.config import list_profiles, profiles_dir, resolve_db_path, validate_profile_name
+
+app = typer.Typer(help="👥 複数プロファイルの横断集計")
+console = Console()
+
+SORT_KEYS = ("name", "entries", "streak", "last")
+
+
+def _select_profiles(names: Optional[str]) -> Dict[str, Path]:
+    """--profiles の指定（カンマ区切り）、なければ既知の全プロファイル"""
+    if not names:
+        return list_profiles()
+
+    selected = {}
+    for name in (n.strip() for n in names.split(",")):
+        if name:
+            selected[validate_profile_name(name)] = resolve_db_path(name)
+    return selected
+
+
+@app.command("list")
+def list_cohort():
+    """既知のプロファイルを一覧表示"""
+    profiles = list_profiles()
+    if not profiles:
+        console.print(f"[yellow]プロファイルがありません[/yellow] [dim]({profiles_dir()})[/dim]")
+        return
+
+    for name, path in profiles.items():
+        console.print(f"  [cyan]{name}[/cyan]  [dim]{path}[/dim]")
+    console.print(f"\n合計: {len(profiles)}件")
+
+
+@app.command()
+def stats(
+    days: int = typer.Option(7, "--days", "-d", help="集計期間（日数）"),
+    profiles: Optional[str] = typer.Option(None, "--profiles", help="対象のプロファイル（カンマ区切り、省略時は全員）"),
+    workers: Optional[int] = typer.Option(None, "--workers", "-w", help="並列プロセス数（省略時は人数に応じて自動）"),
+    sort: str = typer.Option("name", "--sort", "-s", help="並び順 (name/entries/streak/last)"),
+):
+    """プロファイルごとの記録状況をまとめて表示"""
+    from rich.table import Table
+    from selfclap.analysis.cohort import compute_cohort_stats
+
+    if sort not in SORT_KEYS:
+        console.print(f"[red]エラー: --sort は {'/'.join(SORT_KEYS)} のいずれかです[/red]")
+        raise typer.Exit(1)
+
+    try:
+        selected = _select_profiles(profiles)
+    except ValueError as e:
+        console.print(f"[red]エラー: {e}[/red]")
+        raise typer.Exit(1)
+
+    if not selected:
+        console.print("[yellow]対象のプロファイルがありません[/yellow]")
+        return
+
+    results = compute_cohort_stats(selected, days, workers=workers)
+
+    if sort == "entries":
+        results.sort(key=lambda s: s.entry_count)
+    elif sort == "streak":
+        results.sort(key=lambda s: s.current_streak)
+    elif sort == "last":
+        results.sort(key=lambda s: s.last_entry_date or "")
+
+    table = Table(title=f"👥 コホートの記録状況（過去{days}日間）")
+    table.add_column("プロファイル", style="cyan")
+    table.add_column("日記", justify="right")
+    table.add_column("完了タスク", justify="right")
+    table.add_column("連続", justify="right", style="green")
+    table.add_column("最長", justify="right")
+    table.add_column("最終記録日", style="dim")
+
+    inactive = 0
+    for s in results:
+        if s.error:
+            table.add_row(s.profile, "-", "-", "-", "-", f"[red]{s.error}[/red]")
+            continue
+        if s.entry_count == 0:
+            inactive += 1
+        entries = f"[yellow]{s.entry_count}[/yellow]" if s.entry_count == 0 else str(s.entry_count)
+        table.add_row(
+            s.profile,
+            entries,
+            str(s.completed_task_count),
+            f"{s.current_streak}日",
+            f"{s.longest_streak}日",
+            s.last_entry_date or "-",
+        )
+
+    console.print(table)
+    console.print(f"\n合計: {len(results)}人 / 今日 ({date.today()}) まで")
+    if inactive:
+        console.print(f"[yellow]💬 過去{days}日間に記録のない人: {inactive}人[/yellow]")
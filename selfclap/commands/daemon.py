@@ -0,0 +1,65 @@
+"""常駐プロセスの管理コマンド実装"""
+import time
+import typer
+from rich.console import Console
+from selfclap import client
+
+app = typer.Typer(help="⚡ 常駐プロセスの管理")
+console = Console()
+
+# start で起動を待つ最大時間（秒）
+START_TIMEOUT = 5.0
+
+
+@app.command()
+def start():
+    """常駐プロセスを起動（起動済みなら何もしない）"""
+    try:
+        info = client.request("ping")
+        console.print(f"⚡ 起動済みです [dim](PID {info['pid']})[/dim]")
+        return
+    except OSError:
+        pass
+
+    client.spawn_daemon()
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        try:
+            info = client.request("ping")
+        except OSError:
+            continue
+        console.print(f"⚡ [green]常駐プロセスを起動しました[/green] [dim](PID {info['pid']})[/dim]")
+        if not client.daemon_enabled():
+            console.print("[dim]💡 clap から使うには環境変数 SELFCLAP_DAEMON=1 を設定してください[/dim]")
+        return
+
+    console.print("[red]エラー: 常駐プロセスを起動できませんでした[/red]")
+    raise typer.Exit(1)
+
+
+@app.command()
+def stop():
+    """常駐プロセスを停止"""
+    try:
+        client.request("stop")
+    except OSError:
+        console.print("[yellow]常駐プロセスは起動していません[/yellow]")
+        return
+    console.print("⚡ 常駐プロセスを停止しました")
+
+
+@app.command()
+def status():
+    """常駐プロセスの状態を表示"""
+    try:
+        info = client.request("ping")
+    except OSError:
+        console.print("[yellow]常駐プロセスは起動していません[/yellow]")
+        return
+
+    console.print(f"⚡ [green]起動中[/green] (PID {info['pid']}, v{info['version']})")
+    console.print(f"  起動からの時間: {info['uptime']:.0f}秒")
+    console.print(f"  実行したコマンド: {info['served']}件（実行中 {info['running']}件）")
+    console.print(f"  自動終了まで待つ時間: {info['idle_timeout']:.0f}秒")
+    console.print(f"  [dim]{client.socket_path()}[/dim]")
@@ -0,0 +1,58 @@
+"""データベース管理コマンド実装"""
+from typing import Optional
+import typer
+from rich.console import Console
+from selfclap.commands.listing import parse_where_option
+from selfclap.database.queries import RollupQueries
+
+app = typer.Typer(help="🗄️ データベースの管理")
+console = Console()
+
+
+@app.command("rebuild-rollups")
+def rebuild_rollups():
+    """日ごとの集計テーブルを日記・タスクから作り直す
+
+    通常はトリガーで自動的に更新されるため、DBを直接編集した場合などに使う。
+    """
+    with console.status("集計テーブルを作り直しています..."):
+        count = RollupQueries().rebuild()
+    console.print(f"🗄️ [green]集計テーブルを作り直しました[/green] ({count}日分)")
+
+
+@app.command("explain")
+def explain(
+    target: str = typer.Argument(..., help="対象 (diary/tasks/days)"),
+    where: Optional[str] = typer.Option(None, "--where", "-w", help="絞り込み条件"),
+):
+    """絞り込み条件から作られるSQLと、SQLiteの実行計画（インデックスを使うか）を表示"""
+    from rich.markup import escape
+    from selfclap.database.filters import TARGETS, listing_query
+    from selfclap.database.queries import explain_query_plan
+
+    if target not in TARGETS:
+        raise typer.BadParameter(f"{'/'.join(TARGETS)} のいずれかです", param_hint="TARGET")
+    sql, params = listing_query(target, parse_where_option(where, target))
+
+    console.print(f"[bold]SQL:[/bold] {escape(sql)}")
+    if params:
+        console.print(f"[bold]パラメータ:[/bold] {escape(repr(params))}")
+    console.print("[bold]実行計画:[/bold]")
+    for line in explain_query_plan(sql, params):
+        console.print(f"  {escape(line)}")
+
+
+@app.command("version")
+def version():
+    """スキーマのバージョンと、適用済みのマイグレーションを表示
+
+    マイグレーションはDBを開いた時に自動で適用される。
+    """
+    from selfclap.database.connection import SCHEMA_VERSION, get_database
+
+    db = get_database()
+    current = db.schema_version()
+    console.print(f"🗄️ スキーマのバージョン: [bold]{current}[/bold] (このバージョンの selfclap: {SCHEMA_VERSION})")
+    for target, description, _ in db.migrations():
+        mark = "[green]✓[/green]" if target <= current else "[dim]-[/dim]"
+        console.print(f"  {mark} {target}: {description}")
@@ -1,15 +1,20 @@
 """日記コマンド実装"""
+import sqlite3
 from datetime import date, datetime
 from typing import Optional
 import typer
 from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from selfclap.database.queries import DiaryQueries
+from selfclap import tracing
+from selfclap.commands.listing import DEFAULT_PAGE_SIZE, paginate, parse_date_option, parse_where_option, resolve_period
+from selfclap.database import spool
+from selfclap.database.queries import DiaryQueries, SNIPPET_MARK_START, SNIPPET_MARK_END
 
 app = typer.Typer(help="📝 日記管理")
 console = Console()
 
+# 一覧に表示する本文の文字数
+PREVIEW_LENGTH = 50
+
 
 @app.command("write")
 def write(
@@ -22,60 +27,76 @@ def write(
     self_eval: Optional[str] = typer.Option(None, "--self-eval", "-s", help="自己評価"),
 ):
     """日記を書く"""
-    db = DiaryQueries()
     today = date.today()
 
     try:
-        entry = db.create_entry(
-            entry_date=today,
-            content=content,
-            mood=mood,
-            learned_today=learned,
-            compared_to_past=compared,
-            invisible_growth=invisible,
-            external_feedback=external,
-            self_assessment=self_eval
+        entry = spool.submit(spool.DIARY_CREATE, {
+            "date": today.isoformat(),
+            "content": content,
+            "mood": mood,
+            "learned_today": learned,
+            "compared_to_past": compared,
+            "invisible_growth": invisible,
+            "external_feedback": external,
+            "self_assessment": self_eval,
+        })
+    except sqlite3.IntegrityError:
+        # 日付はUNIQUEなので、今日の日記が既にある
+        console.print(f"[red]エラー: {today} の日記は既にあります（追記は clap diary update {today}）[/red]")
+        raise typer.Exit(1)
+
+    # 感情検知とモード推薦
+    from selfclap.prompts.emotion_detect import detect_emotional_content, generate_mode_recommendation
+
+    emotion_data = detect_emotional_content(content)
+
+    if entry is None:
+        # DBを使えなかったので一時保存した（感情検知の結果は反映する時に保存する）
+        console.print(
+            f"⏳ [yellow]データベースに書き込めなかったため、日記を一時保存しました[/yellow] ({today})\n"
+            "[dim]次にコマンドを実行した時に書き込まれます[/dim]"
         )
+    else:
         console.print(f"✅ [green]日記を保存しました![/green] ({entry.date})")
 
-        # 感情検知とモード推薦
-        from selfclap.prompts.emotion_detect import detect_emotional_content, generate_mode_recommendation
-
-        emotion_data = detect_emotional_content(content)
-
-        # モード推薦の表示
-        if emotion_data["recommended_mode"]:
-            recommendation = generate_mode_recommendation(emotion_data, content)
-            console.print(recommendation)
-
-        # AI自動分類プロンプト出力
-        if not any([learned, compared, invisible, external, self_eval]):
-            # 愚痴や不満の場合は分類をスキップ（傾聴/振り返りを優先）
-            if emotion_data["is_venting"]:
-                console.print("\n[dim]💡 感情を吐き出すことも大切です。分類は不要です。[/dim]\n")
-            else:
-                from selfclap.prompts.auto_classify import generate_diary_classification_prompt
-                from rich.panel import Panel
-
-                classification_prompt = generate_diary_classification_prompt(content, entry.date)
-
-                console.print("\n")
-                console.print(Panel(
-                    classification_prompt,
-                    title="🤖 Claude Code: 自動分類をお願いします",
-                    border_style="cyan",
-                    subtitle="このプロンプトに従って分類してください"
-                ))
-        else:
-            console.print("\n[dim]💡 すでに分類情報が含まれています[/dim]\n")
+        from selfclap.analysis.emotions import save_entry_emotion
+        save_entry_emotion(entry.id, emotion_data)
+
+        from selfclap.analysis.cache import prewarm_in_background
+        prewarm_in_background()
+
+    # モード推薦の表示
+    if emotion_data["recommended_mode"]:
+        recommendation = generate_mode_recommendation(emotion_data, content)
+        console.print(recommendation)
 
-    except Exception as e:
-        console.print(f"[red]エラー: {e}[/red]")
+    # AI自動分類プロンプト出力
+    if not any([learned, compared, invisible, external, self_eval]):
+        # 愚痴や不満の場合は分類をスキップ（傾聴/振り返りを優先）
+        if emotion_data["is_venting"]:
+            console.print("\n[dim]💡 感情を吐き出すことも大切です。分類は不要です。[/dim]\n")
+        else:
+            from selfclap.prompts.auto_classify import generate_diary_classification_prompt
+            from rich.panel import Panel
+
+            classification_prompt = generate_diary_classification_prompt(content, today)
+
+            console.print("\n")
+            console.print(Panel(
+                classification_prompt,
+                title="🤖 Claude Code: 自動分類をお願いします",
+                border_style="cyan",
+                subtitle="このプロンプトに従って分類してください"
+            ))
+    else:
+        console.print("\n[dim]💡 すでに分類情報が含まれています[/dim]\n")
 
 
 @app.command("show")
 def show(target_date: Optional[str] = typer.Argument(None, help="日付 (YYYY-MM-DD)")):
     """日記を表示"""
+    from rich.panel import Panel
+
     db = DiaryQueries()
 
     if target_date:
@@ -126,45 +147,147 @@ def show(target_date: Optional[str] = typer.Argument(None, help="日付 (YYYY-MM
     if entry.self_assessment:
         content += f"\n🪞 自己評価:\n{entry.self_assessment}\n"
 
-    console.print(Panel(content, title="📝 日記", border_style="cyan"))
+    with tracing.phase("render"):
+        console.print(Panel(content, title="📝 日記", border_style="cyan"))
 
 
 @app.command("list")
 def list_entries(
-    month: Optional[int] = typer.Option(None, "--month", "-m", help="月を指定 (1-12)"),
-    all: bool = typer.Option(False, "--all", "-a", help="全期間表示")
+    month: Optional[int] = typer.Option(None, "--month", "-m", min=1, max=12, help="月を指定 (1-12、--year がなければ今年)"),
+    year: Optional[int] = typer.Option(None, "--year", "-y", help="年を指定"),
+    since: Optional[str] = typer.Option(None, "--since", help="この日付以降 (YYYY-MM-DD)"),
+    until: Optional[str] = typer.Option(None, "--until", help="この日付以前 (YYYY-MM-DD)"),
+    after: Optional[str] = typer.Option(None, "--after", help="この日付より前から表示 (YYYY-MM-DD、ページ送り用)"),
+    limit: int = typer.Option(DEFAULT_PAGE_SIZE, "--limit", "-n", min=1, help="1ページの件数"),
+    all: bool = typer.Option(False, "--all", "-a", help="全期間表示"),
+    where: Optional[str] = typer.Option(None, "--where", "-w", help="絞り込み条件 (例: 'mood in (tired,stressed) and has:learned')"),
 ):
-    """日記一覧を表示"""
+    """日記一覧を表示（指定がなければ今月、新しい順）"""
+    from rich.table import Table
+
+    start_date, end_date = resolve_period(
+        year, month,
+        parse_date_option(since, "--since"), parse_date_option(until, "--until"),
+        default_this_month=not all,
+    )
+    after_date = parse_date_option(after, "--after")
+    condition = parse_where_option(where, "diary")
+
     db = DiaryQueries()
 
-    if all:
-        entries = db.get_all_entries()
-    elif month:
-        today = date.today()
-        start_date = date(today.year, month, 1)
-        entries = [e for e in db.get_all_entries() if e.date.month == month]
-    else:
-        # 今月
-        today = date.today()
-        start_date = date(today.year, today.month, 1)
-        entries = db.get_entries_since(start_date)
+    def fetch_page(cursor):
+        # 一覧に必要な列だけ読み、本文は抜粋の長さだけ取得する
+        return db.get_entries_page(
+            start_date, end_date, after=cursor, limit=limit,
+            fields=("date", "mood", "content"), preview=PREVIEW_LENGTH, where=condition
+        )
+
+    def render(entries, first):
+        table = Table(title="📝 日記一覧" if first else None)
+        table.add_column("日付", style="cyan", no_wrap=True)
+        table.add_column("気分", style="magenta")
+        table.add_column("内容（抜粋）", style="white")
 
-    if not entries:
+        for entry in entries:
+            mood = entry.mood or "-"
+            preview = entry.content[:PREVIEW_LENGTH] + "..." if len(entry.content) > PREVIEW_LENGTH else entry.content
+            table.add_row(str(entry.date), mood, preview)
+
+        console.print(table)
+
+    shown = paginate(console, fetch_page, render, after_date, limit)
+    if not shown:
         console.print("[yellow]日記がありません[/yellow]")
         return
 
-    table = Table(title="📝 日記一覧")
+    console.print(f"\n[dim]表示: {shown}件[/dim]")
+
+
+@app.command("search")
+def search(
+    query: str = typer.Argument(..., help="検索語（空白区切りで全ての語を含むものを検索）"),
+    mood: Optional[str] = typer.Option(None, "--mood", "-m", help="気分で絞り込み"),
+    since: Optional[str] = typer.Option(None, "--since", help="この日付以降 (YYYY-MM-DD)"),
+    until: Optional[str] = typer.Option(None, "--until", help="この日付以前 (YYYY-MM-DD)"),
+    limit: int = typer.Option(20, "--limit", "-n", help="最大表示件数"),
+):
+    """日記を全文検索"""
+    from rich.markup import escape
+    from rich.table import Table
+
+    db = DiaryQueries()
+
+    try:
+        since_date = datetime.strptime(since, "%Y-%m-%d").date() if since else None
+        until_date = datetime.strptime(until, "%Y-%m-%d").date() if until else None
+    except ValueError:
+        console.print("[red]エラー: 日付はYYYY-MM-DD形式で指定してください[/red]")
+        return
+
+    results = db.search_entries(query, since=since_date, until=until_date, mood=mood, limit=limit)
+
+    if not results:
+        console.print(f"[yellow]「{escape(query)}」に一致する日記はありません[/yellow]")
+        return
+
+    table = Table(title=f"🔎 日記検索: {escape(query)}")
     table.add_column("日付", style="cyan", no_wrap=True)
     table.add_column("気分", style="magenta")
-    table.add_column("内容（抜粋）", style="white")
+    table.add_column("該当箇所", style="white")
+
+    for entry, snippet in results:
+        table.add_row(str(entry.date), entry.mood or "-", _highlight(snippet))
+
+    with tracing.phase("render"):
+        console.print(table)
+    console.print(f"\n[dim]{len(results)}件[/dim]")
 
-    for entry in entries:
-        mood = entry.mood or "-"
-        preview = entry.content[:50] + "..." if len(entry.content) > 50 else entry.content
-        table.add_row(str(entry.date), mood, preview)
 
-    console.print(table)
-    console.print(f"\n[dim]合計: {len(entries)}件[/dim]")
+def _highlight(snippet: str) -> str:
+    """検索結果の抜粋のヒット箇所を強調表示"""
+    from rich.markup import escape
+
+    return (
+        escape(snippet.replace("\n", " "))
+        .replace(SNIPPET_MARK_START, "[bold yellow]")
+        .replace(SNIPPET_MARK_END, "[/bold yellow]")
+    )
+
+
+@app.command("analyze")
+def analyze(
+    backfill: bool = typer.Option(False, "--backfill", help="未解析の日記をまとめて解析して保存"),
+    batch_size: int = typer.Option(500, "--batch-size", help="1回に読み込んで書き込む件数"),
+    workers: Optional[int] = typer.Option(None, "--workers", "-w", help="並列プロセス数（デフォルト: CPU数）"),
+):
+    """過去の日記の感情検知を実行（辞書を変更した後の再解析にも使う）"""
+    from selfclap.analysis.emotions import backfill as run_backfill
+    from selfclap.analysis.lexicon import get_lexicon
+    from selfclap.database.queries import EmotionQueries
+
+    pending = EmotionQueries().count_pending(get_lexicon().version)
+
+    if not backfill:
+        console.print(f"未解析の日記: {pending}件")
+        if pending:
+            console.print("[dim]コマンド: clap diary analyze --backfill[/dim]")
+        return
+
+    if not pending:
+        console.print("[green]全ての日記が解析済みです[/green]")
+        return
+
+    from rich.progress import Progress
+
+    with Progress(console=console) as progress:
+        bar = progress.add_task("感情を解析中...", total=pending)
+        analyzed = run_backfill(
+            batch_size=batch_size,
+            workers=workers,
+            on_progress=lambda n: progress.advance(bar, n)
+        )
+
+    console.print(f"✅ [green]{analyzed}件の日記を解析しました[/green]")
 
 
 @app.command("update")
@@ -0,0 +1,255 @@
+"""エクスポートコマンド実装
+
+行は fetchmany で少しずつ読み、読んだ端から書き出すので、件数が増えてもメモリ使用量は一定。
+"""
+import csv
+import gzip
+import heapq
+import json
+import sys
+from contextlib import contextmanager
+from datetime import date
+from itertools import groupby
+from pathlib import Path
+from typing import Callable, Dict, IO, Iterator, List, Optional, Tuple
+from rich.console import Console
+from selfclap.database.filters import Filter, FilterError, compile_filter
+from selfclap.database.queries import DiaryQueries, TaskQueries
+
+# 進捗・結果は標準エラーに出す（標準出力はエクスポート先に使える）
+console = Console(stderr=True)
+
+FORMATS = ("jsonl", "csv", "markdown")
+TABLES = ("all", "diary", "tasks")
+
+# fetchmany で一度に読み込む件数
+CHUNK_SIZE = 500
+
+
+class ExportError(ValueError):
+    """エクスポートの指定が不正"""
+
+
+@contextmanager
+def _open_output(path: Optional[Path], compress: bool) -> Iterator[IO[str]]:
+    """書き出し先を開く（path が None なら標準出力）"""
+    if path is None:
+        if compress:
+            with gzip.open(sys.stdout.buffer, "wt", encoding="utf-8", newline="") as f:
+                yield f
+        else:
+            yield sys.stdout
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if compress:
+        with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+            yield f
+    else:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            yield f
+
+
+def _with_suffix(path: Path, compress: bool) -> Path:
+    """圧縮する場合は .gz を付ける（既に付いていればそのまま）"""
+    if not compress or path.suffix == ".gz":
+        return path
+    return path.with_name(path.name + ".gz")
+
+
+def _table_streams(
+    tables: List[str],
+    since: Optional[date],
+    until: Optional[date],
+    filters: Optional[Dict[str, Filter]] = None
+) -> List[Tuple[str, Tuple[str, ...], Iterator]]:
+    """(種別, 列名, 行のイテレータ) のリスト（filters: テーブルごとの --where の条件）"""
+    filters = filters or {}
+    streams = []
+    if "diary" in tables:
+        rows = DiaryQueries().stream_rows(since, until, CHUNK_SIZE, where=filters.get("diary"))
+        streams.append(("diary", DiaryQueries.EXPORT_FIELDS, rows))
+    if "tasks" in tables:
+        rows = TaskQueries().stream_rows(since, until, CHUNK_SIZE, where=filters.get("tasks"))
+        streams.append(("task", TaskQueries.EXPORT_FIELDS, rows))
+    return streams
+
+
+def export_jsonl(
+    out: IO[str],
+    tables: List[str],
+    since: Optional[date],
+    until: Optional[date],
+    on_row: Callable[[], None],
+    filters: Optional[Dict[str, Filter]] = None
+):
+    """1行1レコードのJSONで書き出す（各行に "type": "diary" / "task" を付ける）"""
+    for record_type, _, rows in _table_streams(tables, since, until, filters):
+        for row in rows:
+            out.write(json.dumps({"type": record_type, **dict(row)}, ensure_ascii=False))
+            out.write("\n")
+            on_row()
+
+
+def export_csv(out: IO[str], fieldnames: Tuple[str, ...], rows: Iterator, on_row: Callable[[], None]):
+    """1テーブル分をCSVで書き出す"""
+    writer = csv.writer(out)
+    writer.writerow(fieldnames)
+    for row in rows:
+        writer.writerow(row)
+        on_row()
+
+
+def _render_markdown(day: str, entry, tasks: List) -> str:
+    """1日分のMarkdown"""
+    lines = [f"# {day}", ""]
+
+    if entry is not None:
+        meta = []
+        if entry["mood"]:
+            meta.append(f"気分: {entry['mood']}")
+        if entry["energy_level"] is not None:
+            meta.append(f"エネルギー: {entry['energy_level']}/5")
+        if meta:
+            lines += [" / ".join(meta), ""]
+
+        lines += [entry["content"], ""]
+
+        sections = [
+            ("learned_today", "📚 学んだこと"),
+            ("compared_to_past", "📈 過去と比べて"),
+            ("invisible_growth", "🌱 見えない成長"),
+            ("external_feedback", "👥 他人の評価"),
+            ("self_assessment", "🪞 自己評価"),
+            ("challenges_faced", "🧗 直面した困難"),
+            ("how_overcome", "💡 乗り越え方"),
+        ]
+        for key, heading in sections:
+            if entry[key]:
+                lines += [f"## {heading}", "", entry[key], ""]
+
+    if tasks:
+        lines += ["## ✅ 完了したタスク", ""]
+        for task in tasks:
+            line = f"- {task['title']}"
+            if task["difficulty_before"] and task["difficulty_after"]:
+                line += f"（難易度 {task['difficulty_before']} → {task['difficulty_after']}）"
+            lines.append(line)
+            if task["learnings"]:
+                lines.append(f"  - 学び: {task['learnings']}")
+        lines.append("")
+
+    return "\n".join(lines)
+
+
+def export_markdown(
+    out_dir: Path,
+    since: Optional[date],
+    until: Optional[date],
+    tables: List[str],
+    compress: bool,
+    on_row: Callable[[], None],
+    filters: Optional[Dict[str, Filter]] = None
+) -> int:
+    """1日1ファイルのMarkdownで書き出す（日記と、その日に完了したタスク）
+
+    日付順に並んだ2つのストリームを突き合わせるので、1日分ずつしかメモリに載らない。
+    戻り値: 書き出したファイル数
+    """
+    filters = filters or {}
+    streams = []
+    if "diary" in tables:
+        streams.append(
+            (row["date"], "diary", row)
+            for row in DiaryQueries().stream_rows(since, until, CHUNK_SIZE, where=filters.get("diary"))
+        )
+    if "tasks" in tables:
+        streams.append(
+            (row["completed_date"], "task", row)
+            for row in TaskQueries().stream_rows(
+                since, until, CHUNK_SIZE, date_column="completed_date", where=filters.get("tasks")
+            )
+        )
+
+    merged = heapq.merge(*streams, key=lambda item: item[0])
+    files = 0
+    for day, items in groupby(merged, key=lambda item: item[0]):
+        entry = None
+        tasks = []
+        for _, record_type, row in items:
+            if record_type == "diary":
+                entry = row
+            else:
+                tasks.append(row)
+            on_row()
+
+        path = _with_suffix(out_dir / f"{day}.md", compress)
+        with _open_output(path, compress) as out:
+            out.write(_render_markdown(day, entry, tasks))
+        files += 1
+
+    return files
+
+
+def run_export(
+    fmt: str,
+    table: str,
+    output: Optional[Path],
+    since: Optional[date],
+    until: Optional[date],
+    compress: bool,
+    where: Optional[str] = None
+) -> Dict[str, object]:
+    """エクスポートを実行して結果（件数・書き出し先）を返す
+
+    jsonl: output はファイル（省略時は標準出力）
+    csv: テーブルが1つなら output はファイル（省略時は標準出力）、両方ならディレクトリ
+    markdown: output はディレクトリ（必須）
+    where: 絞り込み条件の式（対象の各テーブルの項目で解釈する）
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f"--format は {'/'.join(FORMATS)} のいずれかです")
+    if table not in TABLES:
+        raise ExportError(f"--table は {'/'.join(TABLES)} のいずれかです")
+    if since and until and since > until:
+        raise ExportError("--since は --until 以前の日付を指定してください")
+
+    tables = ["diary", "tasks"] if table == "all" else [table]
+    filters = {}
+    if where:
+        for name in tables:
+            try:
+                filters[name] = compile_filter(where, name)
+            except FilterError as e:
+                raise ExportError(f"--where（{name}）: {e}")
+
+    counter = {"rows": 0}
+
+    def on_row():
+        counter["rows"] += 1
+
+    if fmt == "jsonl":
+        path = _with_suffix(output, compress) if output else None
+        with _open_output(path, compress) as out:
+            export_jsonl(out, tables, since, until, on_row, filters)
+        return {"rows": counter["rows"], "destination": str(path or "標準出力")}
+
+    if fmt == "csv":
+        if len(tables) == 1:
+            path = _with_suffix(output, compress) if output else None
+            with _open_output(path, compress) as out:
+                _, fieldnames, rows = _table_streams(tables, since, until, filters)[0]
+                export_csv(out, fieldnames, rows, on_row)
+            return {"rows": counter["rows"], "destination": str(path or "標準出力")}
+
+        if output is None:
+            raise ExportError("CSVで両方のテーブルを書き出す場合は --output に出力先ディレクトリを指定してください")
+        for (_, fieldnames, rows), name in zip(_table_streams(tables, since, until, filters), tables):
+            with _open_output(_with_suffix(output / f"{name}.csv", compress), compress) as out:
+                export_csv(out, fieldnames, rows, on_row)
+        return {"rows": counter["rows"], "destination": str(output)}
+
+    if output is None:
+        raise ExportError("Markdownの場合は --output に出力先ディレクトリを指定してください")
+    files = export_markdown(output, since, until, tables, compress, on_row, filters)
+    return {"rows": counter["rows"], "files": files, "destination": str(output)}
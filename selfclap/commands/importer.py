@@ -0,0 +1,217 @@
+"""一括取り込みコマンド実装"""
+import csv
+import json
+import typing
+from dataclasses import fields
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import typer
+from rich.console import Console
+from selfclap.database.models import DiaryEntry, Task
+from selfclap.database.queries import DiaryQueries, TaskQueries
+
+app = typer.Typer(help="📥 過去データの一括取り込み")
+console = Console()
+
+# エラー内容を表示する最大件数
+MAX_REPORTED_ERRORS = 10
+
+TASK_STATUSES = ("todo", "in_progress", "done")
+TASK_PRIORITIES = ("low", "medium", "high")
+
+
+class InvalidRecord(ValueError):
+    """取り込めない行"""
+
+
+def _field_types(model) -> Dict[str, type]:
+    """データモデルの項目名 → 型（Optionalを外したもの）"""
+    hints = typing.get_type_hints(model)
+    types = {}
+    for f in fields(model):
+        args = [a for a in typing.get_args(hints[f.name]) if a is not type(None)]
+        types[f.name] = args[0] if args else hints[f.name]
+    return types
+
+
+def _convert(record: dict, field_types: Dict[str, type], allowed: Tuple[str, ...]) -> dict:
+    """1行分の値をデータモデルの型に変換（空文字はNone扱い）"""
+    values = {}
+    for name in allowed:
+        value = record.get(name)
+        if value is None or value == "":
+            values[name] = None
+            continue
+
+        expected = field_types[name]
+        try:
+            if expected is date:
+                values[name] = date.fromisoformat(str(value))
+            elif expected is int:
+                values[name] = int(value)
+            elif expected is float:
+                values[name] = float(value)
+            else:
+                values[name] = str(value)
+        except ValueError:
+            raise InvalidRecord(f"{name} の値が不正です: {value!r}")
+
+    return values
+
+
+def validate_diary(record: dict) -> dict:
+    """日記1行分を検証して書き込み用の値に変換"""
+    values = _convert(record, _field_types(DiaryEntry), DiaryQueries.IMPORT_FIELDS)
+
+    for required in ("date", "content"):
+        if values[required] is None:
+            raise InvalidRecord(f"{required} は必須です")
+
+    return values
+
+
+def validate_task(record: dict) -> dict:
+    """タスク1行分を検証して書き込み用の値に変換"""
+    values = _convert(record, _field_types(Task), TaskQueries.IMPORT_FIELDS)
+
+    for required in ("title", "created_date"):
+        if values[required] is None:
+            raise InvalidRecord(f"{required} は必須です")
+
+    values["status"] = values["status"] or "todo"
+    values["priority"] = values["priority"] or "medium"
+    if values["status"] not in TASK_STATUSES:
+        raise InvalidRecord(f"status は {'/'.join(TASK_STATUSES)} のいずれかです: {values['status']!r}")
+    if values["priority"] not in TASK_PRIORITIES:
+        raise InvalidRecord(f"priority は {'/'.join(TASK_PRIORITIES)} のいずれかです: {values['priority']!r}")
+
+    return values
+
+
+def read_records(path: Path, fmt: Optional[str]) -> Iterator[Tuple[int, dict]]:
+    """JSONL/CSVを1行ずつ読み込んで (行番号, 値) を返す"""
+    fmt = fmt or ("csv" if path.suffix.lower() == ".csv" else "jsonl")
+
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_no, {"__error__": f"JSONとして読めません: {e}"}
+                    continue
+                yield line_no, record if isinstance(record, dict) else {"__error__": "オブジェクトではありません"}
+
+
+def _valid_rows(
+    records: Iterator[Tuple[int, dict]],
+    record_type: str,
+    validate,
+    errors: List[Tuple[int, str]],
+    strict: bool
+):
+    """検証を通った行だけを返し、通らなかった行は errors に記録
+
+    clap export の JSONL のように "type" 列がある場合は、record_type 以外の行を読み飛ばす。
+    """
+    for line_no, record in records:
+        if record.get("type") not in (None, "", record_type):
+            continue
+        try:
+            if "__error__" in record:
+                raise InvalidRecord(record["__error__"])
+            yield validate(record)
+        except InvalidRecord as e:
+            if strict:
+                raise InvalidRecord(f"{line_no}行目: {e}")
+            errors.append((line_no, str(e)))
+
+
+def _run_import(label: str, write) -> Optional[Tuple[int, int]]:
+    """進捗を表示しながら書き込みを実行"""
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+
+    try:
+        with Progress(SpinnerColumn(), TextColumn("{task.description}"), console=console) as progress:
+            bar = progress.add_task(f"{label}を取り込み中...", total=None)
+
+            def on_progress(processed: int, written: int):
+                progress.update(bar, description=f"{label}を取り込み中... {processed}件")
+
+            return write(on_progress)
+    except InvalidRecord as e:
+        # 書き込みは1トランザクションなので、途中までの行もロールバックされている
+        console.print(f"[red]エラー: {e}（何も取り込んでいません）[/red]")
+        return None
+
+
+def _report_errors(errors: List[Tuple[int, str]]):
+    if not errors:
+        return
+    console.print(f"\n[yellow]⚠️  {len(errors)}行を取り込めませんでした[/yellow]")
+    for line_no, message in errors[:MAX_REPORTED_ERRORS]:
+        console.print(f"  [dim]{line_no}行目:[/dim] {message}")
+    if len(errors) > MAX_REPORTED_ERRORS:
+        console.print(f"  [dim]...ほか{len(errors) - MAX_REPORTED_ERRORS}行[/dim]")
+
+
+@app.command("diary")
+def import_diary(
+    file: Path = typer.Argument(..., exists=True, dir_okay=False, help="取り込むファイル (.jsonl / .csv)"),
+    fmt: Optional[str] = typer.Option(None, "--format", "-f", help="jsonl / csv（省略時は拡張子で判定）"),
+    on_conflict: str = typer.Option("skip", "--on-conflict", help="同じ日付がある場合 (skip/overwrite/merge)"),
+    batch_size: int = typer.Option(1000, "--batch-size", help="1回にまとめて書き込む件数"),
+    strict: bool = typer.Option(False, "--strict", help="不正な行があれば何も取り込まずに終了"),
+):
+    """日記を一括取り込み（項目名は diary_entries の列名: date, content, learned_today, mood など）"""
+    if on_conflict not in DiaryQueries.CONFLICT_MODES:
+        console.print(f"[red]エラー: --on-conflict は {'/'.join(DiaryQueries.CONFLICT_MODES)} のいずれかです[/red]")
+        raise typer.Exit(1)
+
+    db = DiaryQueries()
+    errors: List[Tuple[int, str]] = []
+    rows = _valid_rows(read_records(file, fmt), "diary", validate_diary, errors, strict)
+
+    result = _run_import(
+        "日記",
+        lambda on_progress: db.bulk_upsert(rows, on_conflict, batch_size, on_progress)
+    )
+    if result is None:
+        raise typer.Exit(1)
+
+    processed, written = result
+    console.print(f"✅ [green]日記を取り込みました![/green] {written}件書き込み / {processed - written}件スキップ（日付の重複）")
+    _report_errors(errors)
+
+    if written:
+        console.print("\n[dim]💡 感情検知の結果も保存するには: clap diary analyze --backfill[/dim]")
+
+
+@app.command("tasks")
+def import_tasks(
+    file: Path = typer.Argument(..., exists=True, dir_okay=False, help="取り込むファイル (.jsonl / .csv)"),
+    fmt: Optional[str] = typer.Option(None, "--format", "-f", help="jsonl / csv（省略時は拡張子で判定）"),
+    batch_size: int = typer.Option(1000, "--batch-size", help="1回にまとめて書き込む件数"),
+    strict: bool = typer.Option(False, "--strict", help="不正な行があれば何も取り込まずに終了"),
+):
+    """タスクを一括取り込み（項目名は tasks の列名: title, created_date, status など）"""
+    db = TaskQueries()
+    errors: List[Tuple[int, str]] = []
+    rows = _valid_rows(read_records(file, fmt), "task", validate_task, errors, strict)
+
+    written = _run_import(
+        "タスク",
+        lambda on_progress: db.bulk_insert(rows, batch_size, on_progress)
+    )
+    if written is None:
+        raise typer.Exit(1)
+
+    console.print(f"✅ [green]タスクを取り込みました![/green] {written}件")
+    _report_errors(errors)
@@ -1,8 +1,11 @@
 """傾聴モード実装"""
-import yaml
+from datetime import date, timedelta
 from rich.console import Console
 from rich.panel import Panel
+from selfclap import tracing
+from selfclap.analysis.cache import cached
 from selfclap.analysis.reflection import generate_reflection_data
+from selfclap.database.queries import EmotionQueries
 
 console = Console()
 
@@ -12,8 +15,38 @@ def run_listen_mode():
     console.print("\n[bold cyan]🤝 傾聴モード - 感情に寄り添う[/bold cyan]\n")
     console.print("過去のデータを分析しています...\n")
 
+    payload = get_listen_payload()
+
+    # パネルで表示
+    with tracing.phase("render"):
+        console.print(Panel(
+            payload["prompt"],
+            title="💬 Claude Code へのプロンプト",
+            subtitle="このプロンプトを Claude Code に送信してください",
+            border_style="magenta"
+        ))
+
+    console.print("\n[dim]💡 Claude Code がこのデータを読み取り、温かく励まします。[/dim]\n")
+
+
+def get_listen_payload() -> dict:
+    """傾聴プロンプト（変更がなければキャッシュから）"""
+    return cached("listen", _build_listen_payload)
+
+
+def _build_listen_payload() -> dict:
+    """傾聴プロンプトを生成"""
+    import yaml
+
     # データ生成（reflectと同じ）
-    data = generate_reflection_data()
+    with tracing.phase("analysis", "reflection"):
+        data = cached("reflection", generate_reflection_data)
+
+    # 保存済みの感情検知結果から最近つらかった日を取得
+    difficult_days = EmotionQueries().get_difficult_days(date.today() - timedelta(days=30))
+    data["emotional_history"] = {
+        "recent_difficult_days": difficult_days
+    }
 
     # YAML形式で出力
     yaml_output = yaml.dump(
@@ -34,6 +67,7 @@ def run_listen_mode():
 最近の気分: {', '.join(data['current_state']['recent_moods']) if data['current_state']['recent_moods'] else '記録なし'}
 最近の完了タスク: {data['current_state']['recent_tasks_completed']}個
 連続記録: {data['current_state']['streak']}日
+最近30日でつらさを感じた日: {len(difficult_days)}日{'（直近: ' + difficult_days[0]['date'] + '）' if difficult_days else ''}
 
 【過去のデータ】
 学んだこと: {data['learning_accumulation']['total_diary_learnings']}件
@@ -51,12 +85,6 @@ def run_listen_mode():
 温かい言葉で励ましてください。
 """
 
-    # パネルで表示
-    console.print(Panel(
-        prompt.strip(),
-        title="💬 Claude Code へのプロンプト",
-        subtitle="このプロンプトを Claude Code に送信してください",
-        border_style="magenta"
-    ))
-
-    console.print("\n[dim]💡 Claude Code がこのデータを読み取り、温かく励まします。[/dim]\n")
+    return {
+        "prompt": prompt.strip(),
+    }
@@ -0,0 +1,106 @@
+"""一覧表示コマンドの共通処理（期間の指定とページ送り）"""
+import sys
+from calendar import monthrange
+from datetime import date
+from typing import Callable, Optional, Tuple, TypeVar
+import typer
+from rich.console import Console
+from selfclap import tracing
+
+# 1ページに表示する件数
+DEFAULT_PAGE_SIZE = 50
+
+Cursor = TypeVar("Cursor")
+
+
+def parse_date_option(value: Optional[str], option: str) -> Optional[date]:
+    """YYYY-MM-DD 形式のオプションを日付にする"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise typer.BadParameter("日付はYYYY-MM-DD形式で指定してください", param_hint=option)
+
+
+def parse_where_option(value: Optional[str], target: str):
+    """--where の式を target（diary / tasks / days）の条件にする"""
+    if not value:
+        return None
+    from selfclap.database.filters import FilterError, compile_filter
+
+    try:
+        return compile_filter(value, target)
+    except FilterError as e:
+        raise typer.BadParameter(str(e), param_hint="--where")
+
+
+def resolve_period(
+    year: Optional[int],
+    month: Optional[int],
+    since: Optional[date],
+    until: Optional[date],
+    default_this_month: bool = False,
+) -> Tuple[Optional[date], Optional[date]]:
+    """--year/--month/--since/--until から (開始日, 終了日) を決める
+
+    --month だけなら今年のその月、--year だけならその年全体。
+    --since/--until はさらに範囲を狭める。何も指定がなければ default_this_month で今月、それ以外は全期間。
+    """
+    today = date.today()
+    start = end = None
+    if year or month:
+        target_year = year or today.year
+        if month:
+            start = date(target_year, month, 1)
+            end = date(target_year, month, monthrange(target_year, month)[1])
+        else:
+            start = date(target_year, 1, 1)
+            end = date(target_year, 12, 31)
+    elif default_this_month and not (since or until):
+        start = today.replace(day=1)
+        end = today.replace(day=monthrange(today.year, today.month)[1])
+
+    if since:
+        start = max(start, since) if start else since
+    if until:
+        end = min(end, until) if end else until
+    return start, end
+
+
+def paginate(
+    console: Console,
+    fetch_page: Callable[[Optional[Cursor]], Tuple[list, Optional[Cursor]]],
+    render: Callable[[list, bool], None],
+    after: Optional[Cursor],
+    limit: int,
+) -> int:
+    """1ページずつ取得して表示し、表示した件数を返す
+
+    端末で実行している場合は Enter で次のページを取得する。
+    パイプなどの場合は1ページだけ表示し、続きを表示するための --after の値を案内する。
+    """
+    interactive = console.is_terminal and sys.stdin.isatty()
+    shown = 0
+    first = True
+    while True:
+        items, next_cursor = fetch_page(after)
+        if items:
+            with tracing.phase("render"):
+                render(items, first)
+            shown += len(items)
+        first = False
+
+        if next_cursor is None:
+            return shown
+        if not interactive:
+            console.print(f"[dim]続きは --after {next_cursor} を付けて実行してください[/dim]")
+            return shown
+
+        try:
+            answer = console.input(f"[dim]Enter: 次の{limit}件、q: 終了[/dim] ")
+        except (EOFError, KeyboardInterrupt):
+            return shown
+        if answer.strip().lower() == "q":
+            return shown
+        after = next_cursor
@@ -1,7 +1,8 @@
 """振り返りモード実装"""
-import yaml
 from rich.console import Console
 from rich.panel import Panel
+from selfclap import tracing
+from selfclap.analysis.cache import cached
 from selfclap.analysis.reflection import generate_reflection_data
 
 console = Console()
@@ -12,8 +13,37 @@ def run_reflect_mode():
     console.print("\n[bold cyan]🔍 振り返りモード - 他人軸 vs 自分軸[/bold cyan]\n")
     console.print("過去のデータを分析しています...\n")
 
+    payload = get_reflect_payload()
+
+    # パネルで表示
+    with tracing.phase("render"):
+        console.print(Panel(
+            payload["prompt"],
+            title="📊 Claude Code へのプロンプト",
+            subtitle="このプロンプトを Claude Code に送信してください",
+            border_style="cyan"
+        ))
+
+    # データ不足の指摘
+    if payload["suggestions"]:
+        console.print("\n[yellow]📋 データ不足の指摘[/yellow]\n")
+        for suggestion in payload["suggestions"]:
+            console.print(f"  • {suggestion}")
+        console.print("\n[dim]これらを追記すると、より正確な分析ができます。[/dim]\n")
+
+
+def get_reflect_payload() -> dict:
+    """振り返りプロンプトとデータ不足の指摘（変更がなければキャッシュから）"""
+    return cached("reflect", _build_reflect_payload)
+
+
+def _build_reflect_payload() -> dict:
+    """振り返りプロンプトを生成"""
+    import yaml
+
     # データ生成
-    data = generate_reflection_data()
+    with tracing.phase("analysis", "reflection"):
+        data = cached("reflection", generate_reflection_data)
 
     # YAML形式で出力
     yaml_output = yaml.dump(
@@ -61,17 +91,7 @@ def run_reflect_mode():
 ━━━━━━━━━━━━━━━━━━━━━━━━
 """
 
-    # パネルで表示
-    console.print(Panel(
-        prompt.strip(),
-        title="📊 Claude Code へのプロンプト",
-        subtitle="このプロンプトを Claude Code に送信してください",
-        border_style="cyan"
-    ))
-
-    # データ不足の指摘
-    if data["data_gaps"]["suggestions"]:
-        console.print("\n[yellow]📋 データ不足の指摘[/yellow]\n")
-        for suggestion in data["data_gaps"]["suggestions"]:
-            console.print(f"  • {suggestion}")
-        console.print("\n[dim]これらを追記すると、より正確な分析ができます。[/dim]\n")
+    return {
+        "prompt": prompt.strip(),
+        "suggestions": data["data_gaps"]["suggestions"],
+    }
@@ -1,12 +1,13 @@
 """統計ダッシュボードコマンド実装"""
-from datetime import date, timedelta
 from typing import Optional
 import typer
 from rich.console import Console
 from rich.table import Table
+from rich.markup import escape
 from rich.panel import Panel
-from rich.layout import Layout
-from selfclap.database.queries import DiaryQueries, TaskQueries
+from selfclap import tracing
+from selfclap.analysis.stats import DashboardStats, compute_dashboard_stats
+from selfclap.commands.listing import parse_where_option
 
 app = typer.Typer(help="📊 統計ダッシュボード")
 console = Console()
@@ -15,47 +16,40 @@ console = Console()
 @app.command()
 def show(
     days: int = typer.Option(30, "--days", "-d", help="集計期間（日数）"),
+    where: Optional[str] = typer.Option(None, "--where", "-w", help="集計する日の条件 (例: 'mood=tired or tasks>=3')"),
 ):
     """統計情報を表示"""
-    diary_db = DiaryQueries()
-    task_db = TaskQueries()
+    condition = parse_where_option(where, "days")
+    with tracing.phase("analysis", "stats"):
+        stats = compute_dashboard_stats(days, where=condition)
 
-    # 期間設定
-    end_date = date.today()
-    start_date = end_date - timedelta(days=days)
+    scope = f"過去{days}日間、{condition.expression}" if condition else f"過去{days}日間"
+    with tracing.phase("render", "stats"):
+        render_dashboard(stats, scope)
 
-    # データ取得
-    all_entries = diary_db.get_all_entries()
-    entries_in_period = [e for e in all_entries if start_date <= e.date <= end_date]
 
-    all_tasks = task_db.get_all_tasks()
-    completed_tasks = [t for t in all_tasks if t.status == "done"]
-    completed_in_period = [t for t in completed_tasks if t.completed_date and start_date <= t.completed_date <= end_date]
+def render_dashboard(stats: DashboardStats, scope: str):
+    """集計結果をダッシュボードとして表示"""
+    days = stats.days
 
     # === 基本統計 ===
-    console.print(f"\n[bold cyan]📊 統計ダッシュボード[/bold cyan] [dim]（過去{days}日間）[/dim]\n")
+    console.print(f"\n[bold cyan]📊 統計ダッシュボード[/bold cyan] [dim]（{escape(scope)}）[/dim]\n")
 
     basic_stats = Table(show_header=False, box=None, padding=(0, 2))
     basic_stats.add_column("項目", style="cyan")
     basic_stats.add_column("値", style="bold white")
 
-    basic_stats.add_row("📝 日記エントリ数", f"{len(entries_in_period)}件")
-    basic_stats.add_row("✅ タスク完了数", f"{len(completed_in_period)}件")
+    basic_stats.add_row("📝 日記エントリ数", f"{stats.entry_count}件")
+    basic_stats.add_row("✅ タスク完了数", f"{stats.completed_task_count}件")
 
-    if entries_in_period:
-        days_with_entries = len(set([e.date for e in entries_in_period]))
-        continuation_rate = (days_with_entries / days) * 100
-        basic_stats.add_row("📅 日記記録日数", f"{days_with_entries}日 ({continuation_rate:.1f}%)")
+    if stats.entry_count:
+        continuation_rate = (stats.days_with_entries / days) * 100
+        basic_stats.add_row("📅 日記記録日数", f"{stats.days_with_entries}日 ({continuation_rate:.1f}%)")
 
     console.print(Panel(basic_stats, title="基本統計", border_style="cyan"))
 
     # === 気分の推移 ===
-    moods = [e.mood for e in entries_in_period if e.mood]
-    if moods:
-        mood_count = {}
-        for mood in moods:
-            mood_count[mood] = mood_count.get(mood, 0) + 1
-
+    if stats.mood_counts:
         mood_table = Table(title="😊 気分の分布")
         mood_table.add_column("気分", style="magenta")
         mood_table.add_column("回数", style="white")
@@ -70,89 +64,72 @@ def show(
             "anxious": "😟"
         }
 
-        for mood, count in sorted(mood_count.items(), key=lambda x: x[1], reverse=True):
-            percentage = (count / len(moods)) * 100
+        for mood, count in stats.mood_counts:
+            percentage = (count / stats.mood_total) * 100
             emoji = mood_emoji.get(mood, "")
             mood_table.add_row(f"{emoji} {mood}", str(count), f"{percentage:.1f}%")
 
         console.print(mood_table)
         console.print()
 
+    # === 感情の記録 ===
+    if stats.emotion_counts.get("analyzed"):
+        emotion_table = Table(title="💭 感情の記録（日記からの検知）")
+        emotion_table.add_column("傾向", style="magenta")
+        emotion_table.add_column("日数", style="white")
+
+        emotion_table.add_row("😣 つらさ・ネガティブ", f"{stats.emotion_counts['negative']}日")
+        emotion_table.add_row("💢 愚痴・不満", f"{stats.emotion_counts['venting']}日")
+        emotion_table.add_row("🧱 行き詰まり", f"{stats.emotion_counts['struggling']}日")
+
+        console.print(emotion_table)
+        console.print()
+
     # === 成長データの充実度 ===
     growth_stats = Table(title="🌱 成長データの充実度")
     growth_stats.add_column("項目", style="cyan")
     growth_stats.add_column("記録数", style="white")
     growth_stats.add_column("記録率", style="green")
 
-    total_entries = len(entries_in_period) if entries_in_period else 1  # ゼロ除算回避
-
-    learned_count = len([e for e in entries_in_period if e.learned_today])
-    compared_count = len([e for e in entries_in_period if e.compared_to_past])
-    invisible_count = len([e for e in entries_in_period if e.invisible_growth])
-    external_count = len([e for e in entries_in_period if e.external_feedback])
-    self_eval_count = len([e for e in entries_in_period if e.self_assessment])
-
-    growth_stats.add_row(
-        "📚 学んだこと",
-        f"{learned_count}件",
-        f"{(learned_count/total_entries)*100:.1f}%"
-    )
-    growth_stats.add_row(
-        "📈 過去との比較",
-        f"{compared_count}件",
-        f"{(compared_count/total_entries)*100:.1f}%"
-    )
-    growth_stats.add_row(
-        "🌱 見えない成長",
-        f"{invisible_count}件",
-        f"{(invisible_count/total_entries)*100:.1f}%"
-    )
-    growth_stats.add_row(
-        "👥 他人の評価",
-        f"{external_count}件",
-        f"{(external_count/total_entries)*100:.1f}%"
-    )
-    growth_stats.add_row(
-        "🪞 自己評価",
-        f"{self_eval_count}件",
-        f"{(self_eval_count/total_entries)*100:.1f}%"
-    )
+    growth_labels = {
+        "learned_today": "📚 学んだこと",
+        "compared_to_past": "📈 過去との比較",
+        "invisible_growth": "🌱 見えない成長",
+        "external_feedback": "👥 他人の評価",
+        "self_assessment": "🪞 自己評価",
+    }
+
+    for field_name, label in growth_labels.items():
+        growth_stats.add_row(
+            label,
+            f"{stats.field_counts[field_name]}件",
+            f"{stats.fill_rate(field_name):.1f}%"
+        )
 
     console.print(growth_stats)
     console.print()
 
     # === タスクの難易度変化 ===
-    difficulty_improvements = []
-    for task in completed_in_period:
-        if task.difficulty_before and task.difficulty_after:
-            improvement = task.difficulty_before - task.difficulty_after
-            difficulty_improvements.append({
-                "task": task.title,
-                "before": task.difficulty_before,
-                "after": task.difficulty_after,
-                "improvement": improvement
-            })
-
-    if difficulty_improvements:
+    if stats.difficulty_changes:
         diff_table = Table(title="📊 理解度の向上（難易度の変化）")
         diff_table.add_column("タスク", style="white", max_width=40)
         diff_table.add_column("開始時", style="yellow", justify="center")
         diff_table.add_column("完了時", style="green", justify="center")
         diff_table.add_column("改善度", style="cyan", justify="center")
 
-        for item in sorted(difficulty_improvements, key=lambda x: x["improvement"], reverse=True)[:10]:
-            improvement_str = f"+{item['improvement']}" if item['improvement'] > 0 else str(item['improvement'])
-            if item['improvement'] > 0:
+        for item in stats.difficulty_changes:
+            improvement_str = f"+{item.improvement}" if item.improvement > 0 else str(item.improvement)
+            if item.improvement > 0:
                 improvement_display = f"[green]{improvement_str}[/green]"
-            elif item['improvement'] < 0:
+            elif item.improvement < 0:
                 improvement_display = f"[red]{improvement_str}[/red]"
             else:
                 improvement_display = "[dim]0[/dim]"
 
             diff_table.add_row(
-                item['task'][:40],
-                str(item['before']),
-                str(item['after']),
+                item.task[:40],
+                str(item.before),
+                str(item.after),
                 improvement_display
             )
 
@@ -160,7 +137,7 @@ def show(
         console.print()
 
         # 平均改善度
-        avg_improvement = sum([d['improvement'] for d in difficulty_improvements]) / len(difficulty_improvements)
+        avg_improvement = stats.avg_improvement
         if avg_improvement > 0:
             console.print(f"[green]✨ 平均改善度: +{avg_improvement:.2f}[/green]")
             console.print("[dim]タスクを通じて着実に理解度が向上しています！[/dim]\n")
@@ -169,8 +146,12 @@ def show(
             console.print("[dim]実際にやってみると想定より難しかったようです。それも学びです。[/dim]\n")
 
     # === データ充実度アドバイス ===
-    if entries_in_period:
-        avg_growth_rate = (learned_count + compared_count + invisible_count) / (total_entries * 3) * 100
+    if stats.entry_count:
+        avg_growth_rate = (
+            stats.fill_rate("learned_today")
+            + stats.fill_rate("compared_to_past")
+            + stats.fill_rate("invisible_growth")
+        ) / 3
 
         if avg_growth_rate < 30:
             console.print(Panel(
@@ -1,10 +1,12 @@
 """タスクコマンド実装"""
-from datetime import date
+from datetime import date, datetime
 from typing import Optional
 import typer
 from rich.console import Console
-from rich.table import Table
-from selfclap.database.queries import TaskQueries
+from selfclap import tracing
+from selfclap.commands.listing import DEFAULT_PAGE_SIZE, paginate, parse_date_option, parse_where_option, resolve_period
+from selfclap.database import spool
+from selfclap.database.queries import TaskQueries, SNIPPET_MARK_START, SNIPPET_MARK_END
 
 app = typer.Typer(help="✅ タスク管理")
 console = Console()
@@ -17,67 +19,141 @@ def add(
     priority: str = typer.Option("medium", "--priority", "-p", help="優先度 (low/medium/high)"),
 ):
     """タスクを追加"""
-    db = TaskQueries()
-
-    try:
-        task = db.create_task(
-            title=title,
-            created_date=date.today(),
-            description=description,
-            priority=priority
+    task = spool.submit(spool.TASK_CREATE, {
+        "title": title,
+        "created_date": date.today().isoformat(),
+        "description": description,
+        "priority": priority,
+    })
+    if task is None:
+        console.print(
+            "⏳ [yellow]データベースに書き込めなかったため、タスクを一時保存しました[/yellow]\n"
+            "[dim]次にコマンドを実行した時に追加されます[/dim]"
         )
-        console.print(f"✅ [green]タスクを追加しました![/green] (ID: {task.id})")
-    except Exception as e:
-        console.print(f"[red]エラー: {e}[/red]")
+        return
+    console.print(f"✅ [green]タスクを追加しました![/green] (ID: {task.id})")
 
 
 @app.command("list")
 def list_tasks(
-    all: bool = typer.Option(False, "--all", "-a", help="完了済みも含めて全て表示")
+    all: bool = typer.Option(False, "--all", "-a", help="完了済みも含めて全て表示"),
+    month: Optional[int] = typer.Option(None, "--month", "-m", min=1, max=12, help="作成月を指定 (1-12、--year がなければ今年)"),
+    year: Optional[int] = typer.Option(None, "--year", "-y", help="作成年を指定"),
+    since: Optional[str] = typer.Option(None, "--since", help="この日付以降に作成 (YYYY-MM-DD)"),
+    until: Optional[str] = typer.Option(None, "--until", help="この日付以前に作成 (YYYY-MM-DD)"),
+    after: Optional[int] = typer.Option(None, "--after", help="このIDのタスクの次から表示（ページ送り用）"),
+    limit: int = typer.Option(DEFAULT_PAGE_SIZE, "--limit", "-n", min=1, help="1ページの件数"),
+    where: Optional[str] = typer.Option(None, "--where", "-w", help="絞り込み条件 (例: 'priority=high and before>=4')"),
 ):
-    """タスク一覧を表示"""
-    db = TaskQueries()
+    """タスク一覧を表示（作成日の新しい順）"""
+    from rich.table import Table
 
-    if all:
-        tasks = db.get_all_tasks()
-        title = "✅ タスク一覧（全て）"
-    else:
-        tasks = db.get_active_tasks()
-        title = "✅ タスク一覧（未完了）"
+    start_date, end_date = resolve_period(
+        year, month, parse_date_option(since, "--since"), parse_date_option(until, "--until")
+    )
+    condition = parse_where_option(where, "tasks")
 
-    if not tasks:
+    db = TaskQueries()
+    if after is not None and db.get_task_by_id(after) is None:
+        console.print(f"[red]エラー: ID {after} のタスクが見つかりません[/red]")
+        raise typer.Exit(1)
+
+    title = "✅ タスク一覧（全て）" if all else "✅ タスク一覧（未完了）"
+    status_icon = {
+        "todo": "⏳",
+        "in_progress": "🔄",
+        "done": "✅"
+    }
+    priority_icon = {
+        "low": "🔵",
+        "medium": "🟡",
+        "high": "🔴"
+    }
+
+    def fetch_page(cursor):
+        # 一覧に必要な列だけ読む
+        return db.get_tasks_page(
+            start_date, end_date, after=cursor, limit=limit, active_only=not all,
+            fields=("id", "title", "status", "priority", "created_date"), where=condition
+        )
+
+    def render(tasks, first):
+        table = Table(title=title if first else None)
+        table.add_column("ID", style="cyan", no_wrap=True)
+        table.add_column("タイトル", style="white")
+        table.add_column("状態", style="magenta")
+        table.add_column("優先度", style="yellow")
+        table.add_column("作成日", style="dim")
+
+        for task in tasks:
+            table.add_row(
+                str(task.id),
+                task.title,
+                f"{status_icon.get(task.status, '')} {task.status}",
+                f"{priority_icon.get(task.priority, '')} {task.priority}",
+                str(task.created_date)
+            )
+
+        console.print(table)
+
+    shown = paginate(console, fetch_page, render, after, limit)
+    if not shown:
         console.print("[yellow]タスクがありません[/yellow]")
         return
 
-    table = Table(title=title)
+    console.print(f"\n[dim]表示: {shown}件[/dim]")
+
+
+@app.command("search")
+def search(
+    query: str = typer.Argument(..., help="検索語（空白区切りで全ての語を含むものを検索）"),
+    status: Optional[str] = typer.Option(None, "--status", help="状態で絞り込み (todo/in_progress/done)"),
+    since: Optional[str] = typer.Option(None, "--since", help="この日付以降に作成 (YYYY-MM-DD)"),
+    until: Optional[str] = typer.Option(None, "--until", help="この日付以前に作成 (YYYY-MM-DD)"),
+    limit: int = typer.Option(20, "--limit", "-n", help="最大表示件数"),
+):
+    """タスクを全文検索（タイトル・説明・学び）"""
+    from rich.markup import escape
+    from rich.table import Table
+
+    db = TaskQueries()
+
+    try:
+        since_date = datetime.strptime(since, "%Y-%m-%d").date() if since else None
+        until_date = datetime.strptime(until, "%Y-%m-%d").date() if until else None
+    except ValueError:
+        console.print("[red]エラー: 日付はYYYY-MM-DD形式で指定してください[/red]")
+        return
+
+    results = db.search_tasks(query, since=since_date, until=until_date, status=status, limit=limit)
+
+    if not results:
+        console.print(f"[yellow]「{escape(query)}」に一致するタスクはありません[/yellow]")
+        return
+
+    table = Table(title=f"🔎 タスク検索: {escape(query)}")
     table.add_column("ID", style="cyan", no_wrap=True)
     table.add_column("タイトル", style="white")
     table.add_column("状態", style="magenta")
-    table.add_column("優先度", style="yellow")
-    table.add_column("作成日", style="dim")
-
-    for task in tasks:
-        status_icon = {
-            "todo": "⏳",
-            "in_progress": "🔄",
-            "done": "✅"
-        }
-        priority_icon = {
-            "low": "🔵",
-            "medium": "🟡",
-            "high": "🔴"
-        }
-
-        table.add_row(
-            str(task.id),
-            task.title,
-            f"{status_icon.get(task.status, '')} {task.status}",
-            f"{priority_icon.get(task.priority, '')} {task.priority}",
-            str(task.created_date)
-        )
+    table.add_column("該当箇所", style="white")
+
+    for task, snippet in results:
+        table.add_row(str(task.id), escape(task.title), task.status, _highlight(snippet))
 
-    console.print(table)
-    console.print(f"\n[dim]合計: {len(tasks)}件[/dim]")
+    with tracing.phase("render"):
+        console.print(table)
+    console.print(f"\n[dim]{len(results)}件[/dim]")
+
+
+def _highlight(snippet: str) -> str:
+    """検索結果の抜粋のヒット箇所を強調表示"""
+    from rich.markup import escape
+
+    return (
+        escape(snippet.replace("\n", " "))
+        .replace(SNIPPET_MARK_START, "[bold yellow]")
+        .replace(SNIPPET_MARK_END, "[/bold yellow]")
+    )
 
 
 @app.command("done")
@@ -113,6 +189,9 @@ def done(
 
     console.print(f"✅ [green]タスクを完了しました![/green] \"{task.title}\"")
 
+    from selfclap.analysis.cache import prewarm_in_background
+    prewarm_in_background()
+
     # AI学び抽出プロンプト出力
     if not any([difficulty_before, difficulty_after, learning]):
         from selfclap.prompts.auto_classify import generate_task_learning_prompt
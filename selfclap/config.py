@@ -0,0 +1,120 @@
+"""プロファイルとDBの保存場所の設定
+
+DBの場所は次の順に決まる:
+1. 環境変数 SELFCLAP_DB（ファイルを直接指定。プロファイル指定がない場合のみ）
+2. プロファイル（--profile / 環境変数 SELFCLAP_PROFILE / 設定ファイルの default_profile）
+   - 設定ファイルの profiles にあればそのパス
+   - なければ <profiles_dir>/<プロファイル名>/selfclap.db
+3. どれもなければ ~/.selfclap/selfclap.db
+
+設定ファイルは ~/.selfclap/config.yaml（環境変数 SELFCLAP_CONFIG で変更可）。
+"""
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+# 既定のDB（プロファイル指定なし）を表す名前
+DEFAULT_PROFILE = "default"
+
+DB_FILENAME = "selfclap.db"
+
+# プロファイル名はディレクトリ名にもなるので、区切り文字などは使えない
+PROFILE_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.\-]*$")
+
+# --profile で指定されたプロファイル（環境変数より優先）
+_active_profile: Optional[str] = None
+
+
+def selfclap_home() -> Path:
+    return Path.home() / ".selfclap"
+
+
+def config_path() -> Path:
+    path = os.environ.get("SELFCLAP_CONFIG")
+    return Path(path) if path else selfclap_home() / "config.yaml"
+
+
+@lru_cache(maxsize=4)
+def _load_config(path: str, mtime: float) -> dict:
+    # 設定ファイルがある時だけyamlを読み込む（起動時間のため）
+    import yaml
+
+    with open(path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    if not isinstance(config, dict):
+        raise ValueError(f"設定ファイルの形式が不正です: {path}")
+    return config
+
+
+def get_config() -> dict:
+    """設定ファイルの内容（なければ空）"""
+    path = config_path()
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return {}
+    return _load_config(str(path), mtime)
+
+
+def validate_profile_name(name: str) -> str:
+    if not PROFILE_NAME_PATTERN.match(name):
+        raise ValueError(f"プロファイル名に使えない文字が含まれています: {name}")
+    return name
+
+
+def set_active_profile(name: Optional[str]):
+    """このプロセスで使うプロファイルを設定（--profile）"""
+    global _active_profile
+    _active_profile = validate_profile_name(name) if name else None
+
+
+def get_active_profile() -> Optional[str]:
+    """使用中のプロファイル名（指定がなければNone）"""
+    return (
+        _active_profile
+        or os.environ.get("SELFCLAP_PROFILE")
+        or get_config().get("default_profile")
+    )
+
+
+def profiles_dir() -> Path:
+    """プロファイルごとのDBを置くディレクトリ"""
+    path = get_config().get("profiles_dir")
+    return Path(path).expanduser() if path else selfclap_home() / "profiles"
+
+
+def resolve_db_path(profile: Optional[str] = None) -> Path:
+    """プロファイルのDBファイルのパス"""
+    if profile is None:
+        if not _active_profile:
+            explicit = os.environ.get("SELFCLAP_DB")
+            if explicit:
+                return Path(explicit).expanduser()
+        profile = get_active_profile()
+
+    if not profile or profile == DEFAULT_PROFILE:
+        return selfclap_home() / DB_FILENAME
+
+    validate_profile_name(profile)
+    configured = get_config().get("profiles") or {}
+    if profile in configured:
+        return Path(configured[profile]).expanduser()
+    return profiles_dir() / profile / DB_FILENAME
+
+
+def list_profiles() -> Dict[str, Path]:
+    """既知のプロファイル名 → DBのパス（設定ファイルの profiles と profiles_dir 内のもの）"""
+    profiles: Dict[str, Path] = {}
+
+    base = profiles_dir()
+    if base.is_dir():
+        for child in sorted(base.iterdir()):
+            if (child / DB_FILENAME).is_file() and PROFILE_NAME_PATTERN.match(child.name):
+                profiles[child.name] = child / DB_FILENAME
+
+    for name, path in (get_config().get("profiles") or {}).items():
+        profiles[str(name)] = Path(path).expanduser()
+
+    return dict(sorted(profiles.items()))
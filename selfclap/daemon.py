@@ -0,0 +1,383 @@
+"""常駐プロセス（clap を毎回起動するコストを省く）
+
+起動時に Typer/Rich・DBモジュール・感情キーワード辞書などを読み込んでおき、
+クライアント（selfclap.client）からの要求ごとに fork した子プロセスでコマンドを実行する。
+子プロセスはクライアントの標準入出力のファイルディスクリプタをそのまま使うので、
+出力はクライアントの端末やパイプに直接書かれる。
+
+一定時間要求がなければ終了する（SELFCLAP_DAEMON_IDLE 秒、デフォルト600秒）。
+DBを使えずに一時保存した書き込み（selfclap.database.spool）も、要求の合間に定期的に反映する。
+"""
+import fcntl
+import marshal
+import os
+import selectors
+import signal
+import socket
+import sys
+import time
+import traceback
+from typing import Dict, Optional, Tuple
+from selfclap import __version__
+from selfclap.client import (
+    EXIT_STATUS, HEADER, UntrustedSocketError, check_owned, encode_message, socket_path
+)
+
+DEFAULT_IDLE_TIMEOUT = 600
+
+# 受け付けるメッセージの上限（環境変数を含むため少し大きめ）
+MAX_MESSAGE_SIZE = 1024 * 1024
+
+# 一時保存した書き込みを反映する間隔（秒）
+SPOOL_DRAIN_INTERVAL = 30
+
+
+def idle_timeout() -> float:
+    try:
+        return float(os.environ.get("SELFCLAP_DAEMON_IDLE", DEFAULT_IDLE_TIMEOUT))
+    except ValueError:
+        return DEFAULT_IDLE_TIMEOUT
+
+
+def receive_message(conn: socket.socket) -> Tuple[dict, list]:
+    """(メッセージ, 受け取ったファイルディスクリプタ) を読む"""
+    data, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+    if len(data) < HEADER.size:
+        raise ConnectionError("メッセージが不正です")
+    length = HEADER.unpack_from(data)[0]
+    if length > MAX_MESSAGE_SIZE:
+        raise ConnectionError("メッセージが大きすぎます")
+
+    payload = data[HEADER.size:]
+    while len(payload) < length:
+        chunk = conn.recv(length - len(payload))
+        if not chunk:
+            raise ConnectionError("接続が切れました")
+        payload += chunk
+    return marshal.loads(payload), fds
+
+
+def send_reply(conn: socket.socket, message: dict):
+    conn.sendall(encode_message(message))
+
+
+# 親プロセスで組み立てておいたコマンド（子プロセスはこれをそのまま使う）
+_command = None
+
+
+def preload():
+    """よく使うモジュール・辞書・DB・コマンドを準備しておく（fork した子プロセスに引き継がれる）"""
+    global _command
+    import io
+    import typer.main
+    import yaml  # noqa: F401
+    from rich.console import Console
+    from rich.panel import Panel
+    from rich.table import Table
+    import selfclap.analysis.reflection  # noqa: F401
+    import selfclap.analysis.stats  # noqa: F401
+    import selfclap.prompts.emotion_detect  # noqa: F401
+    from selfclap.analysis.lexicon import get_lexicon
+    from selfclap.cli import LAZY_SUBCOMMANDS, app
+    from selfclap.database.connection import get_database
+
+    # 全サブコマンドを読み込んで Click のコマンドに変換しておく
+    _command = typer.main.get_command(app)
+    ctx = _command.make_context("clap", [], resilient_parsing=True)
+    for name in LAZY_SUBCOMMANDS:
+        _command.get_command(ctx, name)
+
+    # Rich の描画で使う正規表現などを一度通しておく
+    table = Table("a", "b")
+    table.add_row("1", "[bold]2[/bold]")
+    Console(file=io.StringIO(), width=80).print(Panel("2026-01-01 123 ok"), table)
+
+    # 辞書のオートマトンを構築しておく
+    get_lexicon()
+
+    # スキーマの確認を済ませておく。接続は子プロセスごとに開き直すので閉じておく
+    get_database().close()
+
+
+def _refresh_consoles():
+    """各モジュールの Console を作り直す
+
+    Console は作成時の標準出力を見て色の有無などを決めるので、
+    クライアントの標準出力に差し替えた後で作り直す。
+    """
+    from rich.console import Console
+
+    for name, module in list(sys.modules.items()):
+        if not name.startswith("selfclap."):
+            continue
+        console = getattr(module, "console", None)
+        if isinstance(console, Console):
+            module.console = Console(stderr=console.stderr)
+
+
+def run_command(argv: list) -> int:
+    """子プロセスでコマンドを実行して終了コードを返す"""
+    try:
+        if _command is None:
+            from selfclap.cli import app
+            app(args=argv, prog_name="clap")
+        else:
+            _refresh_consoles()
+            _command.main(args=argv, prog_name="clap")
+        return 0
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        print(e.code, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    except Exception:
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+
+class Daemon:
+    """Unixソケットで要求を受け付け、コマンドごとに fork して実行する"""
+
+    def __init__(self, idle: Optional[float] = None):
+        self.idle = idle_timeout() if idle is None else idle
+        self.path = socket_path()
+        self.selector = selectors.DefaultSelector()
+        # 実行中の子プロセス → クライアントとの接続
+        self.children: Dict[int, socket.socket] = {}
+        # 一時保存した書き込みを反映している子プロセス
+        self.drainer: Optional[int] = None
+        self.last_drain = time.monotonic()
+        self.started_at = time.time()
+        self.last_active = time.monotonic()
+        self.served = 0
+        self.stopping = False
+
+    def serve(self):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        try:
+            # 他のユーザーが先に作ったディレクトリなら使わない（クライアントも接続しない）
+            check_owned(directory, directory=True)
+        except UntrustedSocketError as e:
+            print(f"エラー: {e}", file=sys.stderr)
+            return
+
+        # 同時に起動された場合は、ロックを取れた1つだけが常駐する
+        lock = open(os.path.join(directory, "daemon.lock"), "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # クライアントは所有者以外に権限のあるソケットには接続しない
+        umask = os.umask(0o177)
+        try:
+            listener.bind(self.path)
+        finally:
+            os.umask(umask)
+        listener.listen(64)
+        bound_inode = os.stat(self.path).st_ino
+
+        preload()
+
+        # 子プロセスの終了をシグナル経由で select に知らせる
+        wakeup_r, wakeup_w = socket.socketpair()
+        wakeup_r.setblocking(False)
+        wakeup_w.setblocking(False)
+        signal.set_wakeup_fd(wakeup_w.fileno())
+        signal.signal(signal.SIGCHLD, lambda *_: None)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        self.selector.register(listener, selectors.EVENT_READ, "listener")
+        self.selector.register(wakeup_r, selectors.EVENT_READ, "wakeup")
+        try:
+            while not self.stopping:
+                for key, _ in self.selector.select(timeout=1.0):
+                    if key.data == "listener":
+                        self._accept(listener, (listener, wakeup_r, wakeup_w, lock))
+                    elif key.data == "wakeup":
+                        try:
+                            wakeup_r.recv(4096)
+                        except BlockingIOError:
+                            pass
+                    else:
+                        self._client_closed(key.fileobj, key.data)
+                self._reap()
+
+                if not self.children and self.drainer is None and time.monotonic() - self.last_drain > SPOOL_DRAIN_INTERVAL:
+                    self._drain_spool((listener, wakeup_r, wakeup_w, lock))
+
+                if not self.children and time.monotonic() - self.last_active > self.idle:
+                    break
+        finally:
+            # 後から起動した別の常駐プロセスのソケットは消さないよう、自分が作ったものか確認する
+            try:
+                if os.stat(self.path).st_ino == bound_inode:
+                    os.unlink(self.path)
+            except OSError:
+                pass
+            listener.close()
+            lock.close()
+
+    def _request_stop(self, *_):
+        self.stopping = True
+
+    def _accept(self, listener: socket.socket, inherited: tuple):
+        conn, _ = listener.accept()
+        self.last_active = time.monotonic()
+        fds = []
+        try:
+            conn.settimeout(1.0)
+            message, fds = receive_message(conn)
+            op = message.get("op")
+
+            if op == "ping":
+                send_reply(conn, self.status())
+            elif op == "stop":
+                send_reply(conn, {"stopping": True})
+                self.stopping = True
+            elif op == "run" and len(fds) == 3:
+                pid = self._fork_command(message, fds, conn, inherited)
+                conn.settimeout(None)
+                self.children[pid] = conn
+                self.selector.register(conn, selectors.EVENT_READ, pid)
+                self.served += 1
+                return
+        except (OSError, ValueError):
+            pass
+        finally:
+            for fd in fds:
+                os.close(fd)
+        conn.close()
+
+    def _fork_command(self, message: dict, fds: list, conn: socket.socket, inherited: tuple) -> int:
+        pid = os.fork()
+        if pid:
+            return pid
+
+        # === 子プロセス ===
+        code = 1
+        try:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            self.selector.close()
+            for obj in inherited:
+                obj.close()
+            conn.close()
+
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+            os.chdir(message.get("cwd") or "/")
+            os.environ.clear()
+            os.environ.update(message.get("env") or {})
+            sys.stdout.reconfigure(line_buffering=os.isatty(1))
+
+            code = run_command(list(message.get("argv") or []))
+        finally:
+            # 親から引き継いだ終了処理（DB接続のクローズなど）は実行しない
+            os._exit(code)
+
+    def _drain_spool(self, inherited: tuple):
+        """一時保存した書き込みがあれば子プロセスでDBに反映する（常駐プロセス自身はDB接続を持たない）"""
+        from selfclap.database import spool
+
+        self.last_drain = time.monotonic()
+        directory = spool.spool_dir()
+        if not directory.is_dir() or not any(os.scandir(directory)):
+            return
+
+        pid = os.fork()
+        if pid:
+            self.drainer = pid
+            return
+
+        # === 子プロセス ===
+        code = 1
+        try:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            self.selector.close()
+            for obj in inherited:
+                obj.close()
+            spool.drain_all()
+            code = 0
+        except Exception:
+            traceback.print_exc()
+        finally:
+            os._exit(code)
+
+    def _client_closed(self, conn: socket.socket, pid: int):
+        """実行中にクライアントが切断した（Ctrl+C など）"""
+        try:
+            if conn.recv(1):
+                return
+        except OSError:
+            pass
+        self.selector.unregister(conn)
+        if pid in self.children:
+            try:
+                os.kill(pid, signal.SIGINT)
+            except ProcessLookupError:
+                pass
+
+    def _reap(self):
+        while self.children or self.drainer is not None:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            if pid == self.drainer:
+                self.drainer = None
+                continue
+            conn = self.children.pop(pid, None)
+            if conn is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if code < 0:
+                code = 128 - code  # シグナルで終了した場合はシェルと同じ 128+番号
+            try:
+                self.selector.unregister(conn)
+            except KeyError:
+                pass
+            try:
+                conn.sendall(EXIT_STATUS.pack(code))
+            except OSError:
+                pass
+            conn.close()
+            self.last_active = time.monotonic()
+
+    def status(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "version": __version__,
+            "uptime": round(time.time() - self.started_at, 1),
+            "served": self.served,
+            "running": len(self.children),
+            "idle_timeout": self.idle,
+        }
+
+
+def main():
+    Daemon().serve()
+
+
+if __name__ == "__main__":
+    main()
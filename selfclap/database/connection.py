@@ -1,102 +1,990 @@
 """データベース接続管理"""
+import atexit
+import os
+import random
 import sqlite3
+import threading
+import time
 from pathlib import Path
 from contextlib import contextmanager
-from typing import Generator
+from typing import Callable, Dict, Generator, List, Optional, Tuple, TypeVar
+from selfclap import tracing
+from selfclap.config import resolve_db_path
+
+
+# パフォーマンスプロファイル（接続を開いた時に一度だけ適用するPRAGMA）
+PERFORMANCE_PROFILES: Dict[str, Dict[str, object]] = {
+    # 通常のCLI利用: WAL + NORMAL同期で書き込みを軽くする
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -8000,  # 約8MB
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    # 共有ストレージ・ネットワークホーム向け（WALを使わず確実に同期）
+    "safe": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+    # 一括取り込み・ベンチマーク向け（耐久性より速度を優先）
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+
+DEFAULT_PERFORMANCE_PROFILE = "balanced"
+
+# スキーマのバージョン（Database.migrations の最後のバージョン）
+SCHEMA_VERSION = 3
+
+# sqlite3モジュールのプリペアドステートメントキャッシュのサイズ
+STATEMENT_CACHE_SIZE = 256
+
+# 他のプロセスがロックを持っている時に待つ時間（ミリ秒）。SELFCLAP_BUSY_TIMEOUT で変更できる
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+
+# 書き込みがロックを取れなかった時にやり直す回数と、やり直すまでの待ち時間（秒）の初期値・上限
+WRITE_RETRIES = 4
+RETRY_BASE_DELAY = 0.05
+RETRY_MAX_DELAY = 1.0
+
+# sqlite3.OperationalError.sqlite_errorcode のうちロック待ちを表すもの（SQLITE_BUSY / SQLITE_LOCKED）
+_BUSY_ERROR_CODES = (5, 6)
+
+# DBファイルを読み書きできない状態を表すもの（SQLITE_IOERR / SQLITE_CANTOPEN）
+_UNAVAILABLE_ERROR_CODES = (10, 14)
+
+T = TypeVar("T")
+
+
+class DatabaseBusyError(sqlite3.OperationalError):
+    """他のプロセスの書き込みが続いていて、やり直しても書き込めなかった"""
+
+
+def is_busy_error(error: BaseException) -> bool:
+    """ロック待ちで失敗したエラーか（Python 3.10 には sqlite_errorcode がないのでメッセージでも判定する）"""
+    if isinstance(error, DatabaseBusyError):
+        # write() が送出するもの（SQLiteのエラーコードを持たない）
+        return True
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in _BUSY_ERROR_CODES
+    message = str(error)
+    return "database is locked" in message or "database table is locked" in message or "busy" in message
+
+
+def is_unavailable_error(error: BaseException) -> bool:
+    """DBを一時的に使えない（ロック待ち・ファイルを開けない・I/Oエラー）ことによる失敗か"""
+    if isinstance(error, OSError) or is_busy_error(error):
+        return True
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in _UNAVAILABLE_ERROR_CODES
+    message = str(error)
+    return "unable to open database file" in message or "disk I/O error" in message
+
+
+def _busy_timeout_from_env() -> int:
+    value = os.environ.get("SELFCLAP_BUSY_TIMEOUT")
+    if not value:
+        return DEFAULT_BUSY_TIMEOUT_MS
+    try:
+        timeout = int(value)
+    except ValueError:
+        raise ValueError(f"SELFCLAP_BUSY_TIMEOUT はミリ秒の整数で指定してください: {value}")
+    return max(timeout, 0)
+
+
+class TracingCursor(sqlite3.Cursor):
+    """実行したSQLと、読み出した行数・時間を記録するカーソル"""
+
+    _record: Optional[tracing.QueryRecord] = None
+
+    def _start(self, sql: str, params: str) -> tracing.QueryRecord:
+        self._record = tracing.record_query(sql, params)
+        return self._record
+
+    def _timed(self, func, *args):
+        record = self._record
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            if record is not None:
+                record.elapsed += time.perf_counter() - started
+
+    def execute(self, sql, parameters=()):
+        record = self._start(sql, tracing.params_shape(parameters))
+        self._timed(super().execute, sql, parameters)
+        if self.description is None:
+            record.rows = max(self.rowcount, 0)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        shape = tracing.params_shape(seq_of_parameters[0]) if seq_of_parameters else "()"
+        record = self._start(sql, f"{len(seq_of_parameters)} × {shape}")
+        self._timed(super().executemany, sql, seq_of_parameters)
+        record.rows = max(self.rowcount, 0)
+        return self
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is not None and self._record is not None:
+            self._record.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        if self._record is not None:
+            self._record.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if self._record is not None:
+            self._record.rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+
+class TracingConnection(sqlite3.Connection):
+    """execute などのショートカットも TracingCursor を通す接続"""
+
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        cursor = self.cursor()
+        cursor._start(sql_script, "script")
+        cursor._timed(super().executescript, sql_script)
+        return cursor
 
 
 class Database:
-    """SQLiteデータベース接続管理クラス"""
+    """SQLiteデータベース接続管理クラス
+
+    接続はスレッドごとに1本だけ開いて使い回す。
+    通常は get_database() 経由でプロセス共有のインスタンスを取得すること。
+
+    複数のプロセス（CLI・サーバー・デーモン）から同時に使う前提で、
+    書き込みは write()（BEGIN IMMEDIATE + ロック待ちのやり直し）、
+    複数のクエリをまたぐ集計は snapshot()（同じ時点のデータを読む）で囲む。
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        performance_profile: Optional[str] = None,
+        busy_timeout: Optional[int] = None,
+    ):
+        self.db_path = Path(db_path) if db_path else resolve_db_path()
+        self.performance_profile = (
+            performance_profile
+            or os.environ.get("SELFCLAP_PERF_PROFILE")
+            or DEFAULT_PERFORMANCE_PROFILE
+        )
+        if self.performance_profile not in PERFORMANCE_PROFILES:
+            raise ValueError(f"不明なパフォーマンスプロファイルです: {self.performance_profile}")
+        self.busy_timeout = _busy_timeout_from_env() if busy_timeout is None else busy_timeout
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
 
-    def __init__(self):
-        self.db_path = Path.home() / ".selfclap" / "selfclap.db"
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._initialize_if_needed()
 
     def _initialize_if_needed(self):
-        """初回実行時にテーブルを作成"""
-        if not self.db_path.exists():
-            self._create_tables()
+        """スキーマを最新のバージョンにする
+
+        適用済みのバージョンは PRAGMA user_version に記録する。
+        最新であれば読み取るだけなので、他のプロセスが書き込み中でも待たずに使い始められる。
+        """
+        with self.get_connection() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        # 新しいバージョンの selfclap で作られたDB（version > SCHEMA_VERSION）はそのまま使う
+        if version < SCHEMA_VERSION:
+            self.write(self._migrate)
 
-    def _create_tables(self):
-        """テーブル作成"""
         with self.get_connection() as conn:
-            conn.executescript("""
-                -- 日記エントリテーブル
-                CREATE TABLE IF NOT EXISTS diary_entries (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    date DATE UNIQUE NOT NULL,
-                    content TEXT NOT NULL,
-
-                    -- 成長記録
-                    learned_today TEXT,
-                    compared_to_past TEXT,
-                    invisible_growth TEXT,
-
-                    -- 評価軸の分離
-                    external_feedback TEXT,
-                    self_assessment TEXT,
-
-                    -- 感情・状態
-                    mood TEXT,
-                    energy_level INTEGER,
-
-                    -- 困難度
-                    challenges_faced TEXT,
-                    how_overcome TEXT,
-
-                    -- メタデータ
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            self.search_available = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'diary_fts'"
+            ).fetchone() is not None
+
+    def migrations(self) -> List[Tuple[int, str, Callable[[sqlite3.Connection], None]]]:
+        """(バージョン, 内容, 適用する関数) の一覧
+
+        スキーマを変える場合は末尾に追加し、SCHEMA_VERSION を上げる（適用済みのものは変更しない）。
+        """
+        return [
+            (1, "日記・タスク・集計・全文検索のテーブル", self._migrate_initial_schema),
+            (2, "インデックスの整理（重複の削除・未完了タスクの部分インデックス）", _migrate_compact_indexes),
+            (3, "日記の日付を変更した時も連続記録を更新するトリガー", _migrate_streak_date_update),
+        ]
+
+    def _migrate(self, conn: sqlite3.Connection):
+        """未適用のマイグレーションを1つの書き込みトランザクションで順に適用する"""
+        # 書き込みロックを待つ間に他のプロセスが適用していれば、その分は飛ばす
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, _, migrate in self.migrations():
+            if target > version:
+                migrate(conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+
+    def schema_version(self) -> int:
+        """適用済みのスキーマのバージョン"""
+        with self.get_connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def _migrate_initial_schema(self, conn: sqlite3.Connection):
+        """バージョン1: テーブルを作成（user_version で管理する前に作られたDBにも、足りないものを作る）"""
+        existing = {
+            row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        }
+        self._create_tables(conn)
+
+        # 既存DBに連続記録テーブルを追加した場合は既存の日記から構築
+        if "diary_entries" in existing and "streak_runs" not in existing:
+            rebuild_streak_runs(conn)
+
+        # 日ごとの集計テーブルも同様
+        if "diary_entries" in existing and "daily_rollup" not in existing:
+            rebuild_daily_rollup(conn)
+
+        if self._create_search_index(conn) and "diary_fts" not in existing:
+            rebuild_search_index(conn)
+
+    def _create_tables(self, conn: sqlite3.Connection):
+        """テーブル作成"""
+        execute_script(conn, """
+            -- 日記エントリテーブル
+            CREATE TABLE IF NOT EXISTS diary_entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date DATE UNIQUE NOT NULL,
+                content TEXT NOT NULL,
+
+                -- 成長記録
+                learned_today TEXT,
+                compared_to_past TEXT,
+                invisible_growth TEXT,
+
+                -- 評価軸の分離
+                external_feedback TEXT,
+                self_assessment TEXT,
+
+                -- 感情・状態
+                mood TEXT,
+                energy_level INTEGER,
+
+                -- 困難度
+                challenges_faced TEXT,
+                how_overcome TEXT,
+
+                -- メタデータ
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_diary_date ON diary_entries(date DESC);
+            CREATE INDEX IF NOT EXISTS idx_diary_mood ON diary_entries(mood);
+
+            -- タスクテーブル
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                description TEXT,
+                status TEXT DEFAULT 'todo',
+                priority TEXT DEFAULT 'medium',
+
+                -- 成長記録
+                learnings TEXT,
+                difficulty_before INTEGER,
+                difficulty_after INTEGER,
+                time_estimated REAL,
+                time_actual REAL,
+
+                -- 比較データ
+                similar_task_before TEXT,
+                improvement_notes TEXT,
+
+                -- 外部評価
+                external_review TEXT,
+
+                -- メタデータ
+                created_date DATE NOT NULL,
+                completed_date DATE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_task_status ON tasks(status);
+            CREATE INDEX IF NOT EXISTS idx_task_completed_date ON tasks(completed_date DESC);
+            -- 一覧・検索は作成日・IDの降順に並べる（同じ作成日のタスクもインデックス順に読める）
+            DROP INDEX IF EXISTS idx_task_created_date;
+            CREATE INDEX IF NOT EXISTS idx_task_created_date_id ON tasks(created_date DESC, id DESC);
+
+            -- 連続記録（ストリーク）テーブル: 日記が連続している期間を1行で持つ
+            CREATE TABLE IF NOT EXISTS streak_runs (
+                start_date DATE PRIMARY KEY,
+                end_date DATE NOT NULL,
+                length INTEGER GENERATED ALWAYS AS (
+                    CAST(julianday(end_date) - julianday(start_date) AS INTEGER) + 1
+                ) VIRTUAL
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_streak_end_date ON streak_runs(end_date);
+            CREATE INDEX IF NOT EXISTS idx_streak_length ON streak_runs(length DESC);
+
+            -- 感情検知の結果（日記1件につき1行、辞書のバージョンつき）
+            CREATE TABLE IF NOT EXISTS emotion_scores (
+                entry_id INTEGER PRIMARY KEY REFERENCES diary_entries(id) ON DELETE CASCADE,
+                lexicon_version TEXT NOT NULL,
+                is_negative INTEGER NOT NULL,
+                is_venting INTEGER NOT NULL,
+                is_struggling INTEGER NOT NULL,
+                negative_score REAL NOT NULL DEFAULT 0,
+                venting_score REAL NOT NULL DEFAULT 0,
+                struggling_score REAL NOT NULL DEFAULT 0,
+                keywords TEXT,
+                recommended_mode TEXT,
+                analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_emotion_version ON emotion_scores(lexicon_version);
+            CREATE INDEX IF NOT EXISTS idx_emotion_mode ON emotion_scores(recommended_mode);
+
+            -- 日記の削除・本文の変更で古くなった解析結果を消す
+            CREATE TRIGGER IF NOT EXISTS trg_emotion_after_diary_delete
+            AFTER DELETE ON diary_entries
+            BEGIN
+                DELETE FROM emotion_scores WHERE entry_id = OLD.id;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_emotion_after_content_update
+            AFTER UPDATE OF content ON diary_entries
+            BEGIN
+                DELETE FROM emotion_scores WHERE entry_id = OLD.id;
+            END;
+
+            -- 変更カウンタ: 日記・タスク・感情検知が変わるたびに増える（キャッシュの無効化用）
+            CREATE TABLE IF NOT EXISTS db_revision (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                revision INTEGER NOT NULL
+            );
+
+            INSERT OR IGNORE INTO db_revision (id, revision) VALUES (1, 0);
+
+            CREATE TRIGGER IF NOT EXISTS trg_revision_after_diary_insert
+            AFTER INSERT ON diary_entries
+            BEGIN
+                UPDATE db_revision SET revision = revision + 1 WHERE id = 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_revision_after_diary_update
+            AFTER UPDATE ON diary_entries
+            BEGIN
+                UPDATE db_revision SET revision = revision + 1 WHERE id = 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_revision_after_diary_delete
+            AFTER DELETE ON diary_entries
+            BEGIN
+                UPDATE db_revision SET revision = revision + 1 WHERE id = 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_revision_after_task_insert
+            AFTER INSERT ON tasks
+            BEGIN
+                UPDATE db_revision SET revision = revision + 1 WHERE id = 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_revision_after_task_update
+            AFTER UPDATE ON tasks
+            BEGIN
+                UPDATE db_revision SET revision = revision + 1 WHERE id = 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_revision_after_task_delete
+            AFTER DELETE ON tasks
+            BEGIN
+                UPDATE db_revision SET revision = revision + 1 WHERE id = 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_revision_after_emotion_insert
+            AFTER INSERT ON emotion_scores
+            BEGIN
+                UPDATE db_revision SET revision = revision + 1 WHERE id = 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_revision_after_emotion_update
+            AFTER UPDATE ON emotion_scores
+            BEGIN
+                UPDATE db_revision SET revision = revision + 1 WHERE id = 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_revision_after_emotion_delete
+            AFTER DELETE ON emotion_scores
+            BEGIN
+                UPDATE db_revision SET revision = revision + 1 WHERE id = 1;
+            END;
+
+            -- スプール（DBを使えなかった時に一時保存した書き込み）から反映済みのキー（二重に反映しないため）
+            CREATE TABLE IF NOT EXISTS spool_applied (
+                key TEXT PRIMARY KEY,
+                op TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            ) WITHOUT ROWID;
+
+            -- 日ごとの集計（統計・カレンダー用）: 日記の有無・気分・記入項目、完了タスク数・難易度変化
+            CREATE TABLE IF NOT EXISTS daily_rollup (
+                date DATE PRIMARY KEY,
+                has_entry INTEGER NOT NULL DEFAULT 0,
+                mood TEXT,
+                learned_today INTEGER NOT NULL DEFAULT 0,
+                compared_to_past INTEGER NOT NULL DEFAULT 0,
+                invisible_growth INTEGER NOT NULL DEFAULT 0,
+                external_feedback INTEGER NOT NULL DEFAULT 0,
+                self_assessment INTEGER NOT NULL DEFAULT 0,
+                tasks_completed INTEGER NOT NULL DEFAULT 0,
+                difficulty_count INTEGER NOT NULL DEFAULT 0,
+                difficulty_improvement INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID;
+
+            CREATE TRIGGER IF NOT EXISTS trg_rollup_after_diary_insert
+            AFTER INSERT ON diary_entries
+            BEGIN
+                INSERT INTO daily_rollup (
+                    date, has_entry, mood, learned_today, compared_to_past,
+                    invisible_growth, external_feedback, self_assessment
+                ) VALUES (
+                    NEW.date, 1, NEW.mood,
+                    IFNULL(NEW.learned_today, '') <> '', IFNULL(NEW.compared_to_past, '') <> '',
+                    IFNULL(NEW.invisible_growth, '') <> '', IFNULL(NEW.external_feedback, '') <> '',
+                    IFNULL(NEW.self_assessment, '') <> ''
+                )
+                ON CONFLICT (date) DO UPDATE SET
+                    has_entry = 1, mood = excluded.mood,
+                    learned_today = excluded.learned_today, compared_to_past = excluded.compared_to_past,
+                    invisible_growth = excluded.invisible_growth, external_feedback = excluded.external_feedback,
+                    self_assessment = excluded.self_assessment;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_rollup_after_diary_delete
+            AFTER DELETE ON diary_entries
+            BEGIN
+                UPDATE daily_rollup SET
+                    has_entry = 0, mood = NULL, learned_today = 0, compared_to_past = 0,
+                    invisible_growth = 0, external_feedback = 0, self_assessment = 0
+                WHERE date = OLD.date;
+                DELETE FROM daily_rollup WHERE date = OLD.date AND tasks_completed = 0;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_rollup_after_diary_update
+            AFTER UPDATE OF date, mood, learned_today, compared_to_past, invisible_growth,
+                external_feedback, self_assessment
+            ON diary_entries
+            BEGIN
+                UPDATE daily_rollup SET
+                    has_entry = 0, mood = NULL, learned_today = 0, compared_to_past = 0,
+                    invisible_growth = 0, external_feedback = 0, self_assessment = 0
+                WHERE date = OLD.date;
+                DELETE FROM daily_rollup WHERE date = OLD.date AND tasks_completed = 0;
+                INSERT INTO daily_rollup (
+                    date, has_entry, mood, learned_today, compared_to_past,
+                    invisible_growth, external_feedback, self_assessment
+                ) VALUES (
+                    NEW.date, 1, NEW.mood,
+                    IFNULL(NEW.learned_today, '') <> '', IFNULL(NEW.compared_to_past, '') <> '',
+                    IFNULL(NEW.invisible_growth, '') <> '', IFNULL(NEW.external_feedback, '') <> '',
+                    IFNULL(NEW.self_assessment, '') <> ''
+                )
+                ON CONFLICT (date) DO UPDATE SET
+                    has_entry = 1, mood = excluded.mood,
+                    learned_today = excluded.learned_today, compared_to_past = excluded.compared_to_past,
+                    invisible_growth = excluded.invisible_growth, external_feedback = excluded.external_feedback,
+                    self_assessment = excluded.self_assessment;
+            END;
+
+            -- 完了タスク（完了日のあるもの）だけを完了日の行に数える
+            CREATE TRIGGER IF NOT EXISTS trg_rollup_after_task_insert
+            AFTER INSERT ON tasks
+            WHEN NEW.status = 'done' AND NEW.completed_date IS NOT NULL
+            BEGIN
+                INSERT INTO daily_rollup (date, tasks_completed, difficulty_count, difficulty_improvement)
+                SELECT NEW.completed_date, 1, has_difficulty,
+                       CASE WHEN has_difficulty THEN NEW.difficulty_before - NEW.difficulty_after ELSE 0 END
+                FROM (SELECT IFNULL(NEW.difficulty_before, 0) <> 0 AND IFNULL(NEW.difficulty_after, 0) <> 0
+                      AS has_difficulty)
+                WHERE true
+                ON CONFLICT (date) DO UPDATE SET
+                    tasks_completed = tasks_completed + 1,
+                    difficulty_count = difficulty_count + excluded.difficulty_count,
+                    difficulty_improvement = difficulty_improvement + excluded.difficulty_improvement;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_rollup_after_task_delete
+            AFTER DELETE ON tasks
+            WHEN OLD.status = 'done' AND OLD.completed_date IS NOT NULL
+            BEGIN
+                UPDATE daily_rollup SET
+                    tasks_completed = tasks_completed - 1,
+                    difficulty_count = difficulty_count - has_difficulty,
+                    difficulty_improvement = difficulty_improvement
+                        - CASE WHEN has_difficulty THEN OLD.difficulty_before - OLD.difficulty_after ELSE 0 END
+                FROM (SELECT IFNULL(OLD.difficulty_before, 0) <> 0 AND IFNULL(OLD.difficulty_after, 0) <> 0
+                      AS has_difficulty)
+                WHERE date = OLD.completed_date;
+                DELETE FROM daily_rollup WHERE date = OLD.completed_date AND has_entry = 0 AND tasks_completed = 0;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_rollup_after_task_update
+            AFTER UPDATE OF status, completed_date, difficulty_before, difficulty_after ON tasks
+            BEGIN
+                UPDATE daily_rollup SET
+                    tasks_completed = tasks_completed - 1,
+                    difficulty_count = difficulty_count - has_difficulty,
+                    difficulty_improvement = difficulty_improvement
+                        - CASE WHEN has_difficulty THEN OLD.difficulty_before - OLD.difficulty_after ELSE 0 END
+                FROM (SELECT IFNULL(OLD.difficulty_before, 0) <> 0 AND IFNULL(OLD.difficulty_after, 0) <> 0
+                      AS has_difficulty)
+                WHERE date = OLD.completed_date AND OLD.status = 'done';
+                DELETE FROM daily_rollup WHERE date = OLD.completed_date AND has_entry = 0 AND tasks_completed = 0;
+                INSERT INTO daily_rollup (date, tasks_completed, difficulty_count, difficulty_improvement)
+                SELECT NEW.completed_date, 1, has_difficulty,
+                       CASE WHEN has_difficulty THEN NEW.difficulty_before - NEW.difficulty_after ELSE 0 END
+                FROM (SELECT IFNULL(NEW.difficulty_before, 0) <> 0 AND IFNULL(NEW.difficulty_after, 0) <> 0
+                      AS has_difficulty)
+                WHERE NEW.status = 'done' AND NEW.completed_date IS NOT NULL
+                ON CONFLICT (date) DO UPDATE SET
+                    tasks_completed = tasks_completed + 1,
+                    difficulty_count = difficulty_count + excluded.difficulty_count,
+                    difficulty_improvement = difficulty_improvement + excluded.difficulty_improvement;
+            END;
+
+            -- 日記追加時: 前後の連続期間と結合する
+            CREATE TRIGGER IF NOT EXISTS trg_streak_after_insert
+            AFTER INSERT ON diary_entries
+            BEGIN
+                INSERT OR REPLACE INTO streak_runs (start_date, end_date) VALUES (
+                    COALESCE(
+                        (SELECT start_date FROM streak_runs WHERE end_date = date(NEW.date, '-1 day')),
+                        NEW.date
+                    ),
+                    COALESCE(
+                        (SELECT end_date FROM streak_runs WHERE start_date = date(NEW.date, '+1 day')),
+                        NEW.date
+                    )
+                );
+                DELETE FROM streak_runs WHERE start_date = date(NEW.date, '+1 day');
+            END;
+
+            -- 日記削除時: 含まれていた連続期間を前後に分割する
+            CREATE TRIGGER IF NOT EXISTS trg_streak_after_delete
+            AFTER DELETE ON diary_entries
+            BEGIN
+                INSERT INTO streak_runs (start_date, end_date)
+                    SELECT date(OLD.date, '+1 day'), end_date FROM streak_runs
+                    WHERE start_date <= OLD.date AND end_date > OLD.date;
+                UPDATE streak_runs SET end_date = date(OLD.date, '-1 day')
+                    WHERE start_date < OLD.date AND end_date >= OLD.date;
+                DELETE FROM streak_runs WHERE start_date = OLD.date;
+            END;
+        """)
+
+    def _create_search_index(self, conn: sqlite3.Connection) -> bool:
+        """全文検索用のFTS5テーブルとトリガーを作成
+
+        FTS5やtrigramトークナイザが使えないSQLiteでは作成せずFalseを返す。
+        """
+        conn.execute("SAVEPOINT search_index")
+        try:
+            execute_script(conn, """
+                -- 日記の全文検索（trigramなので日本語も形態素解析なしで検索できる）
+                CREATE VIRTUAL TABLE IF NOT EXISTS diary_fts USING fts5(
+                    content, learned_today, compared_to_past, invisible_growth, external_feedback,
+                    content='diary_entries', content_rowid='id', tokenize='trigram'
                 );
 
-                CREATE INDEX IF NOT EXISTS idx_diary_date ON diary_entries(date DESC);
-                CREATE INDEX IF NOT EXISTS idx_diary_mood ON diary_entries(mood);
-
-                -- タスクテーブル
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    description TEXT,
-                    status TEXT DEFAULT 'todo',
-                    priority TEXT DEFAULT 'medium',
-
-                    -- 成長記録
-                    learnings TEXT,
-                    difficulty_before INTEGER,
-                    difficulty_after INTEGER,
-                    time_estimated REAL,
-                    time_actual REAL,
-
-                    -- 比較データ
-                    similar_task_before TEXT,
-                    improvement_notes TEXT,
-
-                    -- 外部評価
-                    external_review TEXT,
-
-                    -- メタデータ
-                    created_date DATE NOT NULL,
-                    completed_date DATE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                CREATE TRIGGER IF NOT EXISTS trg_diary_fts_after_insert
+                AFTER INSERT ON diary_entries
+                BEGIN
+                    INSERT INTO diary_fts (
+                        rowid, content, learned_today, compared_to_past, invisible_growth, external_feedback
+                    ) VALUES (
+                        NEW.id, NEW.content, NEW.learned_today, NEW.compared_to_past,
+                        NEW.invisible_growth, NEW.external_feedback
+                    );
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_diary_fts_after_delete
+                AFTER DELETE ON diary_entries
+                BEGIN
+                    INSERT INTO diary_fts (
+                        diary_fts, rowid, content, learned_today, compared_to_past, invisible_growth, external_feedback
+                    ) VALUES (
+                        'delete', OLD.id, OLD.content, OLD.learned_today, OLD.compared_to_past,
+                        OLD.invisible_growth, OLD.external_feedback
+                    );
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_diary_fts_after_update
+                AFTER UPDATE OF content, learned_today, compared_to_past, invisible_growth, external_feedback
+                ON diary_entries
+                BEGIN
+                    INSERT INTO diary_fts (
+                        diary_fts, rowid, content, learned_today, compared_to_past, invisible_growth, external_feedback
+                    ) VALUES (
+                        'delete', OLD.id, OLD.content, OLD.learned_today, OLD.compared_to_past,
+                        OLD.invisible_growth, OLD.external_feedback
+                    );
+                    INSERT INTO diary_fts (
+                        rowid, content, learned_today, compared_to_past, invisible_growth, external_feedback
+                    ) VALUES (
+                        NEW.id, NEW.content, NEW.learned_today, NEW.compared_to_past,
+                        NEW.invisible_growth, NEW.external_feedback
+                    );
+                END;
+
+                -- タスクの全文検索
+                CREATE VIRTUAL TABLE IF NOT EXISTS task_fts USING fts5(
+                    title, description, learnings,
+                    content='tasks', content_rowid='id', tokenize='trigram'
                 );
 
-                CREATE INDEX IF NOT EXISTS idx_task_status ON tasks(status);
-                CREATE INDEX IF NOT EXISTS idx_task_completed_date ON tasks(completed_date DESC);
-                CREATE INDEX IF NOT EXISTS idx_task_created_date ON tasks(created_date DESC);
+                CREATE TRIGGER IF NOT EXISTS trg_task_fts_after_insert
+                AFTER INSERT ON tasks
+                BEGIN
+                    INSERT INTO task_fts (rowid, title, description, learnings)
+                    VALUES (NEW.id, NEW.title, NEW.description, NEW.learnings);
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_task_fts_after_delete
+                AFTER DELETE ON tasks
+                BEGIN
+                    INSERT INTO task_fts (task_fts, rowid, title, description, learnings)
+                    VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.learnings);
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_task_fts_after_update
+                AFTER UPDATE OF title, description, learnings ON tasks
+                BEGIN
+                    INSERT INTO task_fts (task_fts, rowid, title, description, learnings)
+                    VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.learnings);
+                    INSERT INTO task_fts (rowid, title, description, learnings)
+                    VALUES (NEW.id, NEW.title, NEW.description, NEW.learnings);
+                END;
             """)
+        except sqlite3.OperationalError:
+            conn.execute("ROLLBACK TO search_index")
+            return False
+        finally:
+            conn.execute("RELEASE search_index")
+        return True
 
-    @contextmanager
-    def get_connection(self) -> Generator[sqlite3.Connection, None, None]:
-        """DB接続のコンテキストマネージャ"""
-        conn = sqlite3.connect(self.db_path)
+    def get_revision(self) -> int:
+        """データの変更カウンタを取得"""
+        with self.get_connection() as conn:
+            return conn.execute("SELECT revision FROM db_revision WHERE id = 1").fetchone()[0]
+
+    def _connect(self) -> sqlite3.Connection:
+        """新しい接続を開いてプロファイルのPRAGMAを適用"""
+        tracer = tracing.active()
+        if tracer is not None:
+            tracer.count("connect")
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout / 1000,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=TracingConnection if tracer is not None else sqlite3.Connection,
+        )
         conn.row_factory = sqlite3.Row
+
+        for pragma, value in PERFORMANCE_PROFILES[self.performance_profile].items():
+            # journal_mode は結果行を返すので読み捨てる
+            conn.execute(f"PRAGMA {pragma} = {value}").fetchall()
+
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _get_thread_connection(self) -> sqlite3.Connection:
+        """現在のスレッド用の接続を取得（fork後の子プロセスでは開き直す）"""
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            local.conn = self._connect()
+            local.pid = os.getpid()
+            local.depth = 0
+        return local.conn
+
+    @contextmanager
+    def get_connection(self, begin: Optional[str] = None) -> Generator[sqlite3.Connection, None, None]:
+        """DB接続のコンテキストマネージャ
+
+        ネストした場合は最も外側のブロックでのみコミット/ロールバックする。
+        begin を指定すると、最も外側のブロックの最初に明示的にトランザクションを始める
+        （"IMMEDIATE": 書き込みロックを先に取る / "DEFERRED": 最初の読み取り時点のスナップショットを読む）。
+        """
+        conn = self._get_thread_connection()
+        tracer = tracing.active()
+        if tracer is not None:
+            tracer.count("get_connection")
+        outermost = self._local.depth == 0
+        self._local.depth += 1
         try:
+            if outermost and begin and not conn.in_transaction:
+                conn.execute(f"BEGIN {begin}")
             yield conn
-            conn.commit()
-        except Exception:
-            conn.rollback()
+            if outermost:
+                conn.commit()
+        except BaseException:
+            if outermost:
+                conn.rollback()
             raise
         finally:
-            conn.close()
+            self._local.depth -= 1
+
+    def snapshot(self):
+        """読み取りをまとめるブロック: 中のクエリは全て同じ時点のデータを読む
+
+        統計・振り返りのように複数のクエリの結果を組み合わせる処理で、
+        途中で他のプロセスが書き込んでも数字が食い違わないようにする。
+        """
+        return self.get_connection("DEFERRED")
+
+    def write(self, func: Callable[[sqlite3.Connection], T], budget: Optional[float] = None) -> T:
+        """func(conn) を書き込みトランザクション（BEGIN IMMEDIATE）で実行する
+
+        最初に書き込みロックを取るので、読み取りの途中で他のプロセスの書き込みとぶつかって失敗することがない。
+        busy_timeout 待ってもロックを取れなかった場合は、間隔をあけて WRITE_RETRIES 回までやり直し、
+        それでも取れなければ DatabaseBusyError を送出する。
+        budget（秒）を指定すると、ロック待ちとやり直しを合わせてその時間で打ち切る。
+        既にトランザクションの中にいる場合はやり直さない（外側の処理ごとやり直す必要があるため）。
+        """
+        deadline = None if budget is None else time.monotonic() + budget
+        attempt = 0
+        while True:
+            conn = self._get_thread_connection()
+            nested = self._local.depth > 0
+            limited = deadline is not None and not nested
+            if limited:
+                remaining = max(deadline - time.monotonic(), 0.0)
+                conn.execute(f"PRAGMA busy_timeout = {int(min(remaining * 1000, self.busy_timeout))}")
+            try:
+                with self.get_connection("IMMEDIATE") as conn:
+                    return func(conn)
+            except sqlite3.OperationalError as e:
+                if nested or not is_busy_error(e):
+                    raise
+                if attempt >= WRITE_RETRIES or (deadline is not None and time.monotonic() >= deadline):
+                    raise DatabaseBusyError(
+                        f"データベースが他の処理で使用中です（{attempt + 1}回試しました）: {self.db_path}"
+                    ) from e
+            finally:
+                if limited:
+                    conn.execute(f"PRAGMA busy_timeout = {self.busy_timeout}")
+            # 同時に待っていたプロセスが一斉にやり直さないよう、待ち時間をばらつかせる
+            delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+            if deadline is not None:
+                delay = min(delay, max(deadline - time.monotonic(), 0.0))
+            time.sleep(random.uniform(delay / 2, delay))
+            attempt += 1
+            tracer = tracing.active()
+            if tracer is not None:
+                tracer.count("write_retry")
+
+    def close(self):
+        """このインスタンスが開いた全接続を閉じる"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # 別スレッドで開いた接続はそのスレッドの終了とともに破棄される
+                pass
+        self._local = threading.local()
+
+
+def execute_script(conn: sqlite3.Connection, script: str):
+    """複数のSQL文を1文ずつ実行する
+
+    executescript と違って実行前にコミットしないので、マイグレーションをトランザクションの中で適用できる。
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+    if statement.strip():
+        conn.execute(statement)
+
+
+def _migrate_compact_indexes(conn: sqlite3.Connection):
+    """バージョン2: インデックスを小さくする
+
+    - idx_diary_date は date の UNIQUE 制約の自動インデックスと同じ内容なので削除する
+    - 未完了タスクの一覧（status != 'done' を作成日の新しい順）は、未完了の行だけの部分インデックスで引く。
+      status だけのインデックスはこれで不要になる
+    - 完了日のインデックスは完了日のあるタスクだけにする（完了日の範囲の条件なら常に使える）
+    """
+    execute_script(conn, """
+        DROP INDEX IF EXISTS idx_diary_date;
+
+        DROP INDEX IF EXISTS idx_task_status;
+        CREATE INDEX IF NOT EXISTS idx_task_active
+            ON tasks(created_date DESC, id DESC) WHERE status != 'done';
+
+        DROP INDEX IF EXISTS idx_task_completed_date;
+        CREATE INDEX IF NOT EXISTS idx_task_completed_date
+            ON tasks(completed_date DESC) WHERE completed_date IS NOT NULL;
+    """)
+
+
+def _migrate_streak_date_update(conn: sqlite3.Connection):
+    """バージョン3: 日記の日付の変更を連続記録テーブルに反映するトリガー
+
+    古い日付の削除（trg_streak_after_delete）と新しい日付の追加（trg_streak_after_insert）を続けて行う。
+    これまでに日付を変更して食い違っている可能性があるので、連続記録テーブルも作り直す。
+    """
+    execute_script(conn, """
+        CREATE TRIGGER IF NOT EXISTS trg_streak_after_date_update
+        AFTER UPDATE OF date ON diary_entries
+        WHEN OLD.date IS NOT NEW.date
+        BEGIN
+            INSERT INTO streak_runs (start_date, end_date)
+                SELECT date(OLD.date, '+1 day'), end_date FROM streak_runs
+                WHERE start_date <= OLD.date AND end_date > OLD.date;
+            UPDATE streak_runs SET end_date = date(OLD.date, '-1 day')
+                WHERE start_date < OLD.date AND end_date >= OLD.date;
+            DELETE FROM streak_runs WHERE start_date = OLD.date;
+
+            INSERT OR REPLACE INTO streak_runs (start_date, end_date) VALUES (
+                COALESCE(
+                    (SELECT start_date FROM streak_runs WHERE end_date = date(NEW.date, '-1 day')),
+                    NEW.date
+                ),
+                COALESCE(
+                    (SELECT end_date FROM streak_runs WHERE start_date = date(NEW.date, '+1 day')),
+                    NEW.date
+                )
+            );
+            DELETE FROM streak_runs WHERE start_date = date(NEW.date, '+1 day');
+        END;
+    """)
+    rebuild_streak_runs(conn)
+
+
+def rebuild_streak_runs(conn: sqlite3.Connection):
+    """日記エントリから連続記録テーブルを作り直す"""
+    conn.execute("DELETE FROM streak_runs")
+    # 日付から連番を引いた値が同じ日記は、同じ連続期間に属する
+    conn.execute("""
+        INSERT INTO streak_runs (start_date, end_date)
+        SELECT MIN(date), MAX(date) FROM (
+            SELECT date, julianday(date) - ROW_NUMBER() OVER (ORDER BY date) AS grp
+            FROM diary_entries
+        )
+        GROUP BY grp
+    """)
+
+
+def rebuild_daily_rollup(conn: sqlite3.Connection) -> int:
+    """日記・タスクから日ごとの集計テーブルを作り直す（作成した行数を返す）"""
+    conn.execute("DELETE FROM daily_rollup")
+    conn.execute("""
+        INSERT INTO daily_rollup (
+            date, has_entry, mood, learned_today, compared_to_past,
+            invisible_growth, external_feedback, self_assessment
+        )
+        SELECT date, 1, mood,
+               IFNULL(learned_today, '') <> '', IFNULL(compared_to_past, '') <> '',
+               IFNULL(invisible_growth, '') <> '', IFNULL(external_feedback, '') <> '',
+               IFNULL(self_assessment, '') <> ''
+        FROM diary_entries
+    """)
+    conn.execute("""
+        INSERT INTO daily_rollup (date, tasks_completed, difficulty_count, difficulty_improvement)
+        SELECT completed_date, COUNT(*), SUM(has_difficulty),
+               SUM(CASE WHEN has_difficulty THEN difficulty_before - difficulty_after ELSE 0 END)
+        FROM (
+            SELECT completed_date, difficulty_before, difficulty_after,
+                   IFNULL(difficulty_before, 0) <> 0 AND IFNULL(difficulty_after, 0) <> 0 AS has_difficulty
+            FROM tasks
+            WHERE status = 'done' AND completed_date IS NOT NULL
+        )
+        WHERE true
+        GROUP BY completed_date
+        ON CONFLICT (date) DO UPDATE SET
+            tasks_completed = excluded.tasks_completed,
+            difficulty_count = excluded.difficulty_count,
+            difficulty_improvement = excluded.difficulty_improvement
+    """)
+    return conn.execute("SELECT COUNT(*) FROM daily_rollup").fetchone()[0]
+
+
+def rebuild_search_index(conn: sqlite3.Connection):
+    """全文検索インデックスを元テーブルから作り直す"""
+    conn.execute("INSERT INTO diary_fts (diary_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO task_fts (task_fts) VALUES ('rebuild')")
+
+
+_databases: Dict[Tuple[Path, str], Database] = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(db_path: Optional[Path] = None, performance_profile: Optional[str] = None) -> Database:
+    """プロセス共有のDatabaseインスタンスを取得（db_path 省略時は使用中のプロファイルのDB）"""
+    path = Path(db_path) if db_path else resolve_db_path()
+    profile = (
+        performance_profile
+        or os.environ.get("SELFCLAP_PERF_PROFILE")
+        or DEFAULT_PERFORMANCE_PROFILE
+    )
+    key = (path, profile)
+
+    with _databases_lock:
+        db = _databases.get(key)
+        if db is None:
+            db = Database(path, profile)
+            _databases[key] = db
+        return db
+
+
+@atexit.register
+def close_all_databases():
+    """プロセス終了時に共有接続を閉じる（WALのチェックポイントもここで走る）"""
+    with _databases_lock:
+        databases = list(_databases.values())
+        _databases.clear()
+    for db in databases:
+        db.close()
@@ -0,0 +1,287 @@
+"""絞り込み条件の式（--where）をSQLに変換する
+
+例: mood in (tired,stressed) and has:learned and date>=2026-01-01
+
+    式     := 条件 (and|or 条件)...     ※ and は or より優先
+    条件   := not 条件 | ( 式 ) | has:項目 | 項目 演算子 値 | 項目 in (値, ...)
+    演算子 := = != < <= > >= ~（~ は部分一致）
+
+値は空白などを含む場合 "..." で囲む。日付には today や -7d（7日前）も使える。
+項目名は列名のホワイトリストから引き、値は全てパラメータとして渡すので、
+date や mood の条件はそのまま date の UNIQUE インデックスや idx_diary_mood で引ける。
+"""
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class FilterError(ValueError):
+    """絞り込み条件の式が不正"""
+
+
+class Field(NamedTuple):
+    column: str
+    kind: str  # date / int / real / text / choice / flag
+    choices: Tuple[str, ...] = ()
+
+
+_DIARY_FIELDS = {
+    "id": Field("id", "int"),
+    "date": Field("date", "date"),
+    "content": Field("content", "text"),
+    "learned": Field("learned_today", "text"),
+    "compared": Field("compared_to_past", "text"),
+    "invisible": Field("invisible_growth", "text"),
+    "external": Field("external_feedback", "text"),
+    "self": Field("self_assessment", "text"),
+    "mood": Field("mood", "text"),
+    "energy": Field("energy_level", "int"),
+    "challenges": Field("challenges_faced", "text"),
+    "overcome": Field("how_overcome", "text"),
+}
+
+_TASK_FIELDS = {
+    "id": Field("id", "int"),
+    "title": Field("title", "text"),
+    "description": Field("description", "text"),
+    "status": Field("status", "choice", ("todo", "in_progress", "done")),
+    "priority": Field("priority", "choice", ("low", "medium", "high")),
+    "learnings": Field("learnings", "text"),
+    "before": Field("difficulty_before", "int"),
+    "after": Field("difficulty_after", "int"),
+    "estimated": Field("time_estimated", "real"),
+    "actual": Field("time_actual", "real"),
+    "review": Field("external_review", "text"),
+    "created": Field("created_date", "date"),
+    "completed": Field("completed_date", "date"),
+}
+
+# 日ごとの集計（daily_rollup）: stats の絞り込み用
+_DAY_FIELDS = {
+    "date": Field("date", "date"),
+    "mood": Field("mood", "text"),
+    "entry": Field("has_entry", "flag"),
+    "learned": Field("learned_today", "flag"),
+    "compared": Field("compared_to_past", "flag"),
+    "invisible": Field("invisible_growth", "flag"),
+    "external": Field("external_feedback", "flag"),
+    "self": Field("self_assessment", "flag"),
+    "tasks": Field("tasks_completed", "int"),
+}
+
+
+def _with_column_names(fields: Dict[str, Field]) -> Dict[str, Field]:
+    """短い名前に加えて列名そのものでも指定できるようにする"""
+    return {**{f.column: f for f in fields.values()}, **fields}
+
+
+# 絞り込みの対象: 名前 → (テーブル, 項目, 一覧の並び順)
+TARGETS: Dict[str, Tuple[str, Dict[str, Field], str]] = {
+    "diary": ("diary_entries", _with_column_names(_DIARY_FIELDS), "date DESC"),
+    "tasks": ("tasks", _with_column_names(_TASK_FIELDS), "created_date DESC, id DESC"),
+    "days": ("daily_rollup", _with_column_names(_DAY_FIELDS), "date DESC"),
+}
+
+_OPERATORS = ("<=", ">=", "!=", "=", "<", ">", "~")
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op><=|>=|!=|=|<|>|~)
+      | (?P<punct>[(),])
+      | (?P<word>[^\s(),=<>!~"']+)
+    )
+""", re.VERBOSE)
+
+_RELATIVE_DAYS = re.compile(r"^-(\d+)d$")
+
+
+@dataclass(frozen=True)
+class Filter:
+    """コンパイル済みの絞り込み条件（WHERE句に AND で追加する）"""
+    expression: str
+    sql: str
+    params: tuple
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str]]:
+    tokens = []
+    pos = 0
+    expression = expression.rstrip()
+    while pos < len(expression):
+        match = _TOKEN.match(expression, pos)
+        if not match:
+            raise FilterError(f"解釈できない文字があります: {expression[pos:].strip()[:20]}")
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "string":
+            text = re.sub(r"\\(.)", r"\1", text[1:-1])
+        tokens.append((kind, text))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """再帰下降で式を読み、SQLの断片とパラメータを組み立てる"""
+
+    def __init__(self, tokens: List[Tuple[str, str]], fields: Dict[str, Field], alias: str):
+        self.tokens = tokens
+        self.pos = 0
+        self.fields = fields
+        self.prefix = f"{alias}." if alias else ""
+        self.params: list = []
+
+    def peek(self) -> Optional[Tuple[str, str]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def next(self, expected: str = "値") -> Tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise FilterError(f"式が途中で終わっています（{expected}が必要です）")
+        self.pos += 1
+        return token
+
+    def keyword(self, word: str) -> bool:
+        token = self.peek()
+        if token and token[0] == "word" and token[1].lower() == word:
+            self.pos += 1
+            return True
+        return False
+
+    def expect_punct(self, char: str):
+        kind, text = self.next(f"「{char}」")
+        if kind != "punct" or text != char:
+            raise FilterError(f"「{char}」が必要なところに「{text}」があります")
+
+    def parse(self) -> str:
+        sql = self.parse_or()
+        token = self.peek()
+        if token is not None:
+            raise FilterError(f"余分な語があります: {token[1]}")
+        return sql
+
+    def parse_or(self) -> str:
+        parts = [self.parse_and()]
+        while self.keyword("or"):
+            parts.append(self.parse_and())
+        return parts[0] if len(parts) == 1 else "(" + " OR ".join(parts) + ")"
+
+    def parse_and(self) -> str:
+        parts = [self.parse_not()]
+        while self.keyword("and"):
+            parts.append(self.parse_not())
+        return parts[0] if len(parts) == 1 else " AND ".join(parts)
+
+    def parse_not(self) -> str:
+        if self.keyword("not"):
+            return f"NOT ({self.parse_not()})"
+        return self.parse_atom()
+
+    def parse_atom(self) -> str:
+        kind, text = self.next("条件")
+        if kind == "punct" and text == "(":
+            # and は or より優先されるので、or の結合は parse_or で括弧に入っている
+            sql = self.parse_or()
+            self.expect_punct(")")
+            return sql
+        if kind != "word":
+            raise FilterError(f"条件が必要なところに「{text}」があります")
+
+        if text.lower().startswith("has:"):
+            field = self.field(text[4:])
+            column = self.prefix + field.column
+            if field.kind == "flag":
+                return f"{column} <> 0"
+            if field.kind == "text":
+                return f"({column} IS NOT NULL AND {column} <> '')"
+            return f"{column} IS NOT NULL"
+
+        field = self.field(text)
+        column = self.prefix + field.column
+
+        if self.keyword("in"):
+            self.expect_punct("(")
+            values = [self.value(field)]
+            while True:
+                kind, text = self.next("「)」")
+                if kind == "punct" and text == ")":
+                    break
+                if kind != "punct" or text != ",":
+                    raise FilterError(f"in の値は「,」で区切ってください（「{text}」）")
+                values.append(self.value(field))
+            self.params.extend(values)
+            return f"{column} IN ({', '.join('?' * len(values))})"
+
+        kind, op = self.next("演算子")
+        if kind != "op":
+            raise FilterError(f"{text} の後には演算子（{' '.join(_OPERATORS)}）か in が必要です")
+        if field.kind == "flag":
+            raise FilterError(f"{text} は has:{text} の形で指定してください")
+        if op == "~":
+            if field.kind != "text":
+                raise FilterError(f"~（部分一致）は文字列の項目にだけ使えます: {text}")
+            pattern = self.next()[1]
+            self.params.append("%" + pattern.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+            return f"{column} LIKE ? ESCAPE '\\'"
+        if field.kind in ("text", "choice") and op not in ("=", "!="):
+            raise FilterError(f"{text} には = != ~ in だけが使えます")
+
+        self.params.append(self.value(field))
+        return f"{column} {op} ?"
+
+    def field(self, name: str) -> Field:
+        field = self.fields.get(name.lower())
+        if field is None:
+            names = ", ".join(sorted(n for n in self.fields if "_" not in n))
+            raise FilterError(f"不明な項目です: {name}（使える項目: {names}）")
+        return field
+
+    def value(self, field: Field):
+        kind, text = self.next()
+        if kind not in ("word", "string"):
+            raise FilterError(f"値が必要なところに「{text}」があります")
+        try:
+            if field.kind == "date":
+                return _parse_date(text)
+            if field.kind == "int":
+                return int(text)
+            if field.kind == "real":
+                return float(text)
+        except ValueError:
+            raise FilterError(f"{field.column} の値が不正です: {text}")
+        if field.kind == "choice" and text not in field.choices:
+            raise FilterError(f"{field.column} は {'/'.join(field.choices)} のいずれかです: {text}")
+        return text
+
+
+def _parse_date(text: str) -> date:
+    """YYYY-MM-DD / today / -7d（今日から7日前）"""
+    if text.lower() == "today":
+        return date.today()
+    relative = _RELATIVE_DAYS.match(text)
+    if relative:
+        return date.today() - timedelta(days=int(relative.group(1)))
+    return date.fromisoformat(text)
+
+
+def compile_filter(expression: str, target: str, alias: str = "") -> Filter:
+    """式を target（diary / tasks / days）のWHERE句の断片にする
+
+    alias を指定すると列名に「alias.」を付ける（JOINするクエリ用）。
+    """
+    if target not in TARGETS:
+        raise FilterError(f"不明な対象です: {target}")
+    tokens = _tokenize(expression)
+    if not tokens:
+        raise FilterError("条件が空です")
+    parser = _Parser(tokens, TARGETS[target][1], alias)
+    sql = parser.parse()
+    return Filter(expression, sql, tuple(parser.params))
+
+
+def listing_query(target: str, where: Optional[Filter] = None) -> Tuple[str, tuple]:
+    """一覧と同じ並び順で絞り込むクエリ（EXPLAIN QUERY PLAN の確認用）"""
+    table, _, order = TARGETS[target]
+    condition = f" WHERE {where.sql}" if where else ""
+    return f"SELECT * FROM {table}{condition} ORDER BY {order}", (where.params if where else ())
@@ -0,0 +1,146 @@
+"""分析用に列ごとの配列で読み込む（DiaryQueries.fetch_columns / TaskQueries.fetch_columns）
+
+行ごとにモデルのオブジェクトを作らず、列ごとに型の決まった配列に詰める。
+
+    日付           日付の序数（date.toordinal()、NULL は 0）
+    数値           浮動小数点（NULL は NaN）
+    カテゴリ       小さい整数のコード（NULL は -1）。Frame.categories[列] で値に戻せる
+    ID             整数
+
+NumPy がインストールされていれば numpy.ndarray（読み取り専用）、なければ標準の array.array を返す。
+数万行でも、件数・平均・相関などを配列の演算でまとめて計算できる。
+"""
+import math
+from array import array
+from collections import Counter
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+DATE = "date"
+NUMBER = "number"
+CATEGORY = "category"
+INTEGER = "integer"
+
+# 種類ごとの array.array の型コード
+TYPECODES = {DATE: "i", NUMBER: "d", CATEGORY: "h", INTEGER: "q"}
+
+# julianday('0001-01-01') - 1（julianday の日付を date.toordinal() の値にする）
+_ORDINAL_OFFSET = 1721424.5
+
+# fetchmany で一度に読む行数
+FETCH_BATCH_SIZE = 2000
+
+
+class Frame:
+    """列名 → 配列（全ての列が同じ長さ、行の順番はそろっている）"""
+
+    def __init__(self, columns: Dict[str, Sequence], categories: Dict[str, Tuple[str, ...]]):
+        self.columns = columns
+        self.categories = categories
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values())))
+
+    def __getitem__(self, name: str):
+        return self.columns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def labels(self, name: str) -> List[Optional[str]]:
+        """カテゴリの列を値に戻す（NULL は None）"""
+        values = self.categories[name]
+        return [values[code] if code >= 0 else None for code in self.columns[name]]
+
+    def dates(self, name: str) -> List[Optional[date]]:
+        """日付の列を date に戻す（NULL は None）"""
+        return [date.fromordinal(int(value)) if value > 0 else None for value in self.columns[name]]
+
+    def counts(self, name: str) -> List[Tuple[str, int]]:
+        """カテゴリの列の値ごとの件数（多い順、NULL は数えない）"""
+        totals = Counter(self.columns[name])
+        return sorted(
+            ((value, totals[code]) for code, value in enumerate(self.categories[name]) if totals[code]),
+            key=lambda item: -item[1]
+        )
+
+
+def numpy_available() -> bool:
+    """NumPy を使えるか（インストールされていなければ array.array を返す）"""
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _expression(column: str, kind: str) -> str:
+    if kind == DATE:
+        return f"COALESCE(CAST(julianday({column}) - {_ORDINAL_OFFSET} AS INTEGER), 0)"
+    return column
+
+
+def _category_codes(values: Iterable, index: Dict[str, int]) -> List[int]:
+    # 現れた順にコードを振る（値の一覧は fetch_frame の最後に categories として返す）
+    return [-1 if value is None else index.setdefault(value, len(index)) for value in values]
+
+
+def fetch_frame(
+    db,
+    table: str,
+    kinds: Dict[str, str],
+    columns: Sequence[str],
+    conditions: List[str],
+    params: list,
+    order: str,
+    use_numpy: Optional[bool] = None
+) -> Frame:
+    """table の columns を列ごとの配列で読む
+
+    kinds: 読み込める列 → 種類（DATE / NUMBER / CATEGORY / INTEGER）
+    use_numpy: numpy.ndarray で返すか（省略時はインストールされていれば使う）
+    """
+    unknown = [column for column in columns if column not in kinds]
+    if unknown or not columns:
+        raise ValueError(
+            f"読み込める列は {', '.join(kinds)} です: {', '.join(unknown) or '(指定なし)'}"
+        )
+    if use_numpy is None:
+        use_numpy = numpy_available()
+
+    columns = list(dict.fromkeys(columns))
+    arrays = {column: array(TYPECODES[kinds[column]]) for column in columns}
+    indexes: Dict[str, Dict[str, int]] = {
+        column: {} for column in columns if kinds[column] == CATEGORY
+    }
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = (
+        f"SELECT {', '.join(_expression(column, kinds[column]) for column in columns)} "
+        f"FROM {table}{where} ORDER BY {order}"
+    )
+
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        # sqlite3.Row を作らずにタプルのまま読む
+        cursor.row_factory = None
+        cursor.execute(sql, tuple(params))
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            for column, values in zip(columns, zip(*rows)):
+                kind = kinds[column]
+                if kind == CATEGORY:
+                    arrays[column].extend(_category_codes(values, indexes[column]))
+                elif kind == NUMBER:
+                    arrays[column].extend([math.nan if value is None else value for value in values])
+                else:
+                    arrays[column].extend(values)
+
+    result: Dict[str, Sequence] = arrays
+    if use_numpy:
+        import numpy
+
+        # array.array のバッファをそのまま使う（コピーしないので読み取り専用の配列になる）
+        result = {column: numpy.frombuffer(values, dtype=values.typecode) for column, values in arrays.items()}
+    return Frame(result, {column: tuple(index) for column, index in indexes.items()})
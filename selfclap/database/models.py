@@ -1,10 +1,13 @@
-"""データモデル定義"""
+"""データモデル定義
+
+一覧や集計で大量に作られるため、__slots__ を使って1件あたりのメモリを抑える。
+"""
 from dataclasses import dataclass
 from datetime import date, datetime
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class DiaryEntry:
     """日記エントリ"""
     id: Optional[int]
@@ -33,7 +36,7 @@ class DiaryEntry:
     updated_at: Optional[datetime] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     """タスク"""
     id: Optional[int]
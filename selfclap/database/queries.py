@@ -1,16 +1,315 @@
 """データベースクエリ実装"""
+import json
 from datetime import date, datetime
-from typing import List, Optional
-from selfclap.database.connection import Database
+from functools import wraps
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from selfclap.database.connection import Database, get_database, rebuild_daily_rollup
+from selfclap.database.filters import Filter
+from selfclap.database.frames import CATEGORY, DATE, INTEGER, NUMBER, Frame, fetch_frame
 from selfclap.database.models import DiaryEntry, Task
 
 
+# 検索結果の抜粋でヒット箇所を囲むマーカー（表示側で装飾に置き換える）
+SNIPPET_MARK_START = "\x02"
+SNIPPET_MARK_END = "\x03"
+
+# trigramトークナイザで検索できる最短の語の長さ
+TRIGRAM_MIN_LENGTH = 3
+
+
+def _writes(method):
+    """書き込みメソッドを Database.write で実行する（BEGIN IMMEDIATE + ロック待ちのやり直し）"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.db.write(lambda conn: method(self, *args, **kwargs))
+    return wrapper
+
+
+def _build_search_filter(
+    query: str,
+    columns: List[str],
+    alias: str,
+    use_fts: bool = True
+) -> Tuple[Optional[str], List[str], list]:
+    """検索語をFTS5のMATCH式とLIKE条件に振り分ける
+
+    trigramは3文字未満の語にマッチしないため、短い語はLIKEで絞り込む。
+    FTS5が使えない場合は全ての語をLIKEで扱う。
+    """
+    terms = query.split()
+    long_terms = [t for t in terms if use_fts and len(t) >= TRIGRAM_MIN_LENGTH]
+    short_terms = [t for t in terms if t not in long_terms]
+
+    match_expr = None
+    if long_terms:
+        # 各語をフレーズとして引用し、FTS5の演算子として解釈されないようにする
+        match_expr = " AND ".join('"' + t.replace('"', '""') + '"' for t in long_terms)
+
+    like_clauses = []
+    like_params = []
+    for term in short_terms:
+        pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        like_clauses.append(
+            "(" + " OR ".join(f"{alias}.{col} LIKE ? ESCAPE '\\'" for col in columns) + ")"
+        )
+        like_params.extend([pattern] * len(columns))
+
+    return match_expr, like_clauses, like_params
+
+
+def _run_search(
+    db,
+    fts_table: str,
+    table: str,
+    columns: List[str],
+    query: str,
+    filters: List[str],
+    params: list,
+    fallback_order: str,
+    limit: int
+) -> list:
+    """全文検索を実行（FTSで引ける語があればBM25順、なければLIKEで新しい順）
+
+    filters/params は元テーブルを別名 t として参照する追加条件。
+    """
+    match_expr, like_clauses, like_params = _build_search_filter(
+        query, columns, "t", use_fts=db.search_available
+    )
+
+    where = like_clauses + filters
+    where_params = like_params + params
+
+    if match_expr:
+        sql = f"""
+            SELECT t.*, snippet({fts_table}, -1, ?, ?, '…', 16) AS snippet
+            FROM {fts_table} JOIN {table} t ON t.id = {fts_table}.rowid
+            WHERE {' AND '.join([f"{fts_table} MATCH ?"] + where)}
+            ORDER BY bm25({fts_table})
+            LIMIT ?
+        """
+        sql_params = [SNIPPET_MARK_START, SNIPPET_MARK_END, match_expr] + where_params + [limit]
+    else:
+        sql = f"""
+            SELECT t.*, NULL AS snippet
+            FROM {table} t
+            WHERE {' AND '.join(where) or '1'}
+            ORDER BY {fallback_order}
+            LIMIT ?
+        """
+        sql_params = where_params + [limit]
+
+    with db.get_connection() as conn:
+        return conn.execute(sql, sql_params).fetchall()
+
+
+def _make_snippet(texts: List[Optional[str]], terms: List[str], width: int = 32) -> str:
+    """LIKE検索のヒット箇所周辺を抜き出してマーカーで囲む"""
+    for text in texts:
+        if not text:
+            continue
+        lowered = text.lower()
+        for term in terms:
+            pos = lowered.find(term.lower())
+            if pos < 0:
+                continue
+            start = max(0, pos - width // 2)
+            end = min(len(text), pos + len(term) + width // 2)
+            return (
+                ("…" if start > 0 else "")
+                + text[start:pos]
+                + SNIPPET_MARK_START + text[pos:pos + len(term)] + SNIPPET_MARK_END
+                + text[pos + len(term):end]
+                + ("…" if end < len(text) else "")
+            )
+    return (texts[0] or "")[:width]
+
+
+def _date_range_conditions(column: str, since: Optional[date], until: Optional[date]) -> Tuple[List[str], list]:
+    """日付範囲の条件のリストとパラメータ"""
+    conditions = []
+    params: list = []
+    if since:
+        conditions.append(f"{column} >= ?")
+        params.append(since)
+    if until:
+        conditions.append(f"{column} <= ?")
+        params.append(until)
+    return conditions, params
+
+
+def _add_filter(conditions: List[str], params: list, where: Optional[Filter]):
+    """--where の条件を AND で追加する"""
+    if where is not None:
+        conditions.append(f"({where.sql})")
+        params.extend(where.params)
+
+
+def _days_filter(column: str, where: Optional[Filter]) -> Tuple[str, tuple]:
+    """日ごとの集計（days）の条件を、その日付に当てはまる行だけに絞る条件にする"""
+    if where is None:
+        return "", ()
+    return f" AND {column} IN (SELECT date FROM daily_rollup WHERE {where.sql})", where.params
+
+
+def _where(conditions: List[str]) -> str:
+    """条件のリストをWHERE句にする（条件がなければ空文字）"""
+    return " WHERE " + " AND ".join(conditions) if conditions else ""
+
+
+def _date_range_filter(column: str, since: Optional[date], until: Optional[date]) -> Tuple[str, list]:
+    """日付範囲のWHERE句（条件がなければ空文字）"""
+    conditions, params = _date_range_conditions(column, since, until)
+    return _where(conditions), params
+
+
+def _select_columns(
+    all_fields: Sequence[str],
+    fields: Optional[Sequence[str]] = None,
+    previews: Optional[Dict[str, int]] = None,
+    alias: str = ""
+) -> str:
+    """SELECTする列のリスト（fields 省略時は全列）
+
+    previews に指定した列は先頭の文字数+1文字だけ読む（続きがあるかを表示側で判定できるように）。
+    """
+    if fields is None:
+        fields = all_fields
+    unknown = [name for name in fields if name not in all_fields]
+    if unknown:
+        raise ValueError(f"不明な項目です: {', '.join(unknown)}")
+
+    prefix = f"{alias}." if alias else ""
+    previews = previews or {}
+    return ", ".join(
+        f"substr({prefix}{name}, 1, {int(previews[name]) + 1}) AS {name}" if name in previews else f"{prefix}{name}"
+        for name in fields
+    )
+
+
+def _to_models(model, rows: list, converters: Dict[str, Callable], required: Sequence[str] = ()) -> list:
+    """Rowのリストをモデルに変換
+
+    選択された列だけを設定し、選択されなかった項目はデフォルト値（必須項目は None）にする。
+    列の位置と変換関数は最初の行で1回だけ決める。
+    """
+    if not rows:
+        return []
+
+    model_fields = model.__dataclass_fields__
+    names = rows[0].keys()
+    columns = [(i, name, converters.get(name)) for i, name in enumerate(names) if name in model_fields]
+    missing = {name: None for name in required if name not in names}
+
+    result = []
+    append = result.append
+    for row in rows:
+        values = dict(missing)
+        for i, name, convert in columns:
+            value = row[i]
+            values[name] = convert(value) if convert is not None and value is not None else value
+        append(model(**values))
+    return result
+
+
+def _stream_rows(db, sql: str, params: Iterable, chunk_size: int) -> Iterator:
+    """SELECTの結果を fetchmany で少しずつ返す（全件をメモリに載せない）
+
+    1つのカーソルで読み切るので、途中で書き込みがあっても開始時点の内容で揃う。
+    読み終わるまで同じスレッドの書き込みはコミットされないため、読み込み専用で使う。
+    """
+    with db.get_connection() as conn:
+        cursor = conn.execute(sql, tuple(params))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield from rows
+
+
+def _iter_models(
+    db,
+    select: str,
+    table: str,
+    conditions: List[str],
+    params: list,
+    order_column: str,
+    batch_size: int,
+    to_models: Callable[[list], list]
+) -> Iterator:
+    """(order_column, id) の降順に batch_size 行ずつ読んでモデルに変換して返す（全件をメモリに載せない）
+
+    バッチごとに短い get_connection() で読み、続きは前のバッチの最後の (order_column, id) から読む（キーセット方式）。
+    途中でやめても、読みながら同じスレッドで書き込んでも、読み取りのトランザクションを開いたままにしない。
+    """
+    after: Optional[tuple] = None
+    while True:
+        batch_conditions = list(conditions)
+        batch_params = list(params)
+        if after is not None:
+            batch_conditions.append(f"({order_column}, id) < (?, ?)")
+            batch_params.extend(after)
+        with db.get_connection() as conn:
+            rows = conn.execute(
+                f"SELECT {select}, {order_column} AS _order_key, id AS _order_id FROM {table}"
+                f"{_where(batch_conditions)} ORDER BY {order_column} DESC, id DESC LIMIT ?",
+                batch_params + [batch_size]
+            ).fetchall()
+
+        yield from to_models(rows)
+        if len(rows) < batch_size:
+            return
+        after = (rows[-1]['_order_key'], rows[-1]['_order_id'])
+
+
+# iter_* で一度に読む行数
+ITER_BATCH_SIZE = 500
+
+
+def explain_query_plan(sql: str, params: Iterable = ()) -> List[str]:
+    """EXPLAIN QUERY PLAN の結果を木の形の行にする"""
+    db = get_database()
+    with db.get_connection() as conn:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", tuple(params)).fetchall()
+
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
 class DiaryQueries:
     """日記エントリのクエリ"""
 
-    def __init__(self):
-        self.db = Database()
+    # 自由記述の項目
+    TEXT_FIELDS = (
+        'content', 'learned_today', 'compared_to_past', 'invisible_growth',
+        'external_feedback', 'self_assessment', 'challenges_faced', 'how_overcome'
+    )
+
+    # 全列（DiaryEntry の項目と同じ）
+    FIELDS = (
+        'id', 'date', 'content', 'learned_today', 'compared_to_past', 'invisible_growth',
+        'external_feedback', 'self_assessment', 'mood', 'energy_level',
+        'challenges_faced', 'how_overcome', 'created_at', 'updated_at'
+    )
+
+    # 読み込み時に変換する列
+    CONVERTERS = {'date': date.fromisoformat, 'created_at': datetime.fromisoformat, 'updated_at': datetime.fromisoformat}
+
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or get_database()
 
+    def _select(self, fields: Optional[Sequence[str]] = None, preview: Optional[int] = None) -> str:
+        """SELECTする列（preview を指定すると本文はその文字数+1文字だけ読む）"""
+        return _select_columns(self.FIELDS, fields, {'content': preview} if preview else None)
+
+    def _to_entries(self, rows: list) -> List[DiaryEntry]:
+        return _to_models(DiaryEntry, rows, self.CONVERTERS, ('id', 'date', 'content'))
+
+    @_writes
     def create_entry(
         self,
         entry_date: date,
@@ -38,9 +337,8 @@ class DiaryQueries:
                 kwargs.get('challenges_faced'),
                 kwargs.get('how_overcome')
             ))
-            entry_id = cursor.lastrowid
-
-        return self.get_entry_by_id(entry_id)
+            # 同じ接続・トランザクション内で読み戻す
+            return self.get_entry_by_id(cursor.lastrowid)
 
     def get_entry_by_id(self, entry_id: int) -> Optional[DiaryEntry]:
         """ID指定でエントリ取得"""
@@ -66,35 +364,145 @@ class DiaryQueries:
             return self._row_to_entry(row)
         return None
 
-    def get_entries_since(self, since_date: date) -> List[DiaryEntry]:
+    def iter_entries_since(
+        self,
+        since_date: date,
+        fields: Optional[Sequence[str]] = None,
+        preview: Optional[int] = None,
+        batch_size: int = ITER_BATCH_SIZE
+    ) -> Iterator[DiaryEntry]:
+        """指定日以降のエントリを新しい順に1件ずつ返す（fields で読む列を、preview で本文の文字数を絞れる）"""
+        return _iter_models(
+            self.db, self._select(fields, preview), 'diary_entries', ["date >= ?"], [since_date],
+            'date', batch_size, self._to_entries
+        )
+
+    def get_entries_since(
+        self,
+        since_date: date,
+        fields: Optional[Sequence[str]] = None,
+        preview: Optional[int] = None
+    ) -> List[DiaryEntry]:
         """指定日以降のエントリ取得"""
+        return list(self.iter_entries_since(since_date, fields, preview))
+
+    def iter_entries_between(
+        self,
+        start_date: date,
+        end_date: date,
+        fields: Optional[Sequence[str]] = None,
+        preview: Optional[int] = None,
+        batch_size: int = ITER_BATCH_SIZE
+    ) -> Iterator[DiaryEntry]:
+        """期間内のエントリを新しい順に1件ずつ返す"""
+        return _iter_models(
+            self.db, self._select(fields, preview), 'diary_entries', ["date BETWEEN ? AND ?"], [start_date, end_date],
+            'date', batch_size, self._to_entries
+        )
+
+    def get_entries_between(
+        self,
+        start_date: date,
+        end_date: date,
+        fields: Optional[Sequence[str]] = None,
+        preview: Optional[int] = None
+    ) -> List[DiaryEntry]:
+        """期間内のエントリ取得（新しい順）"""
+        return list(self.iter_entries_between(start_date, end_date, fields, preview))
+
+    def iter_entries_by_mood(
+        self,
+        mood: str,
+        fields: Optional[Sequence[str]] = None,
+        batch_size: int = ITER_BATCH_SIZE
+    ) -> Iterator[DiaryEntry]:
+        """指定した気分のエントリを新しい順に1件ずつ返す"""
+        return _iter_models(
+            self.db, self._select(fields), 'diary_entries', ["mood = ?"], [mood],
+            'date', batch_size, self._to_entries
+        )
+
+    def get_entries_page(
+        self,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        after: Optional[date] = None,
+        limit: int = 50,
+        fields: Optional[Sequence[str]] = None,
+        preview: Optional[int] = None,
+        where: Optional[Filter] = None
+    ) -> Tuple[List[DiaryEntry], Optional[date]]:
+        """期間内のエントリを新しい順に1ページ分取得（キーセット方式）
+
+        after を指定するとその日付より前から limit 件読む。
+        次のページがあれば、次に after に渡す日付も返す（なければ None）。
+        where: compile_filter(..., "diary") の絞り込み条件
+        """
+        if fields is not None and 'date' not in fields:
+            fields = ('date',) + tuple(fields)
+        conditions, params = _date_range_conditions('date', since, until)
+        if after:
+            conditions.append("date < ?")
+            params.append(after)
+        _add_filter(conditions, params, where)
+
         with self.db.get_connection() as conn:
             rows = conn.execute(
-                "SELECT * FROM diary_entries WHERE date >= ? ORDER BY date DESC",
-                (since_date,)
+                f"SELECT {self._select(fields, preview)} FROM diary_entries{_where(conditions)} "
+                "ORDER BY date DESC LIMIT ?",
+                params + [limit + 1]
             ).fetchall()
 
-        return [self._row_to_entry(row) for row in rows]
+        entries = self._to_entries(rows[:limit])
+        return entries, (entries[-1].date if len(rows) > limit else None)
 
-    def get_entries_by_mood(self, mood: str) -> List[DiaryEntry]:
+    def get_entries_by_mood(self, mood: str, fields: Optional[Sequence[str]] = None) -> List[DiaryEntry]:
         """気分でフィルタ"""
-        with self.db.get_connection() as conn:
-            rows = conn.execute(
-                "SELECT * FROM diary_entries WHERE mood = ? ORDER BY date DESC",
-                (mood,)
-            ).fetchall()
+        return list(self.iter_entries_by_mood(mood, fields))
 
-        return [self._row_to_entry(row) for row in rows]
+    def iter_all_entries(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        preview: Optional[int] = None,
+        batch_size: int = ITER_BATCH_SIZE
+    ) -> Iterator[DiaryEntry]:
+        """全エントリを新しい順に1件ずつ返す"""
+        return _iter_models(
+            self.db, self._select(fields, preview), 'diary_entries', [], [],
+            'date', batch_size, self._to_entries
+        )
 
-    def get_all_entries(self) -> List[DiaryEntry]:
+    def get_all_entries(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        preview: Optional[int] = None
+    ) -> List[DiaryEntry]:
         """全エントリ取得"""
-        with self.db.get_connection() as conn:
-            rows = conn.execute(
-                "SELECT * FROM diary_entries ORDER BY date DESC"
-            ).fetchall()
+        return list(self.iter_all_entries(fields, preview))
 
-        return [self._row_to_entry(row) for row in rows]
+    # fetch_columns で読める列と種類
+    FRAME_COLUMNS = {'id': INTEGER, 'date': DATE, 'mood': CATEGORY, 'energy_level': NUMBER}
+
+    def fetch_columns(
+        self,
+        columns: Sequence[str],
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        where: Optional[Filter] = None,
+        use_numpy: Optional[bool] = None
+    ) -> Frame:
+        """期間内のエントリを日付の古い順に、列ごとの配列で取得（集計・分析用）
 
+        columns: FRAME_COLUMNS の列（date は日付の序数、mood はコード、energy_level は NULL が NaN）
+        where: compile_filter(..., "diary") の絞り込み条件
+        """
+        conditions, params = _date_range_conditions('date', since, until)
+        _add_filter(conditions, params, where)
+        return fetch_frame(
+            self.db, 'diary_entries', self.FRAME_COLUMNS, columns, conditions, params, 'date', use_numpy
+        )
+
+    @_writes
     def update_entry(self, entry_date: date, **kwargs) -> Optional[DiaryEntry]:
         """エントリ更新（データ追記用）"""
         # 更新するフィールドを動的に構築
@@ -119,35 +527,224 @@ class DiaryQueries:
                 f"UPDATE diary_entries SET {', '.join(update_fields)} WHERE date = ?",
                 values
             )
+            return self.get_entry_by_date(entry_date)
+
+    @_writes
+    def append_entry(self, entry_date: date, content: str, **kwargs) -> Optional[DiaryEntry]:
+        """既存のエントリの本文の末尾に追記し、空の項目だけ埋める（一時保存した日記の反映用）"""
+        update_fields = ["content = content || ? || ?"]
+        values = ["\n\n", content]
+
+        for field in ['learned_today', 'compared_to_past', 'invisible_growth',
+                      'external_feedback', 'self_assessment', 'mood',
+                      'energy_level', 'challenges_faced', 'how_overcome']:
+            if kwargs.get(field) is not None:
+                update_fields.append(f"{field} = COALESCE({field}, ?)")
+                values.append(kwargs[field])
+
+        update_fields.append("updated_at = CURRENT_TIMESTAMP")
+        values.append(entry_date)
+
+        with self.db.get_connection() as conn:
+            conn.execute(
+                f"UPDATE diary_entries SET {', '.join(update_fields)} WHERE date = ?",
+                values
+            )
+            return self.get_entry_by_date(entry_date)
+
+    @_writes
+    def delete_entry(self, entry_date: date) -> bool:
+        """エントリ削除"""
+        with self.db.get_connection() as conn:
+            cursor = conn.execute("DELETE FROM diary_entries WHERE date = ?", (entry_date,))
+            return cursor.rowcount > 0
+
+    def count_entries(self) -> int:
+        """総エントリ数"""
+        with self.db.get_connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM diary_entries").fetchone()[0]
+
+    def get_current_streak(self, today: date) -> int:
+        """今日で終わる連続記録日数（今日の日記がなければ0）"""
+        with self.db.get_connection() as conn:
+            row = conn.execute(
+                "SELECT length FROM streak_runs WHERE end_date = ?",
+                (today,)
+            ).fetchone()
+
+        return row['length'] if row else 0
+
+    def get_longest_streak(self) -> int:
+        """最長の連続記録日数"""
+        with self.db.get_connection() as conn:
+            row = conn.execute(
+                "SELECT length FROM streak_runs ORDER BY length DESC LIMIT 1"
+            ).fetchone()
+
+        return row['length'] if row else 0
+
+    def search_entries(
+        self,
+        query: str,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        mood: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Tuple[DiaryEntry, str]]:
+        """日記を全文検索（関連度順、ヒット箇所の抜粋つき）"""
+        columns = ["content", "learned_today", "compared_to_past", "invisible_growth", "external_feedback"]
+
+        filters = []
+        params = []
+        if since:
+            filters.append("t.date >= ?")
+            params.append(since)
+        if until:
+            filters.append("t.date <= ?")
+            params.append(until)
+        if mood:
+            filters.append("t.mood = ?")
+            params.append(mood)
+
+        rows = _run_search(
+            self.db, "diary_fts", "diary_entries", columns, query,
+            filters, params, "t.date DESC", limit
+        )
+
+        terms = query.split()
+        return [
+            (
+                item,
+                row['snippet'] or _make_snippet([row[c] for c in columns], terms)
+            )
+            for item, row in zip(self._to_entries(rows), rows)
+        ]
+
+    def get_recent_field_values(self, field: str, limit: int = 5) -> List[str]:
+        """指定項目が記入された最近の値（新しい順）"""
+        if field not in self.TEXT_FIELDS:
+            raise ValueError(f"不明な項目です: {field}")
+
+        with self.db.get_connection() as conn:
+            rows = conn.execute(
+                f"SELECT {field} FROM diary_entries WHERE {field} <> '' ORDER BY date DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+        return [row[0] for row in rows]
 
-        return self.get_entry_by_date(entry_date)
+    # bulk_upsert で書き込む列
+    IMPORT_FIELDS = (
+        'date', 'content', 'learned_today', 'compared_to_past', 'invisible_growth',
+        'external_feedback', 'self_assessment', 'mood', 'energy_level',
+        'challenges_faced', 'how_overcome'
+    )
+
+    # 日付が重複した時の扱い
+    CONFLICT_MODES = ('skip', 'overwrite', 'merge')
+
+    # stream_rows で書き出す列（取り込み用の列 + ID・タイムスタンプ）
+    EXPORT_FIELDS = ('id',) + IMPORT_FIELDS + ('created_at', 'updated_at')
+
+    def stream_rows(
+        self,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        chunk_size: int = 500,
+        where: Optional[Filter] = None
+    ) -> Iterator:
+        """期間内のエントリを日付順に1行ずつ返す（エクスポート用、Rowのまま）"""
+        conditions, params = _date_range_conditions('date', since, until)
+        _add_filter(conditions, params, where)
+        sql = f"SELECT {', '.join(self.EXPORT_FIELDS)} FROM diary_entries{_where(conditions)} ORDER BY date"
+        return _stream_rows(self.db, sql, params, chunk_size)
+
+    def bulk_upsert(
+        self,
+        rows: Iterable[dict],
+        on_conflict: str = 'skip',
+        batch_size: int = 1000,
+        on_progress: Optional[Callable[[int, int], None]] = None
+    ) -> Tuple[int, int]:
+        """エントリを一括で書き込む（全体を1トランザクションで実行）
+
+        on_conflict: 同じ日付のエントリがある場合
+            skip: 既存を残す / overwrite: 取り込む値で置き換え / merge: 空の項目だけ埋める
+        on_progress: バッチごとに (処理件数, 書き込み件数) で呼ばれる
+        戻り値: (処理件数, 書き込み件数)
+        """
+        if on_conflict not in self.CONFLICT_MODES:
+            raise ValueError(f"不明な重複時の扱いです: {on_conflict}")
+
+        columns = self.IMPORT_FIELDS
+        updatable = [c for c in columns if c != 'date']
+
+        if on_conflict == 'skip':
+            conflict_sql = "DO NOTHING"
+        elif on_conflict == 'overwrite':
+            conflict_sql = "DO UPDATE SET " + ", ".join(
+                f"{c} = excluded.{c}" for c in updatable
+            ) + ", updated_at = CURRENT_TIMESTAMP"
+        else:
+            conflict_sql = "DO UPDATE SET " + ", ".join(
+                f"{c} = COALESCE(diary_entries.{c}, excluded.{c})" for c in updatable
+            ) + ", updated_at = CURRENT_TIMESTAMP"
+
+        sql = f"""
+            INSERT INTO diary_entries ({', '.join(columns)})
+            VALUES ({', '.join('?' * len(columns))})
+            ON CONFLICT(date) {conflict_sql}
+        """
+
+        processed = 0
+        written = 0
+        iterator = iter(rows)
+        # rows は一度しか読めないのでやり直しはせず、最初に書き込みロックを取るだけにする
+        with self.db.get_connection("IMMEDIATE") as conn:
+            while True:
+                batch = [tuple(row.get(c) for c in columns) for row in islice(iterator, batch_size)]
+                if not batch:
+                    break
+                cursor = conn.executemany(sql, batch)
+                processed += len(batch)
+                written += cursor.rowcount
+                if on_progress:
+                    on_progress(processed, written)
+
+        return processed, written
 
     def _row_to_entry(self, row) -> DiaryEntry:
         """SQLiteのRowをDiaryEntryに変換"""
-        return DiaryEntry(
-            id=row['id'],
-            date=datetime.strptime(row['date'], '%Y-%m-%d').date(),
-            content=row['content'],
-            learned_today=row['learned_today'],
-            compared_to_past=row['compared_to_past'],
-            invisible_growth=row['invisible_growth'],
-            external_feedback=row['external_feedback'],
-            self_assessment=row['self_assessment'],
-            mood=row['mood'],
-            energy_level=row['energy_level'],
-            challenges_faced=row['challenges_faced'],
-            how_overcome=row['how_overcome'],
-            created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None,
-            updated_at=datetime.fromisoformat(row['updated_at']) if row['updated_at'] else None
-        )
+        return self._to_entries([row])[0]
 
 
 class TaskQueries:
     """タスクのクエリ"""
 
-    def __init__(self):
-        self.db = Database()
+    # 全列（Task の項目と同じ）
+    FIELDS = (
+        'id', 'title', 'description', 'status', 'priority', 'learnings',
+        'difficulty_before', 'difficulty_after', 'time_estimated', 'time_actual',
+        'similar_task_before', 'improvement_notes', 'external_review',
+        'created_date', 'completed_date', 'created_at', 'updated_at'
+    )
+
+    # 読み込み時に変換する列
+    CONVERTERS = {
+        'created_date': date.fromisoformat, 'completed_date': date.fromisoformat,
+        'created_at': datetime.fromisoformat, 'updated_at': datetime.fromisoformat,
+    }
+
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or get_database()
 
+    def _select(self, fields: Optional[Sequence[str]] = None) -> str:
+        return _select_columns(self.FIELDS, fields)
+
+    def _to_tasks(self, rows: list) -> List[Task]:
+        return _to_models(Task, rows, self.CONVERTERS, ('id', 'title'))
+
+    @_writes
     def create_task(
         self,
         title: str,
@@ -178,9 +775,7 @@ class TaskQueries:
                 kwargs.get('improvement_notes'),
                 kwargs.get('external_review')
             ))
-            task_id = cursor.lastrowid
-
-        return self.get_task_by_id(task_id)
+            return self.get_task_by_id(cursor.lastrowid)
 
     def get_task_by_id(self, task_id: int) -> Optional[Task]:
         """ID指定でタスク取得"""
@@ -194,34 +789,174 @@ class TaskQueries:
             return self._row_to_task(row)
         return None
 
-    def get_active_tasks(self) -> List[Task]:
+    def iter_active_tasks(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        batch_size: int = ITER_BATCH_SIZE
+    ) -> Iterator[Task]:
+        """未完了タスクを作成日の新しい順に1件ずつ返す（fields で読む列を絞れる）"""
+        return _iter_models(
+            self.db, self._select(fields), 'tasks', ["status != 'done'"], [],
+            'created_date', batch_size, self._to_tasks
+        )
+
+    def get_active_tasks(self, fields: Optional[Sequence[str]] = None) -> List[Task]:
         """未完了タスク取得"""
-        with self.db.get_connection() as conn:
-            rows = conn.execute(
-                "SELECT * FROM tasks WHERE status != 'done' ORDER BY created_date DESC"
-            ).fetchall()
+        return list(self.iter_active_tasks(fields))
 
-        return [self._row_to_task(row) for row in rows]
+    def iter_all_tasks(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        batch_size: int = ITER_BATCH_SIZE
+    ) -> Iterator[Task]:
+        """全タスクを作成日の新しい順に1件ずつ返す"""
+        return _iter_models(
+            self.db, self._select(fields), 'tasks', [], [],
+            'created_date', batch_size, self._to_tasks
+        )
 
-    def get_all_tasks(self) -> List[Task]:
+    def get_all_tasks(self, fields: Optional[Sequence[str]] = None) -> List[Task]:
         """全タスク取得"""
+        return list(self.iter_all_tasks(fields))
+
+    def get_tasks_page(
+        self,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        after: Optional[int] = None,
+        limit: int = 50,
+        active_only: bool = True,
+        fields: Optional[Sequence[str]] = None,
+        where: Optional[Filter] = None
+    ) -> Tuple[List[Task], Optional[int]]:
+        """作成日が期間内のタスクを新しい順に1ページ分取得（キーセット方式）
+
+        after にタスクIDを指定すると、そのタスクより後ろ（作成日・IDの降順）から limit 件読む。
+        次のページがあれば、次に after に渡すタスクIDも返す（なければ None）。
+        where: compile_filter(..., "tasks") の絞り込み条件
+        """
+        if fields is not None and 'id' not in fields:
+            fields = ('id',) + tuple(fields)
+        conditions, params = _date_range_conditions('created_date', since, until)
+        if active_only:
+            conditions.append("status != 'done'")
+        if after is not None:
+            conditions.append("(created_date, id) < (SELECT created_date, id FROM tasks WHERE id = ?)")
+            params.append(after)
+        _add_filter(conditions, params, where)
+
         with self.db.get_connection() as conn:
             rows = conn.execute(
-                "SELECT * FROM tasks ORDER BY created_date DESC"
+                f"SELECT {self._select(fields)} FROM tasks{_where(conditions)} "
+                "ORDER BY created_date DESC, id DESC LIMIT ?",
+                params + [limit + 1]
             ).fetchall()
 
-        return [self._row_to_task(row) for row in rows]
+        tasks = self._to_tasks(rows[:limit])
+        return tasks, (tasks[-1].id if len(rows) > limit else None)
 
-    def get_completed_tasks_since(self, since_date: date) -> List[Task]:
+    def iter_completed_tasks_since(
+        self,
+        since_date: date,
+        fields: Optional[Sequence[str]] = None,
+        batch_size: int = ITER_BATCH_SIZE
+    ) -> Iterator[Task]:
+        """指定日以降の完了タスクを完了日の新しい順に1件ずつ返す"""
+        return _iter_models(
+            self.db, self._select(fields), 'tasks', ["status = 'done'", "completed_date >= ?"], [since_date],
+            'completed_date', batch_size, self._to_tasks
+        )
+
+    def get_completed_tasks_since(self, since_date: date, fields: Optional[Sequence[str]] = None) -> List[Task]:
         """指定日以降の完了タスク取得"""
+        return list(self.iter_completed_tasks_since(since_date, fields))
+
+    def count_completed(self) -> int:
+        """完了タスクの総数"""
         with self.db.get_connection() as conn:
-            rows = conn.execute(
-                "SELECT * FROM tasks WHERE status = 'done' AND completed_date >= ? ORDER BY completed_date DESC",
-                (since_date,)
-            ).fetchall()
+            # 全体 - 未完了（status は常に入っている）。どちらも表を読まずにインデックスだけで数えられる
+            return conn.execute(
+                "SELECT (SELECT COUNT(*) FROM tasks) - (SELECT COUNT(*) FROM tasks WHERE status != 'done')"
+            ).fetchone()[0]
+
+    def count_completed_gaps(self, since_date: date) -> dict:
+        """指定日以降の完了タスクのうち、学び・難易度が未記入の件数"""
+        with self.db.get_connection() as conn:
+            row = conn.execute("""
+                SELECT
+                    COUNT(*) FILTER (WHERE learnings IS NULL OR learnings = '') AS without_learnings,
+                    COUNT(*) FILTER (
+                        WHERE NOT (COALESCE(difficulty_before, 0) <> 0 AND COALESCE(difficulty_after, 0) <> 0)
+                    ) AS without_difficulty
+                FROM tasks
+                WHERE status = 'done' AND completed_date >= ?
+            """, (since_date,)).fetchone()
 
-        return [self._row_to_task(row) for row in rows]
+        return dict(row)
+
+    def get_difficulty_changes(
+        self,
+        start_date: date,
+        end_date: date,
+        limit: int = 10,
+        days: Optional[Filter] = None
+    ) -> List[dict]:
+        """期間内の完了タスクの難易度変化（改善度の大きい順）
+
+        days: compile_filter(..., "days") の条件に当てはまる日に完了したタスクだけにする
+        """
+        days_sql, days_params = _days_filter('completed_date', days)
+        with self.db.get_connection() as conn:
+            rows = conn.execute(f"""
+                SELECT title, difficulty_before AS before, difficulty_after AS after,
+                       difficulty_before - difficulty_after AS improvement
+                FROM tasks
+                WHERE status = 'done' AND completed_date BETWEEN ? AND ?
+                  AND difficulty_before <> 0 AND difficulty_after <> 0{days_sql}
+                ORDER BY improvement DESC, completed_date DESC
+                LIMIT ?
+            """, (start_date, end_date, *days_params, limit)).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def search_tasks(
+        self,
+        query: str,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        status: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Tuple[Task, str]]:
+        """タスクを全文検索（関連度順、ヒット箇所の抜粋つき）"""
+        columns = ["title", "description", "learnings"]
 
+        filters = []
+        params = []
+        if since:
+            filters.append("t.created_date >= ?")
+            params.append(since)
+        if until:
+            filters.append("t.created_date <= ?")
+            params.append(until)
+        if status:
+            filters.append("t.status = ?")
+            params.append(status)
+
+        rows = _run_search(
+            self.db, "task_fts", "tasks", columns, query,
+            filters, params, "t.created_date DESC, t.id DESC", limit
+        )
+
+        terms = query.split()
+        return [
+            (
+                item,
+                row['snippet'] or _make_snippet([row[c] for c in columns], terms)
+            )
+            for item, row in zip(self._to_tasks(rows), rows)
+        ]
+
+    @_writes
     def complete_task(self, task_id: int, completed_date: date, **kwargs) -> Optional[Task]:
         """タスク完了"""
         update_fields = ["status = 'done'", "completed_date = ?", "updated_at = CURRENT_TIMESTAMP"]
@@ -240,33 +975,281 @@ class TaskQueries:
                 f"UPDATE tasks SET {', '.join(update_fields)} WHERE id = ?",
                 values
             )
+            return self.get_task_by_id(task_id)
 
-        return self.get_task_by_id(task_id)
-
+    @_writes
     def delete_task(self, task_id: int) -> bool:
         """タスク削除"""
         with self.db.get_connection() as conn:
             cursor = conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
             return cursor.rowcount > 0
 
+    # bulk_insert で書き込む列
+    IMPORT_FIELDS = (
+        'title', 'description', 'status', 'priority', 'created_date', 'completed_date',
+        'learnings', 'difficulty_before', 'difficulty_after', 'time_estimated',
+        'time_actual', 'similar_task_before', 'improvement_notes', 'external_review'
+    )
+
+    # stream_rows で書き出す列（取り込み用の列 + ID・タイムスタンプ）
+    EXPORT_FIELDS = ('id',) + IMPORT_FIELDS + ('created_at', 'updated_at')
+
+    def stream_rows(
+        self,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        chunk_size: int = 500,
+        date_column: str = 'created_date',
+        where: Optional[Filter] = None
+    ) -> Iterator:
+        """期間内のタスクを date_column の順に1行ずつ返す（エクスポート用、Rowのまま）
+
+        date_column: 期間の判定と並び順に使う列 (created_date / completed_date)
+        completed_date の場合は完了済みのタスクだけが対象になる。
+        """
+        if date_column not in ('created_date', 'completed_date'):
+            raise ValueError(f"不明な日付列です: {date_column}")
+
+        conditions, params = _date_range_conditions(date_column, since, until)
+        if date_column == 'completed_date':
+            conditions.append("completed_date IS NOT NULL")
+        _add_filter(conditions, params, where)
+        sql = f"SELECT {', '.join(self.EXPORT_FIELDS)} FROM tasks{_where(conditions)} ORDER BY {date_column}, id"
+        return _stream_rows(self.db, sql, params, chunk_size)
+
+    # fetch_columns で読める列と種類
+    FRAME_COLUMNS = {
+        'id': INTEGER, 'created_date': DATE, 'completed_date': DATE,
+        'status': CATEGORY, 'priority': CATEGORY,
+        'difficulty_before': NUMBER, 'difficulty_after': NUMBER,
+        'time_estimated': NUMBER, 'time_actual': NUMBER,
+    }
+
+    def fetch_columns(
+        self,
+        columns: Sequence[str],
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        date_column: str = 'created_date',
+        where: Optional[Filter] = None,
+        use_numpy: Optional[bool] = None
+    ) -> Frame:
+        """期間内のタスクを date_column の古い順に、列ごとの配列で取得（集計・分析用）
+
+        columns: FRAME_COLUMNS の列（日付は序数、status・priority はコード、数値は NULL が NaN）
+        date_column: 期間の判定と並び順に使う列。completed_date の場合は完了済みのタスクだけが対象になる。
+        where: compile_filter(..., "tasks") の絞り込み条件
+        """
+        if date_column not in ('created_date', 'completed_date'):
+            raise ValueError(f"不明な日付列です: {date_column}")
+
+        conditions, params = _date_range_conditions(date_column, since, until)
+        if date_column == 'completed_date':
+            conditions.append("completed_date IS NOT NULL")
+        _add_filter(conditions, params, where)
+        return fetch_frame(
+            self.db, 'tasks', self.FRAME_COLUMNS, columns, conditions, params, f"{date_column}, id", use_numpy
+        )
+
+    def bulk_insert(
+        self,
+        rows: Iterable[dict],
+        batch_size: int = 1000,
+        on_progress: Optional[Callable[[int, int], None]] = None
+    ) -> int:
+        """タスクを一括で追加（全体を1トランザクションで実行）
+
+        on_progress: バッチごとに (処理件数, 書き込み件数) で呼ばれる
+        戻り値: 追加件数
+        """
+        columns = self.IMPORT_FIELDS
+        sql = f"""
+            INSERT INTO tasks ({', '.join(columns)})
+            VALUES ({', '.join('?' * len(columns))})
+        """
+
+        written = 0
+        iterator = iter(rows)
+        # rows は一度しか読めないのでやり直しはせず、最初に書き込みロックを取るだけにする
+        with self.db.get_connection("IMMEDIATE") as conn:
+            while True:
+                batch = [tuple(row.get(c) for c in columns) for row in islice(iterator, batch_size)]
+                if not batch:
+                    break
+                conn.executemany(sql, batch)
+                written += len(batch)
+                if on_progress:
+                    on_progress(written, written)
+
+        return written
+
     def _row_to_task(self, row) -> Task:
         """SQLiteのRowをTaskに変換"""
-        return Task(
-            id=row['id'],
-            title=row['title'],
-            description=row['description'],
-            status=row['status'],
-            priority=row['priority'],
-            learnings=row['learnings'],
-            difficulty_before=row['difficulty_before'],
-            difficulty_after=row['difficulty_after'],
-            time_estimated=row['time_estimated'],
-            time_actual=row['time_actual'],
-            similar_task_before=row['similar_task_before'],
-            improvement_notes=row['improvement_notes'],
-            external_review=row['external_review'],
-            created_date=datetime.strptime(row['created_date'], '%Y-%m-%d').date() if row['created_date'] else None,
-            completed_date=datetime.strptime(row['completed_date'], '%Y-%m-%d').date() if row['completed_date'] else None,
-            created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None,
-            updated_at=datetime.fromisoformat(row['updated_at']) if row['updated_at'] else None
-        )
+        return self._to_tasks([row])[0]
+
+
+class RollupQueries:
+    """日ごとの集計テーブル（daily_rollup）のクエリ
+
+    日記・タスクの本文を読まずに、期間の日数分の小さな行だけで集計する。
+    """
+
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or get_database()
+
+    def get_period_summary(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        where: Optional[Filter] = None
+    ) -> dict:
+        """期間内の日記数・各項目の記入数・完了タスク数・難易度変化をまとめて集計（期間省略時は全期間）
+
+        where: compile_filter(..., "days") の条件に当てはまる日だけを集計する
+        """
+        condition, params = (f" AND ({where.sql})", where.params) if where else ("", ())
+        with self.db.get_connection() as conn:
+            row = conn.execute(f"""
+                SELECT
+                    COUNT(*) FILTER (WHERE has_entry) AS entry_count,
+                    COUNT(*) FILTER (WHERE has_entry) AS days_with_entries,
+                    COUNT(*) FILTER (WHERE learned_today) AS learned_today,
+                    COUNT(*) FILTER (WHERE compared_to_past) AS compared_to_past,
+                    COUNT(*) FILTER (WHERE invisible_growth) AS invisible_growth,
+                    COUNT(*) FILTER (WHERE external_feedback) AS external_feedback,
+                    COUNT(*) FILTER (WHERE self_assessment) AS self_assessment,
+                    IFNULL(SUM(tasks_completed), 0) AS completed_task_count,
+                    IFNULL(SUM(difficulty_count), 0) AS difficulty_count,
+                    CAST(SUM(difficulty_improvement) AS REAL) / NULLIF(SUM(difficulty_count), 0)
+                        AS avg_improvement
+                FROM daily_rollup
+                WHERE date BETWEEN ? AND ?{condition}
+            """, (start_date or date.min, end_date or date.max, *params)).fetchone()
+
+        return dict(row)
+
+    def get_mood_distribution(self, start_date: date, end_date: date, where: Optional[Filter] = None) -> List[tuple]:
+        """期間内の気分ごとの件数（多い順）"""
+        condition, params = (f" AND ({where.sql})", where.params) if where else ("", ())
+        with self.db.get_connection() as conn:
+            rows = conn.execute(f"""
+                SELECT mood, COUNT(*) AS count
+                FROM daily_rollup
+                WHERE date BETWEEN ? AND ? AND mood <> ''{condition}
+                GROUP BY mood
+                ORDER BY count DESC
+            """, (start_date, end_date, *params)).fetchall()
+
+        return [(row['mood'], row['count']) for row in rows]
+
+    def get_entry_dates_between(self, start_date: date, end_date: date) -> List[date]:
+        """期間内で日記のある日付を取得"""
+        with self.db.get_connection() as conn:
+            rows = conn.execute(
+                "SELECT date FROM daily_rollup WHERE date BETWEEN ? AND ? AND has_entry ORDER BY date",
+                (start_date, end_date)
+            ).fetchall()
+
+        return [date.fromisoformat(row['date']) for row in rows]
+
+    @_writes
+    def rebuild(self) -> int:
+        """日記・タスクから作り直す（作成した行数を返す）"""
+        with self.db.get_connection() as conn:
+            return rebuild_daily_rollup(conn)
+
+
+class EmotionQueries:
+    """感情検知結果のクエリ"""
+
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or get_database()
+
+    @_writes
+    def save_scores(self, rows: List[tuple]):
+        """解析結果をまとめて保存（既存の結果は上書き）
+
+        rows: (entry_id, lexicon_version, is_negative, is_venting, is_struggling,
+               negative_score, venting_score, struggling_score, keywords, recommended_mode)
+        """
+        with self.db.get_connection() as conn:
+            conn.executemany("""
+                INSERT INTO emotion_scores (
+                    entry_id, lexicon_version, is_negative, is_venting, is_struggling,
+                    negative_score, venting_score, struggling_score, keywords, recommended_mode
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(entry_id) DO UPDATE SET
+                    lexicon_version = excluded.lexicon_version,
+                    is_negative = excluded.is_negative,
+                    is_venting = excluded.is_venting,
+                    is_struggling = excluded.is_struggling,
+                    negative_score = excluded.negative_score,
+                    venting_score = excluded.venting_score,
+                    struggling_score = excluded.struggling_score,
+                    keywords = excluded.keywords,
+                    recommended_mode = excluded.recommended_mode,
+                    analyzed_at = CURRENT_TIMESTAMP
+            """, rows)
+
+    def count_pending(self, lexicon_version: str) -> int:
+        """未解析または古い辞書で解析された日記の件数"""
+        with self.db.get_connection() as conn:
+            return conn.execute("""
+                SELECT COUNT(*)
+                FROM diary_entries d LEFT JOIN emotion_scores s ON s.entry_id = d.id
+                WHERE s.entry_id IS NULL OR s.lexicon_version != ?
+            """, (lexicon_version,)).fetchone()[0]
+
+    def iter_pending_batches(self, lexicon_version: str, batch_size: int = 500) -> Iterator[List[Tuple[int, str]]]:
+        """解析が必要な日記を (id, content) のバッチでID順に返す"""
+        last_id = 0
+        while True:
+            with self.db.get_connection() as conn:
+                rows = conn.execute("""
+                    SELECT d.id, d.content
+                    FROM diary_entries d LEFT JOIN emotion_scores s ON s.entry_id = d.id
+                    WHERE d.id > ? AND (s.entry_id IS NULL OR s.lexicon_version != ?)
+                    ORDER BY d.id
+                    LIMIT ?
+                """, (last_id, lexicon_version, batch_size)).fetchall()
+
+            if not rows:
+                return
+            last_id = rows[-1]['id']
+            yield [(row['id'], row['content']) for row in rows]
+
+    def get_summary(self, start_date: date, end_date: date, days: Optional[Filter] = None) -> dict:
+        """期間内の感情検知の集計（days: 日ごとの集計の条件に当てはまる日だけにする）"""
+        days_sql, days_params = _days_filter('d.date', days)
+        with self.db.get_connection() as conn:
+            row = conn.execute(f"""
+                SELECT
+                    COUNT(*) AS analyzed,
+                    COUNT(*) FILTER (WHERE s.is_negative) AS negative,
+                    COUNT(*) FILTER (WHERE s.is_venting) AS venting,
+                    COUNT(*) FILTER (WHERE s.is_struggling) AS struggling
+                FROM diary_entries d JOIN emotion_scores s ON s.entry_id = d.id
+                WHERE d.date BETWEEN ? AND ?{days_sql}
+            """, (start_date, end_date, *days_params)).fetchone()
+
+        return dict(row)
+
+    def get_difficult_days(self, since_date: date, limit: int = 5) -> List[dict]:
+        """つらさ・行き詰まりが検知された最近の日（新しい順）"""
+        with self.db.get_connection() as conn:
+            rows = conn.execute("""
+                SELECT d.date, s.keywords, s.recommended_mode
+                FROM diary_entries d JOIN emotion_scores s ON s.entry_id = d.id
+                WHERE d.date >= ? AND (s.is_negative OR s.is_struggling)
+                ORDER BY d.date DESC
+                LIMIT ?
+            """, (since_date, limit)).fetchall()
+
+        return [
+            {
+                "date": row['date'],
+                "keywords": json.loads(row['keywords']) if row['keywords'] else [],
+                "recommended_mode": row['recommended_mode'],
+            }
+            for row in rows
+        ]
@@ -0,0 +1,317 @@
+"""DBを使えない時の書き込みの一時保存（スプール）
+
+他のプロセスが長く書き込みロックを持っている、DBがネットワーク上にあって一時的に開けない、
+といった理由で diary write / task add が SELFCLAP_WRITE_BUDGET 以内に書き込めなかった場合、
+入力を ~/.selfclap/spool/ のファイルにJSON Linesで追記しておく（1件ごとに fsync する）。
+
+一時保存した書き込みは、次にコマンドを実行した時（常駐プロセスなら定期的にも）
+古い順に1つのトランザクションでDBに反映する。各行には重複しないキーがあり、
+反映済みのキーを spool_applied テーブルに記録するので、途中で終了しても二重に反映されない。
+"""
+import hashlib
+import os
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from selfclap.config import resolve_db_path, selfclap_home
+
+try:
+    import fcntl
+except ImportError:  # Windows: 追記と反映の排他はせず、キーによる重複防止だけに頼る
+    fcntl = None
+
+# 書き込みにかけてよい時間（ミリ秒）。SELFCLAP_WRITE_BUDGET で変更できる
+DEFAULT_WRITE_BUDGET_MS = 2000
+
+DIARY_CREATE = "diary.create"
+TASK_CREATE = "task.create"
+
+
+class SpoolError(ValueError):
+    """一時保存した書き込みを反映できない（不明な種類など）"""
+
+
+def write_budget() -> float:
+    """書き込みにかけてよい時間（秒）"""
+    value = os.environ.get("SELFCLAP_WRITE_BUDGET")
+    if not value:
+        return DEFAULT_WRITE_BUDGET_MS / 1000
+    try:
+        return max(int(value), 0) / 1000
+    except ValueError:
+        raise ValueError(f"SELFCLAP_WRITE_BUDGET はミリ秒の整数で指定してください: {value}")
+
+
+def spool_dir() -> Path:
+    return selfclap_home() / "spool"
+
+
+def _spool_name(db_path: Path) -> str:
+    # DBごとにファイルを分ける（プロファイルが違えば別のファイル）
+    path = os.path.abspath(db_path)
+    return f"{Path(path).stem}-{hashlib.sha1(path.encode('utf-8')).hexdigest()[:12]}"
+
+
+def _claimed_files(name: str) -> List[Path]:
+    """反映中（または反映に失敗して残った）ファイル（古い順）"""
+    return sorted(spool_dir().glob(f"{name}.*.draining"))
+
+
+def _lock(fd: int):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+
+def _same_file(fd: int, path: Path) -> bool:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return False
+    opened = os.fstat(fd)
+    return (opened.st_dev, opened.st_ino) == (st.st_dev, st.st_ino)
+
+
+def _fsync_directory(directory: Path):
+    """新しく作ったファイルの名前もディスクに書き出す（対応していないOSでは何もしない）"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def append(op: str, payload: dict, db_path: Optional[Path] = None) -> str:
+    """書き込みを一時保存して、そのキーを返す（ディスクに書き出してから戻る）"""
+    import json
+    import uuid
+
+    db_path = Path(db_path) if db_path else resolve_db_path()
+    key = uuid.uuid4().hex
+    record = {
+        "key": key,
+        "op": op,
+        "db": os.path.abspath(db_path),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "payload": payload,
+    }
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+    directory = spool_dir()
+    # 日記の本文を含むので本人だけが読めるようにする
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    path = directory / f"{_spool_name(db_path)}.jsonl"
+    created = not path.exists()
+    while True:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            _lock(fd)
+            # ロックを待つ間に反映処理がファイルを移動していたら、新しいファイルを開き直す
+            if _same_file(fd, path):
+                os.write(fd, line)
+                os.fsync(fd)
+                break
+        finally:
+            os.close(fd)
+    if created:
+        _fsync_directory(directory)
+    return key
+
+
+def has_pending(db_path: Optional[Path] = None) -> bool:
+    """一時保存した書き込みがあるか（毎回のコマンドで呼ぶので、なければディレクトリを見るだけ）"""
+    directory = spool_dir()
+    if not directory.is_dir() or not any(os.scandir(directory)):
+        return False
+    name = _spool_name(Path(db_path) if db_path else resolve_db_path())
+    return (directory / f"{name}.jsonl").exists() or bool(_claimed_files(name))
+
+
+def _read_records(path: Path) -> List[dict]:
+    import json
+
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # 書き込み中に強制終了した最後の行（fsync 前なので入力は保存されていない）
+                continue
+    return records
+
+
+def pending_count(db_path: Optional[Path] = None) -> int:
+    """一時保存したままの書き込みの件数"""
+    name = _spool_name(Path(db_path) if db_path else resolve_db_path())
+    files = [*_claimed_files(name), spool_dir() / f"{name}.jsonl"]
+    return sum(len(_read_records(path)) for path in files if path.exists())
+
+
+def _claim(name: str) -> List[Path]:
+    """追記中のファイルを反映用の名前に移して、反映するファイルを古い順に返す"""
+    active = spool_dir() / f"{name}.jsonl"
+    claimed = spool_dir() / f"{name}.{time.time_ns():020d}-{os.getpid()}.draining"
+    try:
+        os.replace(active, claimed)
+    except FileNotFoundError:
+        pass
+    else:
+        # 移す前にファイルを開いていたプロセスの追記が終わるのを待つ
+        fd = os.open(claimed, os.O_RDONLY)
+        try:
+            _lock(fd)
+        finally:
+            os.close(fd)
+    return _claimed_files(name)
+
+
+def _apply_diary(db, payload: dict, merge: bool):
+    from selfclap.database.queries import DiaryQueries
+
+    fields = dict(payload)
+    entry_date = date.fromisoformat(fields.pop("date"))
+    content = fields.pop("content")
+    queries = DiaryQueries(db)
+    # 一時保存している間に同じ日の日記を書いていた場合は、入力を捨てずに追記する
+    if merge and queries.get_entry_by_date(entry_date) is not None:
+        return queries.append_entry(entry_date, content, **fields)
+    return queries.create_entry(entry_date, content, **fields)
+
+
+def _apply_task(db, payload: dict, merge: bool):
+    from selfclap.database.queries import TaskQueries
+
+    fields = dict(payload)
+    return TaskQueries(db).create_task(
+        title=fields.pop("title"),
+        created_date=date.fromisoformat(fields.pop("created_date")),
+        **fields
+    )
+
+
+# 一時保存できる書き込み: 種類 → func(db, payload, merge)
+_OPERATIONS: Dict[str, Callable] = {
+    DIARY_CREATE: _apply_diary,
+    TASK_CREATE: _apply_task,
+}
+
+
+def submit(op: str, payload: dict):
+    """書き込みを実行して結果（DiaryEntry / Task）を返す
+
+    DBを使えない・SELFCLAP_WRITE_BUDGET 以内に書き込めない場合は一時保存して None を返す。
+    それ以外のエラー（日付の重複など）はそのまま送出する。
+    """
+    import sqlite3
+    from selfclap.database.connection import get_database, is_unavailable_error
+
+    started = time.monotonic()
+    budget = write_budget()
+    try:
+        db = get_database()
+        return db.write(
+            lambda conn: _OPERATIONS[op](db, payload, False),
+            budget=max(budget - (time.monotonic() - started), 0.0),
+        )
+    except (sqlite3.OperationalError, OSError) as e:
+        if not is_unavailable_error(e):
+            raise
+    append(op, payload)
+    return None
+
+
+def _apply_records(db, conn, records: List[dict]) -> List[Tuple[str, object]]:
+    applied = []
+    for record in records:
+        if conn.execute("SELECT 1 FROM spool_applied WHERE key = ?", (record["key"],)).fetchone():
+            continue
+        operation = _OPERATIONS.get(record["op"])
+        if operation is None:
+            raise SpoolError(f"不明な書き込みの種類です: {record['op']}")
+        result = operation(db, record["payload"], True)
+        conn.execute("INSERT INTO spool_applied (key, op) VALUES (?, ?)", (record["key"], record["op"]))
+        applied.append((record["op"], result))
+    return applied
+
+
+def _analyze_entries(db, entries: list):
+    """反映した日記の感情検知結果を保存（diary write で書いた場合と同じ）"""
+    from selfclap.analysis.emotions import to_score_row
+    from selfclap.analysis.lexicon import get_lexicon
+    from selfclap.database.queries import EmotionQueries
+    from selfclap.prompts.emotion_detect import detect_emotional_content
+
+    version = get_lexicon().version
+    EmotionQueries(db).save_scores([
+        to_score_row(entry.id, detect_emotional_content(entry.content), version) for entry in entries
+    ])
+
+
+def drain(db_path: Optional[Path] = None) -> int:
+    """一時保存した書き込みを古い順に1つのトランザクションで反映し、反映した件数を返す
+
+    DBをまだ使えない場合は DatabaseBusyError などをそのまま送出する（一時保存したものは残る）。
+    """
+    from selfclap.database.connection import get_database
+
+    db_path = Path(db_path) if db_path else resolve_db_path()
+    files = _claim(_spool_name(db_path))
+    if not files:
+        return 0
+
+    records = [record for path in files for record in _read_records(path)]
+    db = get_database(db_path)
+    applied = db.write(lambda conn: _apply_records(db, conn, records), budget=write_budget())
+    # 反映済みのキーは記録したので、ここで終了しても次回に二重に反映されることはない
+    for path in files:
+        path.unlink(missing_ok=True)
+
+    entries = [result for op, result in applied if op == DIARY_CREATE and result is not None]
+    if entries:
+        _analyze_entries(db, entries)
+    return len(applied)
+
+
+def drain_pending(db_path: Optional[Path] = None) -> Tuple[int, int]:
+    """drain() を試して (反映した件数, 残っている件数) を返す
+
+    DBをまだ使えない場合や、新しいバージョンで一時保存した書き込みがある場合は何もせずに残す。
+    """
+    import sqlite3
+    from selfclap.database.connection import is_unavailable_error
+
+    try:
+        return drain(db_path), 0
+    except SpoolError:
+        return 0, pending_count(db_path)
+    except (sqlite3.OperationalError, OSError) as e:
+        if not is_unavailable_error(e):
+            raise
+        return 0, pending_count(db_path)
+
+
+def drain_all() -> int:
+    """全てのDBの一時保存した書き込みを反映する（常駐プロセスから定期的に呼ぶ）"""
+    directory = spool_dir()
+    if not directory.is_dir():
+        return 0
+    db_paths = set()
+    for path in directory.iterdir():
+        if path.suffix not in (".jsonl", ".draining"):
+            continue
+        try:
+            records = _read_records(path)
+        except FileNotFoundError:
+            # 別のプロセスが反映し終えた
+            continue
+        if records:
+            db_paths.add(records[0]["db"])
+    return sum(drain_pending(Path(db))[0] for db in sorted(db_paths))
@@ -1,4 +1,9 @@
 """感情検知とモード推薦"""
+from selfclap.analysis.lexicon import get_lexicon
+
+
+# 愚痴・不満と判定する重みの合計
+VENTING_THRESHOLD = 2.0
 
 
 def detect_emotional_content(content: str) -> dict:
@@ -12,38 +17,20 @@ def detect_emotional_content(content: str) -> dict:
             "is_frustrated": bool,
             "is_struggling": bool,
             "keywords": list,
+            "scores": dict,  # 分類ごとの重みの合計
             "recommended_mode": str or None
         }
     """
 
-    # ネガティブキーワード
-    negative_keywords = [
-        "むかつく", "イライラ", "腹立つ", "うざい", "きつい",
-        "つらい", "しんどい", "疲れた", "無理", "できない",
-        "わからない", "ダメ", "最悪", "嫌", "辛い"
-    ]
-
-    # 愚痴・不満キーワード
-    venting_keywords = [
-        "先輩", "上司", "怒られた", "注意された", "指摘",
-        "ばかり", "また", "いつも", "毎回", "何度も"
-    ]
-
-    # 挫折・苦悩キーワード
-    struggling_keywords = [
-        "わからない", "できない", "進まない", "詰まった",
-        "行き詰まった", "どうすれば", "もう", "限界"
-    ]
-
-    content_lower = content.lower()
+    match = get_lexicon().scan(content)
 
-    found_negative = [kw for kw in negative_keywords if kw in content]
-    found_venting = [kw for kw in venting_keywords if kw in content]
-    found_struggling = [kw for kw in struggling_keywords if kw in content]
+    found_negative = match.keywords.get("negative", [])
+    found_venting = match.keywords.get("venting", [])
+    found_struggling = match.keywords.get("struggling", [])
 
-    is_negative = len(found_negative) > 0
-    is_venting = len(found_venting) >= 2  # 2個以上で愚痴と判定
-    is_struggling = len(found_struggling) > 0
+    is_negative = match.score("negative") > 0
+    is_venting = match.score("venting") >= VENTING_THRESHOLD  # 標準の重みでは2語以上で愚痴と判定
+    is_struggling = match.score("struggling") > 0
 
     # モード推薦
     recommended_mode = None
@@ -64,6 +51,11 @@ def detect_emotional_content(content: str) -> dict:
         "is_frustrated": is_negative and not is_struggling,
         "is_struggling": is_struggling,
         "keywords": found_negative + found_venting + found_struggling,
+        "scores": {
+            "negative": match.score("negative"),
+            "venting": match.score("venting"),
+            "struggling": match.score("struggling"),
+        },
         "recommended_mode": recommended_mode
     }
 
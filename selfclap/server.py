@@ -0,0 +1,497 @@
+"""ローカルHTTP/JSON APIサーバー（clap serve）
+
+エディタのプラグインやチームのダッシュボードから、clap を毎回起動せずにデータを取得するためのサーバー。
+
+- 127.0.0.1 のみで待ち受ける（外部には公開しない）
+- ブラウザ上のページから使われないよう、Host が 127.0.0.1 / localhost でないリクエスト、
+  Origin の付いたリクエスト、JSONでない書き込みは拒否する。さらに /health 以外は
+  ~/.selfclap/serve.token（所有者だけが読める）のトークンを Authorization: Bearer で要求する
+- SQLiteの処理は固定サイズのスレッドプールで実行する。接続はスレッドごとに1本なので、
+  プールのスレッド数がそのまま接続プールの大きさになる
+- GETのレスポンスには DBの変更カウンタ + 日付 から作った ETag を付け、
+  If-None-Match が一致すれば 304 を返す
+- 同じ ETag の同じリクエストが同時に来た場合は1回だけ処理して結果を共有し（coalescing）、
+  結果は ETag が変わるまで（=DBが変更されるまで）メモリに保持する
+"""
+import asyncio
+import hmac
+import json
+import os
+import re
+import sqlite3
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime, timedelta
+from http import HTTPStatus
+from typing import Any, Callable, Dict, List, Optional, Pattern, Tuple
+from urllib.parse import parse_qs, urlsplit
+from selfclap import __version__
+from selfclap.config import selfclap_home
+from selfclap.database.connection import get_database
+from selfclap.database.queries import DiaryQueries, TaskQueries, SNIPPET_MARK_END, SNIPPET_MARK_START
+
+HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 4
+
+# ETag ごとに保持するレスポンスの数
+RESPONSE_CACHE_SIZE = 256
+
+# 受け付けるリクエストボディの上限
+MAX_BODY_SIZE = 1024 * 1024
+
+# 一覧系のデフォルトの期間（日数）
+DEFAULT_LIST_DAYS = 30
+
+# APIのトークンを保存するファイル（selfclap_home() の下）
+TOKEN_FILENAME = "serve.token"
+
+
+class ApiError(Exception):
+    """クライアントに返すエラー"""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# === 認証 ===
+
+def token_path():
+    return selfclap_home() / TOKEN_FILENAME
+
+
+def load_token() -> str:
+    """APIのトークンを読む（なければ作る）。ファイルは所有者だけが読み書きできるようにする"""
+    import secrets
+
+    path = token_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        os.chmod(path, 0o600)
+        token = path.read_text(encoding="utf-8").strip()
+        if token:
+            return token
+        fd = os.open(path, os.O_WRONLY | os.O_TRUNC)
+    token = secrets.token_urlsafe(32)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    return token
+
+
+# === パラメータ ===
+
+def _param(query: Dict[str, List[str]], name: str) -> Optional[str]:
+    values = query.get(name)
+    return values[-1] if values else None
+
+
+def _date_param(query: Dict[str, List[str]], name: str) -> Optional[date]:
+    value = _param(query, name)
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} はYYYY-MM-DD形式で指定してください")
+
+
+def _int_param(query: Dict[str, List[str]], name: str, default: int, maximum: int) -> int:
+    value = _param(query, name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} は整数で指定してください")
+    if not 1 <= number <= maximum:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} は1〜{maximum}で指定してください")
+    return number
+
+
+def _json_body(body: bytes) -> dict:
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "リクエストボディがJSONではありません")
+    if not isinstance(data, dict):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "リクエストボディはJSONオブジェクトにしてください")
+    return data
+
+
+def _search_query(query: Dict[str, List[str]]) -> str:
+    q = _param(query, "q")
+    if not q:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "q を指定してください")
+    return q
+
+
+# === ハンドラ（スレッドプールで実行される） ===
+
+def list_diary(match, query, body):
+    since = _date_param(query, "since") or date.today() - timedelta(days=DEFAULT_LIST_DAYS)
+    return DiaryQueries().get_entries_since(since)
+
+
+def get_diary(match, query, body):
+    try:
+        entry_date = date.fromisoformat(match["date"])
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "日付はYYYY-MM-DD形式で指定してください")
+    entry = DiaryQueries().get_entry_by_date(entry_date)
+    if entry is None:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"{entry_date} の日記はありません")
+    return entry
+
+
+def _search_results(results) -> List[dict]:
+    """(データ, 抜粋) を JSON 用に変換（ヒット箇所は **...** で囲む）"""
+    return [
+        {
+            "item": item,
+            "snippet": snippet.replace(SNIPPET_MARK_START, "**").replace(SNIPPET_MARK_END, "**"),
+        }
+        for item, snippet in results
+    ]
+
+
+def search_diary(match, query, body):
+    return _search_results(DiaryQueries().search_entries(
+        _search_query(query),
+        since=_date_param(query, "since"),
+        until=_date_param(query, "until"),
+        mood=_param(query, "mood"),
+        limit=_int_param(query, "limit", 20, 200),
+    ))
+
+
+def create_diary(match, query, body):
+    """今日の日記を作成（clap diary write と同じく感情検知の結果も保存する）"""
+    from selfclap.analysis.emotions import save_entry_emotion
+    from selfclap.prompts.emotion_detect import detect_emotional_content
+
+    data = _json_body(body)
+    if not data.get("content"):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "content は必須です")
+
+    fields = {
+        key: data.get(key)
+        for key in ("mood", "learned_today", "compared_to_past", "invisible_growth",
+                    "external_feedback", "self_assessment")
+    }
+    db = DiaryQueries()
+    today = date.today()
+
+    def create(conn):
+        if db.get_entry_by_date(today):
+            raise ApiError(HTTPStatus.CONFLICT, f"{today} の日記はすでにあります")
+        return db.create_entry(entry_date=today, content=data["content"], **fields)
+
+    # 確認と作成を1つの書き込みトランザクションで行い、同時に来たリクエストとの競合を防ぐ
+    try:
+        entry = db.db.write(create)
+    except sqlite3.IntegrityError:
+        raise ApiError(HTTPStatus.CONFLICT, f"{today} の日記はすでにあります")
+    save_entry_emotion(entry.id, detect_emotional_content(entry.content))
+    return entry
+
+
+def list_tasks(match, query, body):
+    db = TaskQueries()
+    return db.get_all_tasks() if _param(query, "all") else db.get_active_tasks()
+
+
+def get_task(match, query, body):
+    task = TaskQueries().get_task_by_id(int(match["id"]))
+    if task is None:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"ID {match['id']} のタスクはありません")
+    return task
+
+
+def search_tasks(match, query, body):
+    return _search_results(TaskQueries().search_tasks(
+        _search_query(query),
+        since=_date_param(query, "since"),
+        until=_date_param(query, "until"),
+        status=_param(query, "status"),
+        limit=_int_param(query, "limit", 20, 200),
+    ))
+
+
+def create_task(match, query, body):
+    data = _json_body(body)
+    if not data.get("title"):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "title は必須です")
+    if data.get("priority", "medium") not in ("low", "medium", "high"):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "priority は low/medium/high のいずれかです")
+    return TaskQueries().create_task(
+        title=data["title"],
+        created_date=date.today(),
+        description=data.get("description"),
+        priority=data.get("priority", "medium"),
+    )
+
+
+def complete_task(match, query, body):
+    data = _json_body(body)
+    fields = {
+        key: data[key]
+        for key in ("learnings", "difficulty_before", "difficulty_after", "time_actual")
+        if data.get(key) is not None
+    }
+    task = TaskQueries().complete_task(int(match["id"]), date.today(), **fields)
+    if task is None:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"ID {match['id']} のタスクはありません")
+    return task
+
+
+def get_stats(match, query, body):
+    from selfclap.analysis.stats import compute_dashboard_stats
+    return compute_dashboard_stats(_int_param(query, "days", 30, 3660))
+
+
+def get_streak(match, query, body):
+    db = DiaryQueries()
+    return {
+        "current": db.get_current_streak(date.today()),
+        "longest": db.get_longest_streak(),
+    }
+
+
+def get_reflect(match, query, body):
+    from selfclap.commands.reflect import get_reflect_payload
+    return get_reflect_payload()
+
+
+def get_listen(match, query, body):
+    from selfclap.commands.listen import get_listen_payload
+    return get_listen_payload()
+
+
+Handler = Callable[[Dict[str, str], Dict[str, List[str]], bytes], Any]
+
+# (メソッド, パス, ハンドラ, 成功時のステータス)。上から順に照合する
+ROUTES: List[Tuple[str, Pattern, Handler, HTTPStatus]] = [
+    ("GET", re.compile(r"^/diary$"), list_diary, HTTPStatus.OK),
+    ("POST", re.compile(r"^/diary$"), create_diary, HTTPStatus.CREATED),
+    ("GET", re.compile(r"^/diary/search$"), search_diary, HTTPStatus.OK),
+    ("GET", re.compile(r"^/diary/(?P<date>[0-9-]+)$"), get_diary, HTTPStatus.OK),
+    ("GET", re.compile(r"^/tasks$"), list_tasks, HTTPStatus.OK),
+    ("POST", re.compile(r"^/tasks$"), create_task, HTTPStatus.CREATED),
+    ("GET", re.compile(r"^/tasks/search$"), search_tasks, HTTPStatus.OK),
+    ("GET", re.compile(r"^/tasks/(?P<id>[0-9]+)$"), get_task, HTTPStatus.OK),
+    ("POST", re.compile(r"^/tasks/(?P<id>[0-9]+)/done$"), complete_task, HTTPStatus.OK),
+    ("GET", re.compile(r"^/stats$"), get_stats, HTTPStatus.OK),
+    ("GET", re.compile(r"^/streak$"), get_streak, HTTPStatus.OK),
+    ("GET", re.compile(r"^/reflect$"), get_reflect, HTTPStatus.OK),
+    ("GET", re.compile(r"^/listen$"), get_listen, HTTPStatus.OK),
+]
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if is_dataclass(value):
+        return asdict(value)
+    raise TypeError(f"{type(value).__name__} はJSONに変換できません")
+
+
+def encode_json(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+def current_etag() -> str:
+    """DBの変更カウンタと日付から ETag を作る（日付が変わると連続記録なども変わるため）"""
+    return f'"{get_database().get_revision()}-{date.today().isoformat()}"'
+
+
+class ApiServer:
+    """asyncio の HTTP/1.1 サーバー（keep-alive対応）"""
+
+    def __init__(self, port: int = DEFAULT_PORT, workers: int = DEFAULT_WORKERS, token: Optional[str] = None):
+        self.port = port
+        self.token = token
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="selfclap-db")
+        self._cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                     encode_json({"error": "ヘッダーが大きすぎます"}), keep_alive=False)
+                    break
+
+                request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ", 2)
+                except ValueError:
+                    await self._send(writer, HTTPStatus.BAD_REQUEST,
+                                     encode_json({"error": "リクエストが不正です"}), keep_alive=False)
+                    break
+
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._send(writer, HTTPStatus.BAD_REQUEST,
+                                     encode_json({"error": "Content-Length が不正です"}), keep_alive=False)
+                    break
+                if length > MAX_BODY_SIZE:
+                    await self._send(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                     encode_json({"error": "リクエストボディが大きすぎます"}), keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload, extra_headers = await self.dispatch(method, target, headers, body)
+                await self._send(writer, status, payload, keep_alive, extra_headers)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def check_request(self, method: str, path: str, headers: Dict[str, str]) -> Optional[ApiError]:
+        """ブラウザ上のページからのリクエスト（CSRF・DNSリバインディング）と、トークンのないリクエストを拒否する"""
+        if headers.get("host") not in (f"{HOST}:{self.port}", f"localhost:{self.port}"):
+            return ApiError(HTTPStatus.FORBIDDEN, "Host が不正です")
+        if "origin" in headers:
+            return ApiError(HTTPStatus.FORBIDDEN, "ブラウザからのリクエストは受け付けません")
+        if method != "GET" and headers.get("content-type", "").split(";")[0].strip().lower() != "application/json":
+            return ApiError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "Content-Type: application/json で送ってください")
+        if self.token is not None and path != "/health":
+            expected = f"Bearer {self.token}".encode("utf-8")
+            if not hmac.compare_digest(headers.get("authorization", "").encode("utf-8"), expected):
+                return ApiError(HTTPStatus.UNAUTHORIZED, f"トークンが必要です（{token_path()}）")
+        return None
+
+    async def dispatch(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        """(ステータス, ボディ, 追加ヘッダー) を返す"""
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+
+        rejected = self.check_request(method, url.path, headers)
+        if rejected is not None:
+            return rejected.status, encode_json({"error": rejected.message}), {}
+
+        if method == "GET" and url.path == "/health":
+            return HTTPStatus.OK, encode_json({"status": "ok", "version": __version__}), {}
+
+        allowed = []
+        for route_method, pattern, handler, success in ROUTES:
+            match = pattern.match(url.path)
+            if not match:
+                continue
+            if route_method != method:
+                allowed.append(route_method)
+                continue
+
+            try:
+                if method == "GET":
+                    return await self._get(target, headers, handler, match.groupdict(), query)
+                result = await self._run(handler, match.groupdict(), query, body)
+                return success, encode_json(result), {}
+            except ApiError as e:
+                return e.status, encode_json({"error": e.message}), {}
+            except Exception as e:  # サーバーは止めずに500を返す
+                print(f"selfclap serve: {method} {target}: {e!r}", file=sys.stderr)
+                return HTTPStatus.INTERNAL_SERVER_ERROR, encode_json({"error": "内部エラーが発生しました"}), {}
+
+        if allowed:
+            return HTTPStatus.METHOD_NOT_ALLOWED, encode_json({"error": "このメソッドは使えません"}), {
+                "Allow": ", ".join(allowed)
+            }
+        return HTTPStatus.NOT_FOUND, encode_json({"error": "見つかりません"}), {}
+
+    async def _get(self, target: str, headers: Dict[str, str], handler: Handler, params: dict, query: dict):
+        etag = await self._run(current_etag)
+        extra = {"ETag": etag, "Cache-Control": "no-cache"}
+        if headers.get("if-none-match") == etag:
+            return HTTPStatus.NOT_MODIFIED, b"", extra
+
+        key = (target, etag)
+        payload = self._cache.get(key)
+        if payload is not None:
+            self._cache.move_to_end(key)
+            return HTTPStatus.OK, payload, extra
+
+        # 同じリクエストが処理中なら、その結果を待つ
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._run(lambda: encode_json(handler(params, query, b""))))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._store(key, f))
+
+        payload = await asyncio.shield(future)
+        return HTTPStatus.OK, payload, extra
+
+    def _store(self, key: Tuple[str, str], future: asyncio.Future):
+        self._inflight.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._cache[key] = future.result()
+        while len(self._cache) > RESPONSE_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    async def _send(
+        self,
+        writer: asyncio.StreamWriter,
+        status: HTTPStatus,
+        payload: bytes,
+        keep_alive: bool,
+        extra_headers: Optional[Dict[str, str]] = None
+    ):
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+        if status != HTTPStatus.NOT_MODIFIED:
+            lines.append("Content-Type: application/json; charset=utf-8")
+        lines.append(f"Content-Length: {len(payload)}")
+        lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        for name, value in (extra_headers or {}).items():
+            lines.append(f"{name}: {value}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+        await writer.drain()
+
+    async def serve_forever(self, on_ready: Optional[Callable[[int], None]] = None):
+        server = await asyncio.start_server(self.handle_connection, HOST, self.port)
+        # ポート0（空いているポート）を指定された場合も、Host の確認には実際のポートを使う
+        self.port = server.sockets[0].getsockname()[1]
+        if on_ready:
+            on_ready(self.port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_server(port: int = DEFAULT_PORT, workers: int = DEFAULT_WORKERS, on_ready: Optional[Callable[[int], None]] = None):
+    """サーバーを起動（Ctrl+C で終了）"""
+    # スキーマの初期化などはリクエスト前に済ませておく
+    get_database()
+    token = load_token()
+    try:
+        asyncio.run(ApiServer(port, workers, token).serve_forever(on_ready))
+    except KeyboardInterrupt:
+        pass
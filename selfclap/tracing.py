@@ -0,0 +1,227 @@
+"""クエリの実行状況と処理時間の計測（--trace / SELFCLAP_TRACE）
+
+有効にすると、DB接続で実行したSQLごとに パラメータの型・返した行数・経過時間・呼び出し元 を、
+コマンドの処理ごとに import / analysis / render などの時間を記録する。
+同じSQLが何度も実行されている（N+1 になっている）箇所を見つけるのに使う。
+
+    SELFCLAP_TRACE=1            終了時に集計表を標準エラーに表示
+    SELFCLAP_TRACE=trace.jsonl  1件ずつJSON Linesでファイルに書き出す
+
+無効な場合は active() が None を返すだけなので、計測のコストはかからない。
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+# 集計表でN+1の疑いとして印を付ける実行回数
+REPEATED_QUERY_THRESHOLD = 10
+
+_tracer: Optional["Tracer"] = None
+
+
+class QueryRecord:
+    """SQL1回分の記録（行数・時間は結果を読み進めるたびに加算する）"""
+    __slots__ = ("sql", "params", "caller", "rows", "elapsed")
+
+    def __init__(self, sql: str, params: str, caller: str):
+        self.sql = sql
+        self.params = params
+        self.caller = caller
+        self.rows = 0
+        self.elapsed = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "type": "query",
+            "sql": self.sql,
+            "params": self.params,
+            "caller": self.caller,
+            "rows": self.rows,
+            "ms": round(self.elapsed * 1000, 3),
+        }
+
+
+class Tracer:
+    """1回のコマンド実行中の記録"""
+
+    def __init__(self, output: Optional[str] = None):
+        self.output = output
+        self.started = time.perf_counter()
+        self.queries: List[QueryRecord] = []
+        self.phases: List[dict] = []
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def add_query(self, record: QueryRecord):
+        with self._lock:
+            self.queries.append(record)
+
+    def add_phase(self, name: str, detail: str, elapsed: float):
+        with self._lock:
+            self.phases.append({"type": "phase", "name": name, "detail": detail, "ms": round(elapsed * 1000, 3)})
+
+    def summary(self) -> List[dict]:
+        """同じSQLごとの集計（合計時間の長い順）"""
+        groups: Dict[str, dict] = {}
+        for record in self.queries:
+            group = groups.setdefault(record.sql, {
+                "sql": record.sql, "callers": set(), "count": 0, "rows": 0, "elapsed": 0.0
+            })
+            group["callers"].add(record.caller)
+            group["count"] += 1
+            group["rows"] += record.rows
+            group["elapsed"] += record.elapsed
+        return sorted(groups.values(), key=lambda g: g["elapsed"], reverse=True)
+
+    def report(self):
+        """記録を書き出す（ファイルが指定されていればJSON Lines、なければ標準エラーに集計表）"""
+        total = time.perf_counter() - self.started
+        if self.output:
+            self._write_jsonl(total)
+        else:
+            self._print_summary(total)
+
+    def _write_jsonl(self, total: float):
+        import json
+
+        with open(self.output, "a", encoding="utf-8") as out:
+            for event in [*self.phases, *(record.to_dict() for record in self.queries)]:
+                out.write(json.dumps(event, ensure_ascii=False) + "\n")
+            out.write(json.dumps({
+                "type": "command",
+                "argv": sys.argv[1:],
+                "ms": round(total * 1000, 3),
+                "queries": len(self.queries),
+                "query_ms": round(sum(r.elapsed for r in self.queries) * 1000, 3),
+                **self.counters,
+            }, ensure_ascii=False) + "\n")
+
+    def _print_summary(self, total: float):
+        from rich.console import Console
+        from rich.markup import escape
+        from rich.table import Table
+
+        console = Console(stderr=True)
+        query_time = sum(r.elapsed for r in self.queries)
+
+        table = Table(title="🔎 クエリ", title_justify="left")
+        table.add_column("回数", justify="right", no_wrap=True, min_width=4)
+        table.add_column("行数", justify="right", no_wrap=True, min_width=4)
+        table.add_column("ms", justify="right", no_wrap=True, min_width=6)
+        table.add_column("呼び出し元", style="cyan", no_wrap=True, min_width=16, max_width=32)
+        # 残りの幅に収まるように省略する（固定の列の幅: 約60桁）
+        table.add_column("SQL", style="dim", no_wrap=True, overflow="ellipsis", max_width=max(console.width - 60, 20))
+        for group in self.summary():
+            count = str(group["count"])
+            if group["count"] >= REPEATED_QUERY_THRESHOLD:
+                count = f"[bold red]{count} ⚠[/bold red]"
+            table.add_row(
+                count, str(group["rows"]), f"{group['elapsed'] * 1000:.2f}",
+                escape(", ".join(sorted(group["callers"]))), escape(group["sql"])
+            )
+        if self.queries:
+            console.print(table)
+
+        if self.phases:
+            phases = Table(title="⏱️ 処理時間", title_justify="left")
+            phases.add_column("処理")
+            phases.add_column("ms", justify="right")
+            for phase in self.phases:
+                label = f"{phase['name']} ({phase['detail']})" if phase["detail"] else phase["name"]
+                phases.add_row(escape(label), f"{phase['ms']:.2f}")
+            console.print(phases)
+
+        console.print(
+            f"[dim]合計 {total * 1000:.1f} ms ・ クエリ {len(self.queries)}回 {query_time * 1000:.1f} ms ・ "
+            f"接続 {self.counters.get('connect', 0)}回 ・ get_connection {self.counters.get('get_connection', 0)}回[/dim]"
+        )
+        repeated = [g for g in self.summary() if g["count"] >= REPEATED_QUERY_THRESHOLD]
+        if repeated:
+            console.print(
+                f"[yellow]⚠ 同じSQLが{REPEATED_QUERY_THRESHOLD}回以上実行されています（N+1 の可能性）[/yellow]"
+            )
+
+
+def active() -> Optional[Tracer]:
+    """計測中の Tracer（無効なら None）"""
+    return _tracer
+
+
+def start(output: Optional[str] = None) -> Tracer:
+    """計測を開始する（output を指定するとJSON Linesでそのファイルに追記）"""
+    global _tracer
+    _tracer = Tracer(output)
+    return _tracer
+
+
+def start_from_env() -> Optional[Tracer]:
+    """SELFCLAP_TRACE が設定されていれば計測を開始する"""
+    value = os.environ.get("SELFCLAP_TRACE", "")
+    if value in ("", "0"):
+        return None
+    return start(None if value == "1" else value)
+
+
+def stop(report: bool = True) -> Optional[Tracer]:
+    """計測を終了して結果を書き出す（report=False なら書き出さずに記録だけ返す）"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None and report:
+        tracer.report()
+    return tracer
+
+
+@contextmanager
+def phase(name: str, detail: str = "") -> Iterator[None]:
+    """処理の区間の時間を記録する（import / analysis / render など）"""
+    tracer = _tracer
+    if tracer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        tracer.add_phase(name, detail, time.perf_counter() - started)
+
+
+def params_shape(params) -> str:
+    """パラメータの値は記録せず、型だけを残す"""
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items()) + "}"
+    return "(" + ", ".join(type(v).__name__ for v in params) + ")"
+
+
+def _caller() -> str:
+    """SQLを実行した selfclap 内の関数（接続・計測モジュール自身と _ で始まる補助関数は飛ばす）"""
+    fallback = "-"
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("selfclap.") and module not in (__name__, "selfclap.database.connection"):
+            code = frame.f_code
+            name = getattr(code, "co_qualname", code.co_name)
+            if not code.co_name.startswith("_") or code.co_name == "__init__":
+                return name
+            if fallback == "-":
+                fallback = name
+        frame = frame.f_back
+    return fallback
+
+
+def record_query(sql: str, params: str) -> QueryRecord:
+    """SQLの実行を記録に加える（行数・時間は呼び出し側で加算する）"""
+    # コメント行を除いて1行にまとめる（同じSQLを集計できるように）
+    lines = (line for line in sql.splitlines() if not line.lstrip().startswith("--"))
+    record = QueryRecord(" ".join(" ".join(lines).split()), params, _caller())
+    tracer = _tracer
+    if tracer is not None:
+        tracer.add_query(record)
+    return record
@@ -31,10 +31,14 @@ setup(
             "black>=23.7.0",
             "flake8>=6.1.0",
         ],
+        # 分析用の fetch_columns を numpy.ndarray で返す
+        "analysis": [
+            "numpy>=1.24",
+        ],
     },
     entry_points={
         "console_scripts": [
-            "clap=selfclap.cli:app",
+            "clap=selfclap.client:main",
         ],
     },
 )